@@ -0,0 +1,34 @@
+"""
+Сравнение времени построения и сериализации в JSON графиков, собранных словарями (passport.figures), и графиков,
+построенных через go.Figure с проверкой свойств plotly.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.figure_dicts [--rows 20000] [--repeat 10]
+
+Функции go_* (tests/figure_cases.py) повторяют построение графиков через plotly.graph_objects и служат эталоном.
+Равенство графиков эталону по JSON, который получает браузер, проверяется тестом tests/test_figures.py.
+"""
+import argparse
+import timeit
+
+import passport.result_cache as rc
+from tests.figure_cases import get_cases, make_tagged_df, to_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='количество строк синтетических данных')
+    parser.add_argument('--repeat', type=int, default=10, help='количество повторов')
+    args = parser.parse_args()
+    # кэш графиков отключен: измеряется время построения, а не чтения из кэша
+    rc.figure_backend = rc.MemoryBackend(size=0)
+
+    for name, reference, fast in get_cases(df=make_tagged_df(rows=args.rows)):
+        before = min(timeit.repeat(lambda: to_json(reference()), number=1, repeat=args.repeat))
+        after = min(timeit.repeat(lambda: to_json(fast()), number=1, repeat=args.repeat))
+        print(f'{name:<32} go.Figure {before * 1000:7.1f} ms   dict {after * 1000:7.1f} ms ({after / before:.0%})')
+
+
+if __name__ == '__main__':
+    main()
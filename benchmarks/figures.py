@@ -0,0 +1,156 @@
+"""
+Сравнение времени построения графиков вкладки "Сайт" прежними функциями (повторный groupby для каждого столбца и
+трассы) и текущими (один расчет на график, все трассы добавляются одним вызовом).
+
+Запуск из корня проекта:
+
+    python -m benchmarks.figures [--rows 20000] [--repeat 10]
+
+Данные синтетические: размеченные строки Яндекс.Метрики (см. **si.tag_metrika_sections**) с заданным количеством
+строк. Время текущих функций включает расчет данных для графика (функции **si.get_*_data**).
+"""
+import argparse
+import datetime as dt
+import random
+import timeit
+
+import pandas as pd
+import plotly.graph_objects as go
+
+import passport.figures as pf
+import passport.result_cache as rc
+import passport.site_info as si
+from tests.figure_cases import make_tagged_df
+
+
+def old_site_line_graph(df):
+    return go.Figure(data=[
+        go.Scatter(y=list(df.groupby(['date'])[column].sum()),
+                   x=list(df.groupby(['date'])[column].sum().index),
+                   mode='lines+markers',
+                   marker=dict(color=color, size=6),
+                   line=dict(color=color, width=5),
+                   name=name)
+        for column, name, color in [('visits', 'Визиты', '#5d4b63'), ('users', 'Пользователи', '#d74d63'),
+                                    ('pageviews', 'Просмотры страниц', '#a38182')]])
+
+
+def old_el_budget_graph(df, names_el_budget):
+    colors = ['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006']
+    fig = go.Figure()
+    for num in range(len(df.groupby(['level3'])[['pageDepth']].mean().pageDepth)):
+        fig.add_trace(go.Bar(
+            name=list(names_el_budget.values())[num],
+            x=[''],
+            y=[round(df.groupby(['level3'])[['pageDepth']].mean().pageDepth.iloc[num], 1)],
+            marker=dict(color=colors[num % len(colors)]),
+            text=[round(df.groupby(['level3'])[['pageDepth']].mean().pageDepth.iloc[num], 1)],
+            textposition='outside'))
+    return fig
+
+
+def old_el_budget_graph_mean_time(df, names_el_budget):
+    colors = ['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006']
+    fig = go.Figure()
+    for num in range(len(df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds)):
+        fig.add_trace(go.Bar(
+            name=list(names_el_budget.values())[num],
+            x=[''],
+            y=[round(
+                df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds.iloc[num] // 60 + (
+                    df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds.iloc[num] % 60
+                    / 100),
+                2)],
+            marker=dict(color=colors[num % len(colors)]),
+            text=[str(dt.timedelta(seconds=round(
+                df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds.iloc[num])))[2:]],
+            textposition='outside'))
+    return fig
+
+
+def old_gossluzba_graph_page_dept(df):
+    colors = ['#98bfad', '#ffc4b2', '#ffffcc']
+    fig = go.Figure()
+    for num in range(len(df.groupby(['startURL'])[['pageDepth']].mean().pageDepth)):
+        fig.add_trace(go.Bar(
+            name=df.groupby('startURL').pageDepth.sum().index[num],
+            x=[''],
+            y=[round(df.groupby(['startURL'])[['pageDepth']].mean().pageDepth.iloc[num], 2)],
+            marker=dict(color=colors[num % len(colors)]),
+            text=[round(df.groupby(['startURL']).mean().pageDepth.iloc[num], 1)],
+            textposition='outside'))
+    return fig
+
+
+def old_visits_gossluzba_site(df):
+    return go.Figure(data=[
+        go.Scatter(y=list(df.groupby(['date'])[column].sum()),
+                   x=list(df.groupby(['date'])[column].sum().index),
+                   mode='lines+markers',
+                   marker=dict(color=color, size=6),
+                   line=dict(color=color, width=5),
+                   name=name)
+        for column, name, color in [('users', 'Визиты', '#4eac01'), ('visits', 'Пользователи', '#e93667')]])
+
+
+def old_fig_total(df, colors):
+    fig = go.Figure()
+    for i in range(len(df.columns)):
+        fig.add_trace(go.Bar(x=[df.columns[i]],
+                             y=[df[df.columns[i]].sum()],
+                             name=df.columns[i],
+                             marker_color=colors[i],
+                             text=str(df[df.columns[i]].sum()),
+                             textposition='inside'))
+        fig.update_layout(barmode='stack',
+                          legend_xanchor='right',
+                          paper_bgcolor='#ebecf1',
+                          plot_bgcolor='#ebecf1',
+                          showlegend=False)
+    return fig
+
+
+def get_cases(df):
+    """
+    Функция возвращает список (название графика, прежнее построение, текущее построение).
+    """
+    names = si.names_el_budget_dict
+    budget_rows = df[['subsection', 'pageDepth', 'avgVisitDurationSeconds']].rename(columns={'subsection': 'level3'})
+    inf_systems_df = pd.DataFrame({f'system_{i}': [random.randint(0, 100) for _ in range(40)]
+                                   for i in range(len(pf.colors_inf_system))})
+    return [
+        ('site_line_graph', lambda: old_site_line_graph(df=df),
+         lambda: pf.plot_site_line_graph(df=si.get_site_line_data(df=df))),
+        ('el_budget_graph', lambda: old_el_budget_graph(df=budget_rows, names_el_budget=names),
+         lambda: pf.plot_el_budget_graph(df=si.get_el_budget_data(df=df, names_el_budget=names),
+                                         names_el_budget=names)),
+        ('el_budget_graph_mean_time', lambda: old_el_budget_graph_mean_time(df=budget_rows, names_el_budget=names),
+         lambda: pf.plot_el_budget_graph_mean_time(df=si.get_el_budget_data(df=df, names_el_budget=names),
+                                                   names_el_budget=names)),
+        ('gossluzba_graph_page_dept', lambda: old_gossluzba_graph_page_dept(df=df[['startURL', 'pageDepth']]),
+         lambda: pf.plot_gossluzba_graph_page_dept(df=si.get_gossluzba_depth_data(df=df))),
+        ('visits_gossluzba_site', lambda: old_visits_gossluzba_site(df=df),
+         lambda: pf.visits_gossluzba_site(df=si.get_gossluzba_visits_data(df=df))),
+        ('fig_total', lambda: old_fig_total(df=inf_systems_df, colors=pf.colors_inf_system),
+         lambda: pf.fig_total(df=inf_systems_df, colors=pf.colors_inf_system)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='количество строк синтетических данных')
+    parser.add_argument('--repeat', type=int, default=10, help='количество повторов')
+    args = parser.parse_args()
+    # кэш графиков отключен: измеряется время построения, а не чтения из кэша
+    rc.figure_backend = rc.MemoryBackend(size=0)
+
+    df = make_tagged_df(rows=args.rows)
+    print(f'rows: {len(df)}')
+    for name, old, new in get_cases(df=df):
+        before = min(timeit.repeat(old, number=1, repeat=args.repeat))
+        after = min(timeit.repeat(new, number=1, repeat=args.repeat))
+        print(f'{name:<28} before {before * 1000:8.1f} ms   after {after * 1000:8.1f} ms ({after / before:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Сравнение времени разбора ответа API Яндекс.Метрики построчным (прежним) и столбцовым парсером.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.metrika_parser [response.json] [--rows 10000] [--repeat 20]
+
+Если путь к сохраненному ответу API не указан, используется синтетический ответ с заданным количеством строк.
+"""
+import argparse
+import json
+import random
+import timeit
+
+import pandas as pd
+
+import passport.site_info as si
+
+
+def make_response(rows):
+    """
+    Функция формирует синтетический ответ API Яндекс.Метрики со структурой отчета get_site_info.
+    """
+    dimensions = ['ym:s:date', 'ym:s:startURLPathLevel1', 'ym:s:startURLPathLevel2', 'ym:s:startURLPathLevel3',
+                  'ym:s:startURLPathLevel4', 'ym:s:startURL']
+    metrics = ['ym:s:visits', 'ym:s:users', 'ym:s:pageviews', 'ym:s:bounceRate', 'ym:s:pageDepth',
+               'ym:s:avgVisitDurationSeconds']
+    sections = list(si.names_el_budget_dict) + list(si.names_gossluzba_dict) + ['dokumenty', 'novosti-i-soobshheniya']
+    site = 'https://mbufk.roskazna.gov.ru/'
+
+    data = []
+    for i in range(rows):
+        level2 = f'{site}{random.choice(sections)}/'
+        level3 = f'{level2}{random.choice(sections)}/'
+        data.append(dict(dimensions=[{'name': f'2021-{i % 12 + 1:02d}-{i % 28 + 1:02d}'}, {'name': site},
+                                     {'name': level2}, {'name': level3}, {'name': None},
+                                     {'name': f'{level3}page-{i}'}],
+                         metrics=[float(random.randint(1, 50)), float(random.randint(1, 40)),
+                                  float(random.randint(1, 90)), random.random() * 100, random.random() * 5,
+                                  random.random() * 600]))
+
+    return dict(query=dict(dimensions=dimensions, metrics=metrics), data=data, total_rows=rows)
+
+
+def parse_by_rows(metrika_data):
+    """
+    Прежний построчный разбор ответа: словарь для каждой строки отчета.
+    """
+    list_of_dicts = []
+    dimensions_list = metrika_data['query']['dimensions']
+    metrics_list = metrika_data['query']['metrics']
+    for data_item in metrika_data['data']:
+        metrics_dict = {}
+        for i, dimension in enumerate(data_item['dimensions']):
+            metrics_dict[dimensions_list[i]] = dimension['name']
+        for i, metric in enumerate(data_item['metrics']):
+            metrics_dict[metrics_list[i]] = metric
+        list_of_dicts.append(metrics_dict)
+
+    metrika_df = pd.DataFrame(list_of_dicts)
+    metrika_df.columns = si.metrika_store_columns
+    return metrika_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('response', nargs='?', help='сохраненный ответ API Яндекс.Метрики (JSON)')
+    parser.add_argument('--rows', type=int, default=10000, help='количество строк синтетического ответа')
+    parser.add_argument('--repeat', type=int, default=20, help='количество повторов')
+    args = parser.parse_args()
+
+    if args.response:
+        with open(args.response, encoding='utf-8') as response_file:
+            metrika_data = json.load(response_file)
+    else:
+        metrika_data = make_response(rows=args.rows)
+
+    by_rows_df = parse_by_rows(metrika_data=metrika_data)
+    columnar_df = si.parse_metrika_page(metrika_data=metrika_data)
+    pd.testing.assert_frame_equal(by_rows_df.astype(columnar_df.dtypes.to_dict()), columnar_df)
+
+    by_rows = min(timeit.repeat(lambda: parse_by_rows(metrika_data=metrika_data), number=1, repeat=args.repeat))
+    columnar = min(timeit.repeat(lambda: si.parse_metrika_page(metrika_data=metrika_data), number=1,
+                                 repeat=args.repeat))
+
+    print(f'rows: {len(metrika_data["data"])}')
+    print(f'by rows:  {by_rows * 1000:.1f} ms')
+    print(f'columnar: {columnar * 1000:.1f} ms ({columnar / by_rows:.0%} of by rows)')
+
+
+if __name__ == '__main__':
+    main()
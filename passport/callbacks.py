@@ -1,12 +1,16 @@
 import datetime as dt
+from concurrent.futures import TimeoutError
 
 import dash
 import pandas as pd
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
+import passport.data_fetch as fetch
 import passport.figures as pf
 import passport.load_data as ld
 import passport.log_writer as lw
+import passport.result_cache as rc
 import passport.site_info as si
 import passport.load_cfg as lc
 from passport.figures import inf_sys_bar, colors_inf_system, inf_sys_heatmap
@@ -34,6 +38,27 @@ def register_callbacks(app):
         Output('period_choice', 'disabled'),
         Output('month_choice', 'disabled'),
         Output('week_choice', 'disabled'),
+        [Input('period_choice', 'start_date'),
+         Input('period_choice', 'end_date'),
+         Input('month_choice', 'value'),
+         Input('week_choice', 'value'),
+         Input('choice_type', 'value')
+         ])
+    def update_period_controls(start_date_user, end_date_user, choosen_month, choosen_week, choice_type_period):
+        period = parse_period(start_date=start_date_user,
+                              end_date=end_date_user,
+                              choosen_month=choosen_month,
+                              choosen_week=choosen_week,
+                              type_period=choice_type_period)
+
+        period_choice, week_choice, month_choice = ld.choosen_type(type_period=choice_type_period,
+                                                                   start_date=start_date_user,
+                                                                   end_date=end_date_user,
+                                                                   ch_month=period['month'],
+                                                                   ch_week=period['week'])
+        return period_choice, month_choice, week_choice
+
+    @app.callback(
         Output('users_figure', 'figure'),
         Output('tasks', 'children'),
         Output('tasks', 'style'),
@@ -47,8 +72,27 @@ def register_callbacks(app):
         Output('sue_avaria', 'style_data'),
         Output('table_top_etsp', 'data'),
         Output('table_top_sue', 'data'),
-        Output('site_stat', 'data'),
         Output('sue_avaria', 'tooltip_data'),
+        [Input('period_choice', 'start_date'),
+         Input('period_choice', 'end_date'),
+         Input('month_choice', 'value'),
+         Input('week_choice', 'value'),
+         Input('choice_type', 'value'),
+         Input('choice_period', 'value')
+         ])
+    def update_support_tab(start_date_user, end_date_user, choosen_month, choosen_week, choice_type_period, tab):
+        if tab != 'weeks':
+            raise PreventUpdate
+
+        period = parse_period(start_date=start_date_user,
+                              end_date=end_date_user,
+                              choosen_month=choosen_month,
+                              choosen_week=choosen_week,
+                              type_period=choice_type_period)
+        return get_cached_tab(namespace='support', func=get_support_tab, period=period)
+
+    @app.callback(
+        Output('site_stat', 'data'),
         Output('site_top_fig', 'figure'),
         Output('site_line_graph', 'figure'),
         Output('el_budget_graph', 'figure'),
@@ -59,187 +103,19 @@ def register_callbacks(app):
          Input('period_choice', 'end_date'),
          Input('month_choice', 'value'),
          Input('week_choice', 'value'),
-         Input('choice_type', 'value')
+         Input('choice_type', 'value'),
+         Input('choice_period', 'value')
          ])
-    def update_figure_user(start_date_user, end_date_user, choosen_month, choosen_week, choice_type_period):
+    def update_site_tab(start_date_user, end_date_user, choosen_month, choosen_week, choice_type_period, tab):
+        if tab != 's':
+            raise PreventUpdate
 
-        if len(choosen_week) == 7:
-            week, week_year = int(choosen_week[:2]), int(choosen_week[3:])
-        else:
-            week, week_year = int(choosen_week[:1]), int(choosen_week[2:])
-
-        if len(choosen_month) == 6:
-            month, month_year = int(choosen_month[:1]), int(choosen_month[2:])
-        else:
-            month, month_year = int(choosen_month[:2]), int(choosen_month[3:])
-
-        period_choice, week_choice, month_choice = ld.choosen_type(type_period=choice_type_period,
-                                                                   start_date=start_date_user,
-                                                                   end_date=end_date_user,
-                                                                   ch_month=month,
-                                                                   ch_week=week)
-
-        etsp_filtered_df = ld.get_filtered_df(table_name=lc.etsp_table_name,
-                                              start_date=start_date_user,
-                                              end_date=end_date_user,
-                                              month=month,
-                                              month_year=month_year,
-                                              week=week,
-                                              week_year=week_year,
-                                              type_period=choice_type_period)
-
-        sue_filtered_df = ld.get_filtered_df(table_name=lc.sue_table_name,
-                                             start_date=start_date_user,
-                                             end_date=end_date_user,
-                                             month=month,
-                                             month_year=month_year,
-                                             week=week,
-                                             week_year=week_year,
-                                             type_period=choice_type_period)
-
-        osp_filtered_df = ld.get_filtered_df(table_name=lc.osp_table_name,
-                                             start_date=start_date_user,
-                                             end_date=end_date_user,
-                                             month=month,
-                                             month_year=month_year,
-                                             week=week,
-                                             week_year=week_year,
-                                             type_period=choice_type_period)
-
-        sue_incidents_filtered_df = ld.get_filtered_incidents_df(start_date=start_date_user,
-                                                                 end_date=end_date_user,
-                                                                 month=month,
-                                                                 month_year=month_year,
-                                                                 week=week,
-                                                                 week_year=week_year,
-                                                                 type_period=choice_type_period)
-
-        etsp_prev_filt_df = ld.get_prev_filtered_df(table_name=lc.etsp_table_name,
-                                                    start_date=start_date_user,
-                                                    end_date=end_date_user,
-                                                    month=month,
-                                                    month_year=month_year,
-                                                    week=week,
-                                                    week_year=week_year,
-                                                    type_period=choice_type_period)
-
-        sue_prev_filt_df = ld.get_prev_filtered_df(table_name=lc.sue_table_name,
-                                                   start_date=start_date_user,
-                                                   end_date=end_date_user,
-                                                   month=month,
-                                                   month_year=month_year,
-                                                   week=week,
-                                                   week_year=week_year,
-                                                   type_period=choice_type_period)
-
-        osp_prev_filt_df = ld.get_prev_filtered_df(table_name=lc.osp_table_name,
-                                                   start_date=start_date_user,
-                                                   end_date=end_date_user,
-                                                   month=month,
-                                                   month_year=month_year,
-                                                   week=week,
-                                                   week_year=week_year,
-                                                   type_period=choice_type_period)
-
-        start_date_metrika, end_date_metrika = ld.get_date_for_metrika_df(start_date=start_date_user,
-                                                                          end_date=end_date_user,
-                                                                          ch_month=month,
-                                                                          ch_week=week,
-                                                                          type_period=choice_type_period)
-
-        filtered_metrika_df = si.get_site_info(start_date=start_date_metrika,
-                                               end_date=end_date_metrika)
-
-        filtered_site_visits_graph_df = si.get_data_visits_graph(df=filtered_metrika_df)
-
-        etsp_count_tasks = etsp_filtered_df['count_task'].sum()
-        sue_count_tasks = sue_filtered_df['count_task'].sum()
-        osp_count_tasks = osp_filtered_df['count_task'].sum()
-
-        etsp_prev_count_tasks = etsp_prev_filt_df['count_task'].sum()
-        sue_prev_count_tasks = sue_prev_filt_df['count_task'].sum()
-        osp_prev_count_tasks = osp_prev_filt_df['count_task'].sum()
-
-        etsp_avg_time = ld.count_mean_time(filtered_df=etsp_filtered_df)
-        sue_avg_time = ld.count_mean_time(filtered_df=sue_filtered_df)
-        osp_avg_time = ld.count_mean_time(filtered_df=osp_filtered_df)
-
-        visits = str(int(filtered_metrika_df['visits'].sum()))
-        users = str(int(filtered_metrika_df['users'].sum()))
-        pageviews = str(int(filtered_metrika_df['pageviews'].sum()))
-        bounce_rate = ''.join([str(round(filtered_metrika_df['bounceRate'].mean(), 2)), "%"])
-        page_depth = str(round(filtered_metrika_df['pageDepth'].mean(), 2))
-        avg_visit_dur_sec = str(dt.timedelta(seconds=round(
-            filtered_metrika_df['avgVisitDurationSeconds'].mean(), 0)))[2:]
-        site_stat_data = [{'Визиты': visits, 'Посетители': users, 'Просмотры': pageviews, 'Отказы': bounce_rate,
-                           'Глубина просмотра': page_depth, 'Время на сайте': avg_visit_dur_sec}]
-
-        budget_graph_df = si.get_el_budget_data(df=filtered_metrika_df,
-                                                names_el_budget=si.names_el_budget_dict)
-
-        gossluzba_df = si.get_gossluzba_data(df=filtered_metrika_df,
-                                             names_gossluzba=si.names_gossluzba_dict)
-        # --------------------------------------------FIGURES----------------------------------------------------------
-        fig_support = pf.plot_figure_support(first_tp_count_tasks=etsp_count_tasks,
-                                             second_tp_count_tasks=sue_count_tasks,
-                                             third_tp_count_tasks=osp_count_tasks)
-
-        site_line_graph = pf.plot_site_line_graph(df=filtered_metrika_df)
-
-        fig_site_top = pf.plot_fig_site_top(df=filtered_site_visits_graph_df)
-
-        support_pie_figure = pf.plot_support_pie_figure(first_filtered_df=etsp_filtered_df,
-                                                        second_filtered_df=sue_filtered_df,
-                                                        third_filtered_df=osp_filtered_df)
-
-        el_budget_graph = pf.plot_el_budget_graph(df=budget_graph_df,
-                                                  names_el_budget=si.names_el_budget_dict)
-
-        el_budget_graph_mean_time = pf.plot_el_budget_graph_mean_time(df=budget_graph_df,
-                                                                      names_el_budget=si.names_el_budget_dict)
-
-        gossluzba_pagedept_graph = pf.plot_gossluzba_graph_page_dept(df=gossluzba_df)
-
-        gossluzba_visits_graph = pf.visits_gossluzba_site(df=gossluzba_df)
-
-        # -----------------------------------DIFF-TASKS-AND-USERS------------------------------------------------------
-        total_curr_tasks = etsp_count_tasks + sue_count_tasks + osp_count_tasks
-        total_prev_tasks = etsp_prev_count_tasks + sue_prev_count_tasks + osp_prev_count_tasks
-        tasks_diff = total_curr_tasks - total_prev_tasks
-
-        diff_tasks = ld.set_differences(diff=tasks_diff)[1]
-        style_tasks = ld.set_differences(diff=tasks_diff)[0]
-        total_tasks = ''.join([str(total_curr_tasks), ' ( ', diff_tasks, ' )'])
-
-        total_curr_users = len(etsp_filtered_df['user'].unique()) + len(sue_filtered_df['user'].unique()) + len(
-            osp_filtered_df['user'].unique())
-        total_prev_users = len(etsp_prev_filt_df['user'].unique()) + len(sue_prev_filt_df['user'].unique()) + len(
-            osp_prev_filt_df['user'].unique())
-        users_diff = total_curr_users - total_prev_users
-
-        diff_users = ld.set_differences(diff=users_diff)[1]
-        style_users = ld.set_differences(diff=users_diff)[0]
-        total_users = ''.join([str(total_curr_users), ' ( ', diff_users, ' )'])
-
-        etsp_top_user_filtered_df = ld.top_user(etsp_filtered_df)
-        sue_top_user_filtered_df = ld.top_user(sue_filtered_df)
-
-        if len(sue_incidents_filtered_df) > 0:
-            style_data = dict(width='20%', backgroundColor='#ff847c')
-            tooltip_data = [{column: {'value': str(value), 'type': 'markdown'} for column, value in row.items()}
-                            for row in sue_incidents_filtered_df.to_dict('records')]
-
-        else:
-            style_data = dict(width='20%', backgroundColor='#c4fbdb')
-            sue_incidents_filtered_df = ld.no_incidents()
-            tooltip_data = sue_incidents_filtered_df.to_dict('records')
-
-        return (period_choice, month_choice, week_choice, fig_support, total_tasks, style_tasks, total_users,
-                style_users, etsp_avg_time, sue_avg_time, osp_avg_time, support_pie_figure,
-                sue_incidents_filtered_df.to_dict('records'), style_data, etsp_top_user_filtered_df.to_dict('records'),
-                sue_top_user_filtered_df.to_dict('records'), site_stat_data, tooltip_data, fig_site_top,
-                site_line_graph, el_budget_graph, el_budget_graph_mean_time, gossluzba_pagedept_graph,
-                gossluzba_visits_graph)
+        period = parse_period(start_date=start_date_user,
+                              end_date=end_date_user,
+                              choosen_month=choosen_month,
+                              choosen_week=choosen_week,
+                              type_period=choice_type_period)
+        return get_cached_tab(namespace='site', func=get_site_tab, period=period)
 
     @app.callback(
         Output("modal-scroll", "is_open"),
@@ -491,3 +367,268 @@ def register_callbacks(app):
             inf_systems_df = ld.load_inf_sys_data(conn_string=ld.engine)
             figure = inf_sys_heatmap(df=inf_systems_df, value=value)
         return figure
+
+
+def parse_period(start_date, end_date, choosen_month, choosen_week, type_period):
+    """
+    Синтаксис:
+    ----------
+    **parse_period** (start_date, end_date, choosen_month, choosen_week, type_period)
+
+    Описание:
+    ---------
+    Функция разбирает значения компонентов выбора периода (значения вида 'неделя_год' и 'месяц_год') и возвращает
+    словарь с параметрами периода, который передается в функции фильтрации.
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+        **choosen_month**: *str* - выбранный месяц
+
+        **choosen_week**: *str* - выбранная неделя
+
+        **type_period**: *str* - тип фильтрации ('w', 'm', 'p')
+
+    Returns:
+    ----------
+        **Dict**
+    """
+    if len(choosen_week) == 7:
+        week, week_year = int(choosen_week[:2]), int(choosen_week[3:])
+    else:
+        week, week_year = int(choosen_week[:1]), int(choosen_week[2:])
+
+    if len(choosen_month) == 6:
+        month, month_year = int(choosen_month[:1]), int(choosen_month[2:])
+    else:
+        month, month_year = int(choosen_month[:2]), int(choosen_month[3:])
+
+    return dict(start_date=start_date,
+                end_date=end_date,
+                month=month,
+                month_year=month_year,
+                week=week,
+                week_year=week_year,
+                type_period=type_period)
+
+
+def get_cached_tab(namespace, func, period):
+    """
+    Синтаксис:
+    ----------
+    **get_cached_tab** (namespace, func, period)
+
+    Описание:
+    ---------
+    Функция возвращает данные вкладки за выбранный период из кэша результатов (см. **passport.result_cache**),
+    рассчитывая их функцией func при отсутствии записи. Ключ записи содержит тип фильтрации и даты, от данных за
+    которые зависит результат (выбранный и предшествующий ему периоды), поэтому все пользователи, выбравшие один и тот
+    же период, получают одну и ту же запись. Перед чтением записей вкладки "Техподдержка" проверяется, не изменились ли
+    таблицы техподдержек (см. **ld.get_period_bounds**), а ключ записей вкладки "Сайт" содержит номер поколения
+    данных Яндекс.Метрики (см. **si.revalidate_gap**).
+
+    Параметры:
+    ----------
+        **namespace**: *str* - название вкладки ('support', 'site')
+
+        **func**: *callable* - функция расчета данных вкладки
+
+        **period**: *dict* - параметры периода (см. **parse_period**)
+
+    Returns:
+    ----------
+        **Tuple**
+    """
+    params = dict(type_period=period['type_period'])
+    if namespace in rc.tickets_namespaces:
+        ld.get_period_bounds()
+    else:
+        params['generation'] = si.revalidation_state['generation']
+    period_start, period_end = ld.get_period_range(**period)
+    prev_start = ld.get_prev_period_range(**period)[0]
+    key = rc.make_key(namespace=namespace,
+                      period_start=min(period_start, prev_start),
+                      period_end=period_end,
+                      params=params)
+    return rc.cached_call(key=key, func=func, kwargs=period)
+
+
+def get_support_tab(start_date, end_date, month, month_year, week, week_year, type_period):
+    """
+    Синтаксис:
+    ----------
+    **get_support_tab** (start_date, end_date, month, month_year, week, week_year, type_period)
+
+    Описание:
+    ---------
+    Функция рассчитывает данные вкладки "Работа с пользователями" за выбранный период: показатели техподдержек,
+    аварийные инциденты, ТОП пользователей и графики. Если загрузка данных не уложилась в отведенное время (см.
+    **fetch.fetch_all**), вкладка не обновляется (PreventUpdate), а результат не сохраняется в кэш.
+
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **ld.get_period_range**
+
+    Returns:
+    ----------
+        **Tuple**
+    """
+    period = dict(start_date=start_date,
+                  end_date=end_date,
+                  month=month,
+                  month_year=month_year,
+                  week=week,
+                  week_year=week_year,
+                  type_period=type_period)
+
+    try:
+        fetched = fetch.fetch_all(tasks={
+            'kpi': (ld.get_period_kpi, period),
+            'incidents': (ld.get_filtered_incidents_df, period)
+        })
+    except TimeoutError:
+        lw.log_writer(log_msg=f'Support tab for {period} is not updated: data fetch timed out')
+        raise PreventUpdate
+    kpi = fetched['kpi']
+    sue_incidents_filtered_df = fetched['incidents']
+
+    etsp_count_tasks = kpi['etsp']['count_tasks']
+    sue_count_tasks = kpi['sue']['count_tasks']
+    osp_count_tasks = kpi['osp']['count_tasks']
+
+    etsp_prev_count_tasks = kpi['etsp_prev']['count_tasks']
+    sue_prev_count_tasks = kpi['sue_prev']['count_tasks']
+    osp_prev_count_tasks = kpi['osp_prev']['count_tasks']
+
+    etsp_avg_time = ld.format_mean_time(duration=kpi['etsp']['mean_time'],
+                                        count_tasks=etsp_count_tasks)
+    sue_avg_time = ld.format_mean_time(duration=kpi['sue']['mean_time'],
+                                       count_tasks=sue_count_tasks)
+    osp_avg_time = ld.format_mean_time(duration=kpi['osp']['mean_time'],
+                                       count_tasks=osp_count_tasks)
+
+    # --------------------------------------------FIGURES--------------------------------------------------------------
+    fig_support = pf.plot_figure_support(first_tp_count_tasks=etsp_count_tasks,
+                                         second_tp_count_tasks=sue_count_tasks,
+                                         third_tp_count_tasks=osp_count_tasks)
+
+    support_pie_figure = pf.plot_support_pie_figure(first_tp_count_tasks=etsp_count_tasks,
+                                                    second_tp_count_tasks=sue_count_tasks,
+                                                    third_tp_count_tasks=osp_count_tasks)
+
+    # -----------------------------------DIFF-TASKS-AND-USERS----------------------------------------------------------
+    total_curr_tasks = etsp_count_tasks + sue_count_tasks + osp_count_tasks
+    total_prev_tasks = etsp_prev_count_tasks + sue_prev_count_tasks + osp_prev_count_tasks
+    tasks_diff = total_curr_tasks - total_prev_tasks
+
+    diff_tasks = ld.set_differences(diff=tasks_diff)[1]
+    style_tasks = ld.set_differences(diff=tasks_diff)[0]
+    total_tasks = ''.join([str(total_curr_tasks), ' ( ', diff_tasks, ' )'])
+
+    total_curr_users = kpi['etsp']['users'] + kpi['sue']['users'] + kpi['osp']['users']
+    total_prev_users = kpi['etsp_prev']['users'] + kpi['sue_prev']['users'] + kpi['osp_prev']['users']
+    users_diff = total_curr_users - total_prev_users
+
+    diff_users = ld.set_differences(diff=users_diff)[1]
+    style_users = ld.set_differences(diff=users_diff)[0]
+    total_users = ''.join([str(total_curr_users), ' ( ', diff_users, ' )'])
+
+    etsp_top_user_filtered_df = kpi['etsp']['top_users']
+    sue_top_user_filtered_df = kpi['sue']['top_users']
+
+    if len(sue_incidents_filtered_df) > 0:
+        style_data = dict(width='20%', backgroundColor='#ff847c')
+        tooltip_data = [{column: {'value': str(value), 'type': 'markdown'} for column, value in row.items()}
+                        for row in sue_incidents_filtered_df.to_dict('records')]
+
+    else:
+        style_data = dict(width='20%', backgroundColor='#c4fbdb')
+        sue_incidents_filtered_df = ld.no_incidents()
+        tooltip_data = sue_incidents_filtered_df.to_dict('records')
+
+    return (fig_support, total_tasks, style_tasks, total_users, style_users, etsp_avg_time, sue_avg_time,
+            osp_avg_time, support_pie_figure, sue_incidents_filtered_df.to_dict('records'), style_data,
+            etsp_top_user_filtered_df.to_dict('records'), sue_top_user_filtered_df.to_dict('records'), tooltip_data)
+
+
+def get_site_tab(start_date, end_date, month, month_year, week, week_year, type_period):
+    """
+    Синтаксис:
+    ----------
+    **get_site_tab** (start_date, end_date, month, month_year, week, week_year, type_period)
+
+    Описание:
+    ---------
+    Функция рассчитывает данные вкладки "Сайт" за выбранный период: сводную статистику и графики по данным
+    Яндекс.Метрики. Запрос к API выполняется только при открытой вкладке "Сайт". Если загрузка данных не уложилась
+    в отведенное время, вкладка не обновляется (PreventUpdate); начатая загрузка продолжается в пуле потоков и
+    заполняет локальное хранилище для следующего запроса.
+
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **ld.get_period_range**
+
+    Returns:
+    ----------
+        **Tuple**
+    """
+    start_date_metrika, end_date_metrika = ld.get_date_for_metrika_df(start_date=start_date,
+                                                                      end_date=end_date,
+                                                                      ch_month=month,
+                                                                      ch_week=week,
+                                                                      type_period=type_period)
+
+    try:
+        site_data = fetch.fetch_all(tasks={
+            'metrika': (si.get_site_plans, dict(start_date=start_date_metrika,
+                                                end_date=end_date_metrika))
+        })['metrika']
+    except TimeoutError:
+        lw.log_writer(log_msg=f'Site tab for {start_date_metrika} - {end_date_metrika} is not updated: '
+                              f'data fetch timed out')
+        raise PreventUpdate
+    filtered_metrika_df = site_data['sections']
+    stat_df = site_data['stat']
+
+    tagged_metrika_df = si.tag_metrika_sections(df=filtered_metrika_df)
+    filtered_site_visits_graph_df = si.get_data_visits_graph(df=tagged_metrika_df)
+
+    visits = str(int(stat_df['visits'].sum()))
+    users = str(int(stat_df['users'].sum()))
+    pageviews = str(int(stat_df['pageviews'].sum()))
+    bounce_rate = ''.join([str(round(stat_df['bounceRate'].mean(), 2)), "%"])
+    page_depth = str(round(stat_df['pageDepth'].mean(), 2))
+    avg_visit_dur_sec = str(dt.timedelta(seconds=round(
+        stat_df['avgVisitDurationSeconds'].mean(), 0)))[2:]
+    stale = any(df.attrs.get('stale') for df in site_data.values())
+    data_state = 'Устаревшие, обновляются' if stale else 'Актуальные'
+    site_stat_data = [{'Визиты': visits, 'Посетители': users, 'Просмотры': pageviews, 'Отказы': bounce_rate,
+                       'Глубина просмотра': page_depth, 'Время на сайте': avg_visit_dur_sec, 'Данные': data_state}]
+
+    budget_graph_df = si.get_el_budget_data(df=tagged_metrika_df,
+                                            names_el_budget=si.names_el_budget_dict)
+
+    gossluzba_df = si.get_gossluzba_data(df=tagged_metrika_df,
+                                         names_gossluzba=si.names_gossluzba_dict)
+    gossluzba_depth_df = si.get_gossluzba_depth_data(df=gossluzba_df)
+    gossluzba_visits_df = si.get_gossluzba_visits_data(df=site_data['pages'])
+    # --------------------------------------------FIGURES--------------------------------------------------------------
+    site_line_graph = pf.plot_site_line_graph(df=si.get_site_line_data(df=site_data['line']))
+
+    fig_site_top = pf.plot_fig_site_top(df=filtered_site_visits_graph_df)
+
+    el_budget_graph = pf.plot_el_budget_graph(df=budget_graph_df,
+                                              names_el_budget=si.names_el_budget_dict)
+
+    el_budget_graph_mean_time = pf.plot_el_budget_graph_mean_time(df=budget_graph_df,
+                                                                  names_el_budget=si.names_el_budget_dict)
+
+    gossluzba_pagedept_graph = pf.plot_gossluzba_graph_page_dept(df=gossluzba_depth_df)
+
+    gossluzba_visits_graph = pf.visits_gossluzba_site(df=gossluzba_visits_df)
+
+    return (site_stat_data, fig_site_top, site_line_graph, el_budget_graph, el_budget_graph_mean_time,
+            gossluzba_pagedept_graph, gossluzba_visits_graph)
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import passport.load_cfg as lc
+import passport.log_writer as lw
+
+fetch_pool = ThreadPoolExecutor(max_workers=lc.fetch_pool_size, thread_name_prefix='data_fetch')
+
+
+def timed_call(name, func, kwargs):
+    """
+    Синтаксис:
+    ----------
+    **timed_call** (name, func, kwargs)
+
+    Описание:
+    ---------
+    Функция вызывает func с именованными параметрами kwargs и записывает в лог-файл время выполнения вызова.
+
+    Параметры:
+    ----------
+        **name**: *str* - название загрузки для записи в лог-файл
+
+        **func**: *callable* - функция загрузки данных
+
+        **kwargs**: *dict* - именованные параметры функции
+
+    Returns:
+    ----------
+        Результат вызова func
+    """
+    started = time.perf_counter()
+    status = 'failed'
+    try:
+        result = func(**kwargs)
+        status = 'done'
+        return result
+    finally:
+        lw.log_writer(log_msg=f'Fetch "{name}" {status} in {time.perf_counter() - started:.3f} s')
+
+
+def fetch_all(tasks, timeouts=None, pool=None):
+    """
+    Синтаксис:
+    ----------
+    **fetch_all** (tasks, timeouts=None, pool=None)
+
+    Описание:
+    ---------
+    Функция одновременно передает все загрузки данных в пул потоков и дожидается их результатов. Время ожидания
+    каждой загрузки отсчитывается от момента ее постановки в пул и ограничено значением из timeouts (для загрузок,
+    отсутствующих в timeouts, - значением fetch_timeout из файла настроек). Если загрузка не уложилась в отведенное
+    время, вызывается исключение TimeoutError.
+
+    Параметры:
+    ----------
+        **tasks**: *dict* - словарь, в котором ключами являются названия загрузок, а значениями - кортежи
+        (функция, словарь именованных параметров)
+
+        **timeouts**: *dict*, default None - время ожидания (в секундах) для отдельных загрузок
+
+        **pool**: *ThreadPoolExecutor*, default None - пул потоков, по умолчанию используется fetch_pool
+
+    Returns:
+    ----------
+        **Dict** - словарь с результатами загрузок по их названиям
+    """
+    pool = fetch_pool if pool is None else pool
+    timeouts = {**lc.fetch_timeouts, **(timeouts or {})}
+
+    submitted_at = time.monotonic()
+    futures = {name: pool.submit(timed_call, name, func, kwargs) for name, (func, kwargs) in tasks.items()}
+
+    results = {}
+    for name, future in futures.items():
+        timeout = timeouts.get(name, lc.fetch_timeout)
+        try:
+            results[name] = future.result(timeout=max(submitted_at + timeout - time.monotonic(), 0))
+        except TimeoutError:
+            lw.log_writer(log_msg=f'Fetch "{name}" timed out after {timeout} s')
+            for pending in futures.values():
+                pending.cancel()
+            raise
+
+    lw.log_writer(log_msg=f'Fetch of {", ".join(tasks)} finished in {time.monotonic() - submitted_at:.3f} s')
+
+    return results
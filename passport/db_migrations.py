@@ -0,0 +1,250 @@
+from sqlalchemy import BigInteger, Column, Date, Float, Index, Integer, MetaData, String, Table, Text, inspect, text
+
+import passport.load_cfg as lc
+import passport.load_data as ld
+import passport.log_writer as lw
+import passport.site_info as si
+
+reg_date_indexes = {
+    f'ix_{lc.etsp_table_name}_reg_date': (lc.etsp_table_name, ['reg_date']),
+    f'ix_{lc.sue_table_name}_reg_date': (lc.sue_table_name, ['reg_date']),
+    f'ix_{lc.sue_table_name}_status_reg_date': (lc.sue_table_name, ['status', 'reg_date']),
+    f'ix_{lc.osp_table_name}_reg_date': (lc.osp_table_name, ['reg_date']),
+}
+
+
+def index_column(engine, table_name, column_name):
+    """
+    Синтаксис:
+    ----------
+    **index_column** (engine, table_name, column_name)
+
+    Описание:
+    ---------
+    Функция возвращает описание столбца для оператора CREATE INDEX. В MySQL текстовые столбцы (TEXT) могут входить
+    в индекс только с указанием длины префикса, поэтому для них указывается префикс длиной 64 символа.
+
+    Параметры:
+    ----------
+        **engine**: *Engine* - подключение к БД
+
+        **table_name**: *str* - название таблицы
+
+        **column_name**: *str* - название столбца
+
+    Returns:
+    ----------
+        **String**
+    """
+    if engine.dialect.name == 'mysql':
+        columns = {column['name']: column['type'] for column in inspect(engine).get_columns(table_name)}
+        if 'TEXT' in str(columns[column_name]).upper():
+            return f'{column_name}(64)'
+    return column_name
+
+
+def create_reg_date_indexes(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **create_reg_date_indexes** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция создает в таблицах техподдержек индексы по дате регистрации обращения (reg_date), а в таблице СУЭ ФК
+    дополнительно составной индекс (status, reg_date) для отбора аварийных инцидентов. Уже существующие индексы
+    пропускаются, поэтому функцию можно запускать повторно. Возвращает список созданных индексов.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        **List**
+    """
+    inspector = inspect(engine)
+    created = []
+    with engine.begin() as connection:
+        for index_name, (table_name, columns) in reg_date_indexes.items():
+            existing = [index['name'] for index in inspector.get_indexes(table_name)]
+            if index_name in existing:
+                continue
+            columns_sql = ', '.join([index_column(engine, table_name, column) for column in columns])
+            connection.execute(text(f'CREATE INDEX {index_name} ON {table_name} ({columns_sql})'))
+            created.append(index_name)
+            lw.log_writer(log_msg=f'Index {index_name} created on {table_name} ({columns_sql})')
+
+    return created
+
+
+def create_ticket_daily_rollup(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **create_ticket_daily_rollup** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция создает таблицу ежедневных агрегатов по обращениям в техподдержки (ticket_daily_rollup) с индексом
+    (line, day), если таблица еще не создана. Таблица заполняется функцией **update_ticket_rollup** модуля
+    passport.load_data.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        **Table**
+    """
+    metadata = MetaData()
+    rollup_table = Table(ld.rollup_table_name, metadata,
+                         Column('day', Date, nullable=False),
+                         Column('line', String(8), nullable=False),
+                         Column('user', String(255)),
+                         Column('unit', String(255)),
+                         Column('count_task', Integer),
+                         Column('resolution_seconds', BigInteger),
+                         Column('resolution_count', Integer),
+                         Index(f'ix_{ld.rollup_table_name}_line_day', 'line', 'day'))
+    metadata.create_all(engine, checkfirst=True)
+    lw.log_writer(log_msg=f'Table {ld.rollup_table_name} is ready')
+
+    return rollup_table
+
+
+def add_resolution_seconds(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **add_resolution_seconds** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция добавляет в таблицы техподдержек целочисленный столбец resolution_seconds (время выполнения заявки в
+    секундах), если он еще не добавлен, и заполняет его по текстовому столбцу timedelta.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        None
+    """
+    inspector = inspect(engine)
+    for line, table_name in ld.support_lines:
+        columns = [column['name'] for column in inspector.get_columns(table_name)]
+        if 'resolution_seconds' not in columns:
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN resolution_seconds BIGINT'))
+            lw.log_writer(log_msg=f'Column resolution_seconds added to {table_name}')
+
+    backfill_resolution_seconds(engine=engine)
+
+
+def backfill_resolution_seconds(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **backfill_resolution_seconds** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция приводит столбец resolution_seconds таблиц техподдержек в соответствие с текстовым столбцом timedelta:
+    заполняет его у новых обращений и пересчитывает у обращений, время выполнения которых изменилось. Обновление
+    выполняется одним запросом UPDATE на таблицу на стороне БД. Функция запускается при миграции и заданием
+    python -m passport.jobs backfill (а также перед пересчетом ticket_daily_rollup); приложение столбец не изменяет,
+    а для обращений, у которых он еще не заполнен, рассчитывает время выполнения по timedelta (см.
+    **ld.resolution_seconds_sql**). Возвращает количество обновленных обращений.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        **int**
+    """
+    updated = {}
+    with engine.begin() as connection:
+        for line, table_name in ld.support_lines:
+            updated[line] = connection.execute(text(f"""
+                UPDATE {table_name}
+                SET resolution_seconds = {ld.timedelta_seconds_sql}
+                WHERE timedelta IS NOT NULL AND NOT (resolution_seconds <=> {ld.timedelta_seconds_sql})
+            """)).rowcount
+    if any(updated.values()):
+        lw.log_writer(log_msg=f'resolution_seconds synchronized: {updated}')
+
+    return sum(updated.values())
+
+
+def create_metrika_daily(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **create_metrika_daily** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция создает таблицу ежедневных данных Яндекс.Метрики (metrika_daily) с индексом по дате, если таблица еще не
+    создана. Таблица заполняется функцией **sync_metrika_daily** модуля passport.site_info.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        **Table**
+    """
+    metadata = MetaData()
+    metrika_table = Table(si.metrika_table_name, metadata,
+                          Column('date', Date, nullable=False),
+                          Column('level1', Text),
+                          Column('level2', Text),
+                          Column('level3', Text),
+                          Column('level4', Text),
+                          Column('start_url', Text),
+                          Column('visits', Integer),
+                          Column('users', Integer),
+                          Column('pageviews', Integer),
+                          Column('bounce_rate', Float),
+                          Column('page_depth', Float),
+                          Column('avg_visit_duration_seconds', Float),
+                          Index(f'ix_{si.metrika_table_name}_date', 'date'))
+    metadata.create_all(engine, checkfirst=True)
+    lw.log_writer(log_msg=f'Table {si.metrika_table_name} is ready')
+
+    return metrika_table
+
+
+def migrate(engine=ld.engine):
+    """
+    Синтаксис:
+    ----------
+    **migrate** (engine=ld.engine)
+
+    Описание:
+    ---------
+    Функция последовательно выполняет все миграции БД. Каждая миграция пропускает уже выполненные изменения, поэтому
+    функцию можно запускать повторно.
+
+    Параметры:
+    ----------
+        **engine**: *Engine*, default ld.engine - подключение к БД
+
+    Returns:
+    ----------
+        None
+    """
+    create_reg_date_indexes(engine=engine)
+    create_ticket_daily_rollup(engine=engine)
+    add_resolution_seconds(engine=engine)
+    create_metrika_daily(engine=engine)
+
+
+if __name__ == '__main__':
+    migrate()
@@ -1,11 +1,73 @@
 import datetime as dt
+import functools
+import itertools
 
 import plotly.graph_objects as go
 
+import passport.result_cache as rc
+
 colors_inf_system = ['#5d61a2', '#93cdd1', '#a7d0b8', '#dcdcd7', '#d598a0', '#760043', '#c4b052', '#bb4e51', '#c26ca9',
                      '#0b7fab', '#f4d75e', '#e9723d']
 
+# Шаблон оформления проверяется plotly один раз при загрузке модуля; графики собираются словарями без проверки
+figure_template = go.Figure().to_plotly_json()['layout']
+figure_background = dict(paper_bgcolor='#ebecf1',
+                         plot_bgcolor='#ebecf1')
+figure_textfont = dict(size=10,
+                       family='Arial Black')
+
+
+def make_figure(data, **layout):
+    """
+    Синтаксис:
+    ----------
+    **make_figure** (data, **layout)
+
+    Описание:
+    ---------
+    Функция собирает описание графика в виде словаря {'data': ..., 'layout': ...}, который dcc.Graph принимает
+    вместо go.Figure. Трассы и параметры оформления передаются в том виде, в котором их возвращает
+    go.Figure.to_plotly_json(), поэтому построение и сериализация графика не требуют проверки каждого свойства
+    средствами plotly. К оформлению добавляется общий шаблон figure_template.
+
+    Параметры:
+    ----------
+        **data**: *list* - трассы графика (словари с ключом 'type')
+
+        **layout**: - параметры оформления графика
+
+    Returns:
+    ----------
+        **dict**
+    """
+    return dict(data=data, layout=dict(figure_template, **layout))
+
+
+@functools.lru_cache(maxsize=None)
+def get_colorscale(name):
+    """
+    Синтаксис:
+    ----------
+    **get_colorscale** (name)
+
+    Описание:
+    ---------
+    Функция возвращает цветовую шкалу plotly по ее названию (в том числе обратную, с суффиксом '_r') в виде списка
+    пар [доля, цвет]. Названия шкал plotly.js поддерживает не все, поэтому шкала раскрывается заранее; результат
+    кэшируется.
+
+    Параметры:
+    ----------
+        **name**: *str* - название цветовой шкалы
 
+    Returns:
+    ----------
+        **list**
+    """
+    return [list(step) for step in go.Heatmap(colorscale=name).colorscale]
+
+
+@rc.cached_figure
 def plot_figure_support(first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks):
     """
     Синтаксис:
@@ -27,34 +89,33 @@ def plot_figure_support(first_tp_count_tasks, second_tp_count_tasks, third_tp_co
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    fig_support = go.Figure(go.Bar(y=[first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks],
-                                   x=['ЕЦП', 'СУЭ ФК', 'ОСП'],
-                                   base=0,
-                                   marker=dict(color=['#a92b2b', '#37a17c', '#a2d5f2']),
-                                   text=[first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks],
-                                   textposition='auto'))
-    fig_support.update_layout(autosize=True,
-                              legend=dict(orientation="h",
-                                          yanchor="bottom",
-                                          y=0.2,
-                                          xanchor="right",
-                                          x=0.5),
-                              paper_bgcolor='#ebecf1',
-                              plot_bgcolor='#ebecf1'
-                              )
-    fig_support.update_xaxes(ticks="inside",
-                             tickson="boundaries")
-
-    return fig_support
-
-
-def plot_support_pie_figure(first_filtered_df, second_filtered_df, third_filtered_df):
+    counts = [first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks]
+    return make_figure(data=[dict(type='bar',
+                                  y=counts,
+                                  x=['ЕЦП', 'СУЭ ФК', 'ОСП'],
+                                  base=0,
+                                  marker=dict(color=['#a92b2b', '#37a17c', '#a2d5f2']),
+                                  text=counts,
+                                  textposition='auto')],
+                       autosize=True,
+                       legend=dict(orientation="h",
+                                   yanchor="bottom",
+                                   y=0.2,
+                                   xanchor="right",
+                                   x=0.5),
+                       xaxis=dict(ticks="inside",
+                                  tickson="boundaries"),
+                       **figure_background)
+
+
+@rc.cached_figure
+def plot_support_pie_figure(first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks):
     """
     Синтаксис:
     ----------
-    **plot_support_pie_figure** (first_filtered_df, second_filtered_df, third_filtered_df)
+    **plot_support_pie_figure** (first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks)
 
     Описание:
     ---------
@@ -63,34 +124,30 @@ def plot_support_pie_figure(first_filtered_df, second_filtered_df, third_filtere
 
     Параметры:
     ----------
-        **first_filtered_df**: *DataFrame* - датафрейм содержащий информацию об обращениях в техподдержку ЕЦП
+        **first_tp_count_tasks**: *int* - количество задач по техподдержке ЕЦП
 
-        **second_filtered_df**: *DataFrame* - датафрейм содержащий информацию об обращениях в техподдержку СУЭ ФК
+        **second_tp_count_tasks**: *int* - количество задач по техподдержке СУЭ ФК
 
-        **third_filtered_df**: *DataFrame* - датафрейм содержащий информацию об обращениях в техподдержку ОСП
+        **third_tp_count_tasks**: *int* - количество задач по техподдержке ОСП
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
     support_pie_figure_labels = ["ЕЦП", "СУЭ ФК", "ОСП"]
-    support_pie_figure_values = [first_filtered_df['count_task'].sum(), second_filtered_df['count_task'].sum(),
-                                 third_filtered_df['count_task'].sum()]
+    support_pie_figure_values = [first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks]
     support_pie_figure_colors = ['#a92b2b', '#37a17c', '#a2d5f2']
 
-    support_pie_figure = go.Figure(
-        go.Pie(labels=support_pie_figure_labels,
-               values=support_pie_figure_values,
-               marker_colors=support_pie_figure_colors))
-
-    support_pie_figure.update_traces(hoverinfo="label+percent")
-
-    support_pie_figure.update_layout(paper_bgcolor='#ebecf1',
-                                     showlegend=True)
-
-    return support_pie_figure
+    return make_figure(data=[dict(type='pie',
+                                  labels=support_pie_figure_labels,
+                                  values=support_pie_figure_values,
+                                  marker=dict(colors=support_pie_figure_colors),
+                                  hoverinfo="label+percent")],
+                       paper_bgcolor=figure_background['paper_bgcolor'],
+                       showlegend=True)
 
 
+@rc.cached_figure
 def plot_fig_site_top(df):
     """
     Синтаксис:
@@ -108,22 +165,22 @@ def plot_fig_site_top(df):
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
     site_top_figure_colors = ['#003b32', '#40817a', '#afbaa3', '#d0d0b8', '#037c87', '#7cbdc9']
-    fig_site_top = go.Figure([go.Bar(y=df['visits'],
-                                     x=df['level2'],
-                                     orientation='v',
-                                     marker_color=site_top_figure_colors,
-                                     text=df['visits'])])
-    fig_site_top.update_traces(textposition='auto')
-    fig_site_top.update_layout(title_text="Визиты",
-                               paper_bgcolor='#ebecf1',
-                               plot_bgcolor='#ebecf1')
-
-    return fig_site_top
-
-
+    visits = df['visits'].tolist()
+    return make_figure(data=[dict(type='bar',
+                                  y=visits,
+                                  x=df['level2'].tolist(),
+                                  orientation='v',
+                                  marker=dict(color=site_top_figure_colors),
+                                  text=visits,
+                                  textposition='auto')],
+                       title=dict(text="Визиты"),
+                       **figure_background)
+
+
+@rc.cached_figure
 def plot_site_line_graph(df):
     """
     Синтаксис:
@@ -137,45 +194,29 @@ def plot_site_line_graph(df):
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм содержащий информацию о визитах, полученная из Яндекс.Метрики
+        **df**: *DataFrame* - количество визитов, посетителей и просмотров по дням (см. **si.get_site_line_data**)
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    site_line_graph = go.Figure(data=[
-        go.Scatter(y=list(df.groupby(['date'])['visits'].sum()),
-                   x=list(df.groupby(['date'])['visits'].sum().index),
-                   mode='lines+markers',
-                   marker=dict(color='#5d4b63',
-                               size=6),
-                   line=dict(color='#5d4b63',
-                             width=5),
-                   name='Визиты'),
-        go.Scatter(y=list(df.groupby(['date'])['users'].sum()),
-                   x=list(df.groupby(['date'])['users'].sum().index),
-                   mode='lines+markers',
-                   marker=dict(color='#d74d63',
-                               size=6),
-                   line=dict(color='#d74d63',
-                             width=5),
-                   name='Пользователи'),
-        go.Scatter(y=list(df.groupby(['date'])['pageviews'].sum()),
-                   x=list(df.groupby(['date'])['pageviews'].sum().index),
-                   mode='lines+markers',
-                   marker=dict(color='#a38182',
-                               size=6),
-                   line=dict(color='#a38182',
-                             width=5),
-                   name='Просмотры страниц')
-    ])
-    site_line_graph.update_layout(title_text="Посещение сайта",
-                                  paper_bgcolor='#ebecf1',
-                                  plot_bgcolor='#ebecf1')
-
-    return site_line_graph
-
-
+    traces = [('visits', 'Визиты', '#5d4b63'), ('users', 'Пользователи', '#d74d63'),
+              ('pageviews', 'Просмотры страниц', '#a38182')]
+    dates = df.index.tolist()
+    return make_figure(data=[dict(type='scatter',
+                                  y=df[column].tolist(),
+                                  x=dates,
+                                  mode='lines+markers',
+                                  marker=dict(color=color,
+                                              size=6),
+                                  line=dict(color=color,
+                                            width=5),
+                                  name=name) for column, name, color in traces],
+                       title=dict(text="Посещение сайта"),
+                       **figure_background)
+
+
+@rc.cached_figure
 def fig_inf_systems(inf_systems_data, legend_sw):
     """
        Синтаксис:
@@ -199,27 +240,25 @@ def fig_inf_systems(inf_systems_data, legend_sw):
 
        Returns:
        ----------
-           **Figure**
+           **dict**
        """
-    fig_inf_sys = go.Figure()
-    for num in range(len(inf_systems_data)):
-        fig_inf_sys.add_trace(go.Bar(y=inf_systems_data.columns,
-                                     x=inf_systems_data.iloc[num],
-                                     name=inf_systems_data.index[num],
-                                     orientation='h',
-                                     text=inf_systems_data.iloc[num],
-                                     textposition='inside'))
-        fig_inf_sys.update_layout(barmode='stack',
-                                  height=1000,
-                                  legend_xanchor='right',
-                                  paper_bgcolor='#ebecf1',
-                                  plot_bgcolor='#ebecf1',
-                                  showlegend=legend_sw)
-        fig_inf_sys.update_yaxes(tickmode="linear")
-
-    return fig_inf_sys
-
-
+    systems = inf_systems_data.columns.tolist()
+    return make_figure(data=[dict(type='bar',
+                                  y=systems,
+                                  x=row.tolist(),
+                                  name=name,
+                                  orientation='h',
+                                  text=row.tolist(),
+                                  textposition='inside') for name, row in inf_systems_data.iterrows()],
+                       barmode='stack',
+                       height=1000,
+                       legend=dict(xanchor='right'),
+                       showlegend=legend_sw,
+                       yaxis=dict(tickmode="linear"),
+                       **figure_background)
+
+
+@rc.cached_figure
 def plot_el_budget_graph(df, names_el_budget):
     """
     Синтаксис:
@@ -229,40 +268,37 @@ def plot_el_budget_graph(df, names_el_budget):
     Описание:
     ---------
     Функция отвечает за построение графика (гистограмма) отображающего среднюю глубину просмотра каждого подраздела
-    в разделе сайта "Электронный бюджет"
+    в разделе сайта "Электронный бюджет". Столбцы и их цвета следуют порядку названий в names_el_budget
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм содержащий информацию о глубине просмотра раздела сайта "Электронный бюджет",
-        полученную из Яндекс.Метрики
+        **df**: *DataFrame* - средние значения по подразделам раздела сайта "Электронный бюджет"
+        (см. **si.get_el_budget_data**)
 
         **names_el_budget**: *dict* - словарь, в котором ключами являются часть пути по которому расположена страница
         (3 уровень), а значением - название раздела на русском языке
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    colors = ['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006']
-    fig = go.Figure()
-    for num in range(len(df.groupby(['level3'])[['pageDepth']].mean().pageDepth)):
-        fig.add_trace(go.Bar(
-            name=list(names_el_budget.values())[num],
-            x=[''],
-            y=[round(df.groupby(['level3'])[['pageDepth']].mean().pageDepth[num], 1)],
-            marker=dict(color=colors[num]),
-            text=[round(df.groupby(['level3'])[['pageDepth']].mean().pageDepth[num], 1)],
-            textposition='outside'))
-    fig.update_traces(textfont_size=10,
-                      textfont_family='Arial Black')
-    fig.update_layout(title_text='Глубина просмотра раздела "Электронный бюджет"',
-                      paper_bgcolor='#ebecf1',
-                      plot_bgcolor='#ebecf1',
-                      title_xref='paper')
-
-    return fig
-
-
+    colors = itertools.cycle(['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006'])
+    page_depth = df['pageDepth'].round(1)
+    return make_figure(data=[dict(type='bar',
+                                  name=name,
+                                  x=[''],
+                                  y=[page_depth[name]],
+                                  marker=dict(color=color),
+                                  text=[page_depth[name]],
+                                  textposition='outside',
+                                  textfont=figure_textfont)
+                             for name, color in zip(names_el_budget.values(), colors) if name in page_depth.index],
+                       title=dict(text='Глубина просмотра раздела "Электронный бюджет"',
+                                  xref='paper'),
+                       **figure_background)
+
+
+@rc.cached_figure
 def plot_el_budget_graph_mean_time(df, names_el_budget):
     """
     Синтаксис:
@@ -273,44 +309,39 @@ def plot_el_budget_graph_mean_time(df, names_el_budget):
     ---------
 
     Функция отвечает за построение графика (гистограмма) отображающего среднюю продолжительность визита по каждому
-    подразделу в разделе сайта "Электронный бюджет"
+    подразделу в разделе сайта "Электронный бюджет". Столбцы и их цвета следуют порядку названий в names_el_budget
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм содержащий информацию о глубине просмотра раздела сайта "Электронный бюджет",
-        полученную из Яндекс.Метрики
+        **df**: *DataFrame* - средние значения по подразделам раздела сайта "Электронный бюджет"
+        (см. **si.get_el_budget_data**)
 
         **names_el_budget**: *dict* - словарь, в котором ключами являются часть пути, по которому расположена страница
         (3 уровень), а значением - название раздела на русском языке
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    colors = ['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006']
-    fig = go.Figure()
-    for num in range(len(df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds)):
-        fig.add_trace(go.Bar(
-            name=list(names_el_budget.values())[num],
-            x=[''],
-            y=[round(df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds[num] // 60 + (
-                    df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds[num] % 60 / 100),
-                     2)],
-            marker=dict(color=colors[num]),
-            text=[str(dt.timedelta(seconds=round(
-                df.groupby(['level3'])[['avgVisitDurationSeconds']].mean().avgVisitDurationSeconds[num])))[2:]],
-            textposition='outside'))
-    fig.update_traces(textfont_size=10,
-                      textfont_family='Arial Black',
-                      showlegend=False)
-    fig.update_layout(title_text='Средняя продолжительность визита',
-                      paper_bgcolor='#ebecf1',
-                      plot_bgcolor='#ebecf1',
-                      title_xref='paper')
-
-    return fig
-
-
+    colors = itertools.cycle(['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006'])
+    duration = df['avgVisitDurationSeconds']
+    minutes = (duration // 60 + duration % 60 / 100).round(2)
+    return make_figure(data=[dict(type='bar',
+                                  name=name,
+                                  x=[''],
+                                  y=[minutes[name]],
+                                  marker=dict(color=color),
+                                  text=[str(dt.timedelta(seconds=round(duration[name])))[2:]],
+                                  textposition='outside',
+                                  textfont=figure_textfont,
+                                  showlegend=False)
+                             for name, color in zip(names_el_budget.values(), colors) if name in duration.index],
+                       title=dict(text='Средняя продолжительность визита',
+                                  xref='paper'),
+                       **figure_background)
+
+
+@rc.cached_figure
 def plot_gossluzba_graph_page_dept(df):
     """
     Синтаксис:
@@ -320,38 +351,33 @@ def plot_gossluzba_graph_page_dept(df):
     Описание:
     ---------
     Функция отвечает за построение графика (гистограмма) отображающего среднюю глубину просмотра по каждому подразделу
-    в разделе сайта "Государственная служба в МБУ ФК"
+    в разделе сайта "Государственная служба в МБУ ФК". Если подразделов больше, чем цветов, цвета повторяются по кругу
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм содержащий информацию о глубине просмотра раздела сайта "Государственная служба
-        в МБУ ФК", полученную из Яндекс.Метрики
+        **df**: *Series* - средняя глубина просмотра по подразделам раздела сайта "Государственная служба в МБУ ФК"
+        (см. **si.get_gossluzba_depth_data**)
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    colors = ['#98bfad', '#ffc4b2', '#ffffcc']
-    fig = go.Figure()
-    for num in range(len(df.groupby(['startURL'])[['pageDepth']].mean().pageDepth)):
-        fig.add_trace(go.Bar(
-            name=df.groupby('startURL').pageDepth.sum().index[num],
-            x=[''],
-            y=[round(df.groupby(['startURL'])[['pageDepth']].mean().pageDepth[num], 2)],
-            marker=dict(color=colors[num]),
-            text=[round(df.groupby(['startURL']).mean().pageDepth[num], 1)],
-            textposition='outside'))
-    fig.update_traces(textfont_size=10,
-                      textfont_family='Arial Black',
-                      showlegend=True)
-    fig.update_layout(title_text='Глубина просмотра раздела "Государственная служба в МБУ ФК"',
-                      paper_bgcolor='#ebecf1',
-                      plot_bgcolor='#ebecf1',
-                      title_xref='paper')
-
-    return fig
-
-
+    colors = itertools.cycle(['#98bfad', '#ffc4b2', '#ffffcc'])
+    return make_figure(data=[dict(type='bar',
+                                  name=name,
+                                  x=[''],
+                                  y=[round(value, 2)],
+                                  marker=dict(color=color),
+                                  text=[round(value, 1)],
+                                  textposition='outside',
+                                  textfont=figure_textfont,
+                                  showlegend=True) for name, value, color in zip(df.index, df, colors)],
+                       title=dict(text='Глубина просмотра раздела "Государственная служба в МБУ ФК"',
+                                  xref='paper'),
+                       **figure_background)
+
+
+@rc.cached_figure
 def visits_gossluzba_site(df):
     """
     Синтаксис:
@@ -363,82 +389,70 @@ def visits_gossluzba_site(df):
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм содержащий информацию о глубине просмотра раздела сайта "Государственная служба
-        в МБУ ФК", полученную из Яндекс.Метрики
+        **df**: *DataFrame* - количество визитов и посетителей раздела сайта "Государственная служба в МБУ ФК" по дням
+        (см. **si.get_gossluzba_visits_data**)
 
     Returns:
     ----------
-        **Figure**
+        **dict**
     """
-    fig = go.Figure(data=[
-        go.Scatter(y=list(df.groupby(['date'])['users'].sum()),
-                   x=list(df.groupby(['date'])['users'].sum().index),
-                   mode='lines+markers',
-                   marker=dict(color='#4eac01',
-                               size=6),
-                   line=dict(color='#4eac01',
-                             width=5),
-                   name='Визиты'),
-        go.Scatter(y=list(df.groupby(['date'])['visits'].sum()),
-                   x=list(df.groupby(['date'])['visits'].sum().index),
-                   mode='lines+markers',
-                   marker=dict(color='#e93667',
-                               size=6),
-                   line=dict(color='#e93667',
-                             width=5),
-                   name='Пользователи')
-    ])
-    fig.update_traces(textfont_size=10,
-                      textfont_family='Arial Black',
-                      showlegend=True)
-    fig.update_layout(title_text='Посещение раздела "Государственная служба в МБУ ФК"',
-                      paper_bgcolor='#ebecf1',
-                      plot_bgcolor='#ebecf1',
-                      title_xref='paper')
-    return fig
-
-
+    traces = [('users', 'Визиты', '#4eac01'), ('visits', 'Пользователи', '#e93667')]
+    dates = df.index.tolist()
+    return make_figure(data=[dict(type='scatter',
+                                  y=df[column].tolist(),
+                                  x=dates,
+                                  mode='lines+markers',
+                                  marker=dict(color=color,
+                                              size=6),
+                                  line=dict(color=color,
+                                            width=5),
+                                  name=name,
+                                  textfont=figure_textfont,
+                                  showlegend=True) for column, name, color in traces],
+                       title=dict(text='Посещение раздела "Государственная служба в МБУ ФК"',
+                                  xref='paper'),
+                       **figure_background)
+
+
+@rc.cached_figure
 def fig_total(df, colors):
-
-    fig = go.Figure()
-    for i in range(len(df.columns)):
-        fig.add_trace(go.Bar(x=[df.columns[i]],
-                             y=[df[df.columns[i]].sum()],
-                             name=df.columns[i],
-                             marker_color=colors[i],
-                             text=str(df[df.columns[i]].sum()),
-                             textposition='inside'))
-        fig.update_layout(barmode='stack',
-                          legend_xanchor='right',
-                          paper_bgcolor='#ebecf1',
-                          plot_bgcolor='#ebecf1',
-                          showlegend=False)
-    return fig
-
-
+    totals = df.sum()
+    return make_figure(data=[dict(type='bar',
+                                  x=[column],
+                                  y=[total],
+                                  name=column,
+                                  marker=dict(color=color),
+                                  text=str(total),
+                                  textposition='inside')
+                             for column, total, color in zip(totals.index, totals.tolist(), colors)],
+                       barmode='stack',
+                       legend=dict(xanchor='right'),
+                       showlegend=False,
+                       **figure_background)
+
+
+@rc.cached_figure
 def inf_sys_heatmap(df, value):
-    fig_heatmap = go.Figure(data=go.Heatmap(
-        z=[df.loc[i].to_list() for i in df.index],
-        y=df.index,
-        x=df.columns,
-        colorscale=value))
-    fig_heatmap.update_layout(height=700,
-                              legend_xanchor='right',
-                              paper_bgcolor='#ebecf1',
-                              plot_bgcolor='#ebecf1')
-    return fig_heatmap
+    return make_figure(data=[dict(type='heatmap',
+                                  z=[df.loc[i].to_list() for i in df.index],
+                                  y=df.index.tolist(),
+                                  x=df.columns.tolist(),
+                                  colorscale=get_colorscale(name=value))],
+                       height=700,
+                       legend=dict(xanchor='right'),
+                       **figure_background)
 
 
+@rc.cached_figure
 def inf_sys_bar(df, colors, value):
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=df.columns,
-                         y=df.loc[value],
-                         marker_color=colors,
-                         text=df.loc[value]))
-    fig.update_traces(textposition='auto')
-    fig.update_layout(barmode='stack',
-                      legend_xanchor='right',
-                      paper_bgcolor='#ebecf1',
-                      plot_bgcolor='#ebecf1',
-                      showlegend=False)
-    return fig
+    values = df.loc[value].tolist()
+    return make_figure(data=[dict(type='bar',
+                                  x=df.columns.tolist(),
+                                  y=values,
+                                  marker=dict(color=colors),
+                                  text=values,
+                                  textposition='auto')],
+                       barmode='stack',
+                       legend=dict(xanchor='right'),
+                       showlegend=False,
+                       **figure_background)
@@ -0,0 +1,110 @@
+import argparse
+
+import passport.db_migrations as dm
+import passport.load_data as ld
+import passport.log_writer as lw
+import passport.site_info as si
+
+
+def run_backfill(args):
+    """
+    Синтаксис:
+    ----------
+    **run_backfill** (args)
+
+    Описание:
+    ---------
+    Задание синхронизирует столбец resolution_seconds со столбцом timedelta в таблицах техподдержек.
+
+    Returns:
+    ----------
+        None
+    """
+    values = dm.backfill_resolution_seconds()
+    print(f'resolution_seconds: {values} tickets updated')
+
+
+def run_rollup(args):
+    """
+    Синтаксис:
+    ----------
+    **run_rollup** (args)
+
+    Описание:
+    ---------
+    Задание пересчитывает таблицу ежедневных агрегатов по обращениям в техподдержки за последние args.days дней
+    (при args.full - за всю историю). Перед пересчетом синхронизируется столбец resolution_seconds.
+
+    Returns:
+    ----------
+        None
+    """
+    run_backfill(args=args)
+    rows = ld.update_ticket_rollup(days=0 if args.full else args.days)
+    print(f'ticket_daily_rollup: {rows} rows written')
+
+
+def run_metrika(args):
+    """
+    Синтаксис:
+    ----------
+    **run_metrika** (args)
+
+    Описание:
+    ---------
+    Задание загружает ежедневные данные Яндекс.Метрики в таблицу metrika_daily: по умолчанию - начиная с последнего
+    загруженного дня, при args.days - за последние args.days дней, при args.full - за всю историю.
+
+    Returns:
+    ----------
+        None
+    """
+    rows = si.sync_metrika_daily(days=0 if args.full else args.days)
+    print(f'{si.metrika_table_name}: {rows} rows written')
+
+
+def main(argv=None):
+    """
+    Синтаксис:
+    ----------
+    **main** (argv=None)
+
+    Описание:
+    ---------
+    Точка входа для запуска фоновых заданий по расписанию (например, из cron):
+
+        python -m passport.jobs backfill
+
+        python -m passport.jobs rollup [--days N | --full]
+
+        python -m passport.jobs metrika [--days N | --full]
+
+    Returns:
+    ----------
+        None
+    """
+    parser = argparse.ArgumentParser(prog='python -m passport.jobs')
+    subparsers = parser.add_subparsers(dest='job', required=True)
+
+    backfill_parser = subparsers.add_parser('backfill',
+                                            help='синхронизировать resolution_seconds со столбцом timedelta')
+    backfill_parser.set_defaults(func=run_backfill)
+
+    rollup_parser = subparsers.add_parser('rollup', help='обновить таблицу ticket_daily_rollup')
+    rollup_parser.add_argument('--days', type=int, default=None, help='количество последних дней для пересчета')
+    rollup_parser.add_argument('--full', action='store_true', help='пересчитать всю историю')
+    rollup_parser.set_defaults(func=run_rollup)
+
+    metrika_parser = subparsers.add_parser('metrika', help='загрузить данные Яндекс.Метрики в таблицу metrika_daily')
+    metrika_parser.add_argument('--days', type=int, default=None, help='количество последних дней для загрузки')
+    metrika_parser.add_argument('--full', action='store_true', help='загрузить всю историю')
+    metrika_parser.set_defaults(func=run_metrika)
+
+    args = parser.parse_args(argv)
+    lw.log_writer(log_msg=f'Job "{args.job}" started')
+    args.func(args)
+    lw.log_writer(log_msg=f'Job "{args.job}" finished')
+
+
+if __name__ == '__main__':
+    main()
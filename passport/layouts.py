@@ -14,19 +14,10 @@ from passport.figures import fig_total, colors_inf_system
 
 def serve_layout():
     curr_date = dt.date(ld.current_year, ld.current_month, ld.current_day)
-    etsp_df = ld.load_etsp_data()
+    sue_incidents_df = ld.load_incident(df=ld.load_sue_data())
+    stale_note = ld.get_tickets_stale_note()
 
-    etsp_top_user_df = ld.top_user(df=etsp_df)
-
-    sue_df = ld.load_sue_data()
-    sue_top_user_df = ld.top_user(df=sue_df)
-
-    osp_df = ld.load_osp_data()
-    sue_incidents_df = ld.load_incident(df=sue_df)
-
-    periods = ld.get_time_periods(first_df=etsp_df,
-                                  second_df=sue_df,
-                                  third_df=osp_df)
+    periods = ld.get_time_periods(bounds=ld.get_period_bounds())
 
     start_week, start_month, start_year = periods['week'][0], periods['month'][0], periods['year'][0]
     finish_week, finish_month, finish_year = periods['week'][1], periods['month'][1], periods['year'][1]
@@ -99,6 +90,7 @@ def serve_layout():
                      refresh=True),  # Обновление после нажатия кнопки сохранить и закрыть (создание)
         html.Div([
             html.H2('Отдел сопровождения пользователей'),
+            html.Label(stale_note, className='stale-note') if stale_note else None,
             # html.Img(src="assets/logo.png")
             html.A([
                 html.Img(src="assets/logo.png")
@@ -254,7 +246,7 @@ def serve_layout():
                                              html.Div([
                                                  dash_table.DataTable(id='table_top_etsp',
                                                                       columns=[dict(name=i, id=i) for i in
-                                                                               etsp_top_user_df.columns],
+                                                                               ld.top_user_columns],
                                                                       sort_action="native",
                                                                       style_as_list_view=True,
                                                                       cell_selectable=False,
@@ -271,7 +263,7 @@ def serve_layout():
                                              html.Div([
                                                  dash_table.DataTable(id='table_top_sue',
                                                                       columns=[dict(name=i, id=i) for i in
-                                                                               sue_top_user_df.columns],
+                                                                               ld.top_user_columns],
                                                                       sort_action="native",
                                                                       style_as_list_view=True,
                                                                       cell_selectable=False,
@@ -356,7 +348,7 @@ def serve_layout():
                                                                                  ['Визиты', 'Посетители',
                                                                                   'Просмотры', 'Отказы',
                                                                                   'Глубина просмотра',
-                                                                                  'Время на сайте']],
+                                                                                  'Время на сайте', 'Данные']],
                                                                         style_table={'height': '150px'},
                                                                         style_as_list_view=True,
                                                                         cell_selectable=False,
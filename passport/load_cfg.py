@@ -4,6 +4,22 @@ cfg_parser = configparser.ConfigParser()
 cfg_parser.read(r'assets/settings.rkz')
 
 token = cfg_parser['metrika']['token']
+metrika_cache_path = cfg_parser.get('metrika', 'cache_path', fallback='metrika_cache.sqlite3')
+metrika_mutable_days = cfg_parser.getint('metrika', 'mutable_days', fallback=2)
+metrika_page_size = cfg_parser.getint('metrika', 'page_size', fallback=10000)
+metrika_page_concurrency = cfg_parser.getint('metrika', 'page_concurrency', fallback=4)
+metrika_base_url = cfg_parser.get('metrika', 'base_url', fallback='https://api-metrika.yandex.net')
+metrika_connect_timeout = cfg_parser.getfloat('metrika', 'connect_timeout', fallback=5)
+metrika_read_timeout = cfg_parser.getfloat('metrika', 'read_timeout', fallback=30)
+metrika_retries = cfg_parser.getint('metrika', 'retries', fallback=3)
+metrika_backoff = cfg_parser.getfloat('metrika', 'backoff', fallback=0.5)
+metrika_breaker_failures = cfg_parser.getint('metrika', 'breaker_failures', fallback=3)
+metrika_breaker_cooldown = cfg_parser.getfloat('metrika', 'breaker_cooldown', fallback=300)
+metrika_retry_after_max = cfg_parser.getfloat('metrika', 'retry_after_max', fallback=metrika_read_timeout)
+metrika_revalidate_seconds = cfg_parser.getint('metrika', 'revalidate_seconds', fallback=600)
+metrika_source = cfg_parser.get('metrika', 'source', fallback='api')
+metrika_sync_start = cfg_parser.get('metrika', 'sync_start', fallback='2020-01-01')
+metrika_sync_chunk_days = cfg_parser.getint('metrika', 'sync_chunk_days', fallback=31)
 
 db_username = cfg_parser['connect']['username']
 db_password = cfg_parser['connect']['password']
@@ -16,6 +32,27 @@ etsp_table_name = cfg_parser['table_names']['etsp_table']
 sue_table_name = cfg_parser['table_names']['sue_table']
 osp_table_name = cfg_parser['table_names']['osp_table']
 
+tickets_refresh_interval = cfg_parser.getint('cache', 'tickets_refresh_interval', fallback=300)
+snapshot_dir = cfg_parser.get('cache', 'snapshot_dir', fallback='snapshots')
+
+result_cache_backend = cfg_parser.get('result_cache', 'backend', fallback='memory')
+result_cache_ttl = cfg_parser.getint('result_cache', 'ttl', fallback=300)
+result_cache_size = cfg_parser.getint('result_cache', 'size', fallback=256)
+result_cache_dir = cfg_parser.get('result_cache', 'dir', fallback='result_cache')
+result_cache_redis_url = cfg_parser.get('result_cache', 'redis_url', fallback='redis://localhost:6379/0')
+result_cache_prefix = cfg_parser.get('result_cache', 'prefix', fallback='passport:')
+result_cache_cross_worker_lock = cfg_parser.getboolean('result_cache', 'cross_worker_lock', fallback=False)
+result_cache_lock_timeout = cfg_parser.getfloat('result_cache', 'lock_timeout', fallback=120)
+figure_cache_size = cfg_parser.getint('result_cache', 'figure_size', fallback=128)
+figure_cache_ttl = cfg_parser.getint('result_cache', 'figure_ttl', fallback=3600)
+
+kpi_source = cfg_parser.get('rollup', 'kpi_source', fallback='tickets')
+rollup_days = cfg_parser.getint('rollup', 'days', fallback=7)
+
+fetch_pool_size = cfg_parser.getint('fetch', 'pool_size', fallback=8)
+fetch_timeout = cfg_parser.getfloat('fetch', 'timeout', fallback=60)
+fetch_timeouts = {'metrika': cfg_parser.getfloat('fetch', 'metrika_timeout', fallback=fetch_timeout)}
+
 con_mail_server = [cfg_parser['mail']['server'], cfg_parser['mail']['user'], cfg_parser['mail']['password']]
 
 
@@ -1,6 +1,10 @@
 import calendar
 import datetime as dt
+import functools
+import os
 import smtplib
+import threading
+import time
 from datetime import date, timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -8,10 +12,11 @@ from platform import python_version
 
 import pandas as pd
 from returns.result import safe
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, text
 
 import passport.load_cfg as lc
 import passport.log_writer as lw
+import passport.result_cache as rc
 
 engine = create_engine(f'{lc.db_dialect}://{lc.db_username}:{lc.db_password}@{lc.db_host}:{lc.db_port}/{lc.db_name}')
 
@@ -25,111 +30,420 @@ end_month = (date.today() - timedelta(days=7)).month
 end_year = (date.today() - timedelta(days=7)).year
 
 
-def load_etsp_data():
+sue_columns = ['reg_date', 'status', 'event_number', 'descr', 'plan_date', 'solved_date', 'user', 'resolution_seconds',
+               'unit', 'start_date', 'finish_date', 'month_open', 'month_solved', 'week_open', 'week_solved',
+               'count_task']
+
+incidents_columns = ['Дата обращения', 'Тип', 'Номер', 'Описание', 'Плановое время', 'Фактическое время',
+                     'Пользователь', 'resolution_seconds', 'Отдел', 'Дата', 'finish_date', 'month_open',
+                     'month_solved', 'week_open', 'week_solved', 'count_task']
+
+tickets_columns = {
+    lc.sue_table_name: ['reg_date', 'status', 'event_number', 'descr', 'solved_date', 'user', 'resolution_seconds',
+                        'unit', 'start_date', 'month_open', 'week_open', 'count_task']
+}
+
+tickets_key_column = 'event_number'
+
+tickets_category_columns = ['user', 'unit', 'status', 'month_open', 'week_open']
+
+support_lines = (('etsp', lc.etsp_table_name), ('sue', lc.sue_table_name), ('osp', lc.osp_table_name))
+
+rollup_table_name = 'ticket_daily_rollup'
+
+# Время выполнения заявки в секундах по текстовому столбцу timedelta ('1 days 02:03:04', '1 day, 2:03:04', '02:03:04')
+timedelta_seconds_sql = ("ROUND(CASE WHEN LOCATE('day', timedelta) > 0 "
+                         "THEN CAST(SUBSTRING_INDEX(timedelta, ' ', 1) AS SIGNED) * 86400 "
+                         "+ TIME_TO_SEC(SUBSTRING_INDEX(timedelta, ' ', -1)) "
+                         "ELSE TIME_TO_SEC(timedelta) END)")
+resolution_seconds_sql = f'COALESCE(resolution_seconds, {timedelta_seconds_sql})'
+
+month_names = ['', 'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь', 'Июль', 'Август', 'Сентябрь', 'Октябрь',
+               'Ноябрь', 'Декабрь']
+
+calendar_options_cache = {}
+calendar_options_lock = threading.Lock()
+
+tickets_cache = {}
+tickets_cache_lock = threading.Lock()
+
+period_bounds_cache = {}
+period_bounds_lock = threading.Lock()
+tickets_state = {}
+
+
+def load_tickets(table_name, since=None):
     """
     Синтаксис:
     ----------
 
-    **load_etsp_data** ()
+    **load_tickets** (table_name, since=None)
 
     Описание:
     ---------
-    Функция загружает из базы данных информацию об обращениях по техподдержке ЕЦП
+    Функция загружает из базы данных информацию об обращениях по техподдержке из указанной таблицы. Если указан
+    параметр since, то загружаются только обращения, зарегистрированные или выполненные начиная с указанной даты.
+    Загружаются только столбцы из tickets_columns, датафрейм приводится к компактному виду функцией
+    **compact_tickets**.
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД (sue_data)
+
+        **since**: *Timestamp*, default None - дата последнего изменения загруженных обращений (см.
+        **refresh_tickets**)
 
     Returns:
     -------
         **DataFrame**
     """
-    df = pd.read_sql("""
-            SELECT num, user, reg_date, solved_date, descr, unit, start_date, finish_date, timedelta, month_open, 
-                   month_solved, week_open, week_solved, count_task 
-            FROM etsp_data
-        """, con=engine)
-    df.timedelta = pd.to_timedelta(df.timedelta)
+    condition = '' if since is None else 'WHERE reg_date >= :since OR solved_date >= :since'
+    df = pd.read_sql(text(f"""
+            SELECT {get_select_columns(columns=tickets_columns[table_name])}
+            FROM {table_name}
+            {condition}
+        """), con=engine, params=None if since is None else {'since': pd.Timestamp(since).to_pydatetime()},
+        parse_dates=['reg_date', 'solved_date'])
 
-    return df
+    return compact_tickets(df=df)
 
 
-def load_sue_data():
+def compact_tickets(df):
     """
     Синтаксис:
     ----------
 
-    **load_sue_data** ()
+    **compact_tickets** (df)
 
     Описание:
     ---------
-    Функция загружает из базы данных информацию об обращениях по техподдержке СУЭ ФК
+    Функция приводит датафрейм с обращениями по техподдержке к компактному представлению в памяти: часто
+    повторяющиеся текстовые столбцы (пользователь, отдел, статус, месяц и неделя регистрации) переводятся в тип
+    category, целочисленные столбцы - в минимально достаточный тип.
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - датафрейм с обращениями по техподдержке
 
     Returns:
     -------
         **DataFrame**
     """
-    df = pd.read_sql("""
-            SELECT reg_date, status, event_number, descr, plan_date, solved_date, user, timedelta, unit, start_date, 
-                   finish_date, month_open, month_solved, week_open, week_solved, count_task
-            FROM sue_data
-        """, con=engine)
-    df.timedelta = pd.to_timedelta(df.timedelta)
+    for column in tickets_category_columns:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if 'count_task' in df.columns:
+        df['count_task'] = pd.to_numeric(df['count_task'], downcast='integer')
+    if 'resolution_seconds' in df.columns:
+        df['resolution_seconds'] = df['resolution_seconds'].astype('Int32')
 
     return df
 
 
-def load_osp_data():
+def get_select_columns(columns):
     """
     Синтаксис:
     ----------
 
-    **load_osp_data** ()
+    **get_select_columns** (columns)
 
     Описание:
     ---------
-    Функция загружает из базы данных информацию об обращениях по техподдержке ОСП
+    Функция возвращает список столбцов для секции SELECT SQL-запроса к таблице техподдержки. Столбец
+    resolution_seconds заменяется выражением resolution_seconds_sql: если он еще не заполнен (обращение добавлено
+    после последнего заполнения, см. **dm.backfill_resolution_seconds**), время выполнения рассчитывается по
+    столбцу timedelta.
+
+    Параметры:
+    ----------
+        **columns**: *List* - названия столбцов
+
+    Returns:
+    -------
+        **String**
+    """
+    return ', '.join(f'{resolution_seconds_sql} AS resolution_seconds' if column == 'resolution_seconds' else column
+                     for column in columns)
+
+
+def tickets_memory_report():
+    """
+    Синтаксис:
+    ----------
+
+    **tickets_memory_report** ()
+
+    Описание:
+    ---------
+    Функция возвращает датафрейм с количеством строк и объемом памяти (в мегабайтах), который занимают датафреймы
+    в кэше обращений текущего процесса, в разрезе таблиц и столбцов.
 
     Returns:
     -------
         **DataFrame**
     """
-    df = pd.read_sql("""
-            SELECT reg_date, user, descr, plan_date, solved_date, timedelta, unit, start_date, finish_date, month_open, 
-                   month_solved, week_open, week_solved, count_task 
-            FROM osp_data
-        """, con=engine)
-    df.timedelta = pd.to_timedelta(df.timedelta)
+    rows = []
+    for table_name, entry in tickets_cache.items():
+        memory = entry['df'].memory_usage(index=True, deep=True)
+        for column, size in memory.items():
+            rows.append(dict(table=table_name,
+                             column=column,
+                             dtype=str(entry['df'][column].dtype) if column in entry['df'].columns else '',
+                             rows=len(entry['df']),
+                             memory_mb=round(size / 2 ** 20, 3)))
+
+    return pd.DataFrame(rows, columns=['table', 'column', 'dtype', 'rows', 'memory_mb'])
+
+
+def get_tickets(table_name):
+    """
+    Синтаксис:
+    ----------
+
+    **get_tickets** (table_name)
+
+    Описание:
+    ---------
+    Функция возвращает датафрейм с обращениями по техподдержке из общего для процесса кэша. При первом обращении
+    кэш заполняется из локального снимка таблицы (см. **read_tickets_snapshot**), а при его отсутствии - полной
+    загрузкой таблицы из БД. В дальнейшем (не чаще одного раза в tickets_refresh_interval секунд) в фоновом потоке
+    из базы данных догружаются только новые и изменившиеся обращения (см. **refresh_tickets**), запрос при этом не
+    ждет обновления. В кэше хранится только таблица техподдержки СУЭ ФК (tickets_columns): показатели всех
+    техподдержек рассчитываются запросами к БД (см. **get_period_kpi**).
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД (sue_data)
+
+    Returns:
+    -------
+        **DataFrame**
+    """
+    with tickets_cache_lock:
+        entry = tickets_cache.get(table_name)
+        if entry is None:
+            snapshot_df = read_tickets_snapshot(table_name=table_name)
+            if snapshot_df is not None:
+                snapshot_time = dt.datetime.fromtimestamp(os.path.getmtime(get_snapshot_path(table_name=table_name)))
+                entry = dict(df=snapshot_df, loaded_at=0, stale=True, refreshing=False, failed=False,
+                             snapshot_time=snapshot_time)
+                lw.log_writer(log_msg=f'Tickets cache "{table_name}" loaded from snapshot, rows: {len(snapshot_df)}')
+            else:
+                df = load_tickets(table_name=table_name)
+                entry = dict(df=df, loaded_at=time.monotonic(), stale=False, refreshing=False, failed=False,
+                             snapshot_time=None)
+                lw.log_writer(log_msg=f'Tickets cache "{table_name}" loaded, rows: {len(df)}, '
+                                      f'memory: {df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB')
+                write_tickets_snapshot(table_name=table_name, df=df)
+            tickets_cache[table_name] = entry
+
+        if not entry['refreshing'] and time.monotonic() - entry['loaded_at'] >= lc.tickets_refresh_interval:
+            entry['refreshing'] = True
+            threading.Thread(target=refresh_tickets,
+                             kwargs=dict(table_name=table_name),
+                             name=f'refresh_{table_name}',
+                             daemon=True).start()
+
+        return entry['df']
+
+
+def refresh_tickets(table_name):
+    """
+    Синтаксис:
+    ----------
+
+    **refresh_tickets** (table_name)
+
+    Описание:
+    ---------
+    Функция догружает в кэш обращения, зарегистрированные или выполненные начиная с самой поздней даты регистрации
+    или выполнения среди загруженных обращений, и обновляет локальный снимок таблицы. Обращения, уже находящиеся в
+    кэше (в том числе зарегистрированные в ту же секунду, что и последнее загруженное), заменяются новыми версиями по
+    номеру обращения (tickets_key_column); не изменившиеся обращения не учитываются. Запрос к БД выполняется без
+    блокировки кэша. Если БД недоступна, в кэше остаются прежние данные, помеченные как устаревшие (см.
+    **get_tickets_stale_note**). Возвращает датафрейм с новыми и изменившимися обращениями или None, если обновление
+    не удалось.
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД (sue_data)
+
+    Returns:
+    -------
+        **DataFrame**
+    """
+    entry = tickets_cache[table_name]
+    since = pd.Series([entry['df'][column].max() for column in ('reg_date', 'solved_date')
+                       if column in entry['df'].columns], dtype='datetime64[ns]').max()
+    try:
+        new_df = load_tickets(table_name=table_name, since=None if pd.isna(since) else since)
+    except Exception as error:
+        with tickets_cache_lock:
+            entry.update(stale=True, refreshing=False, failed=True, loaded_at=time.monotonic())
+        lw.log_writer(log_msg=f'Tickets cache "{table_name}" refresh failed, serving stale data: {error}')
+        return None
+
+    with tickets_cache_lock:
+        was_stale = entry['stale']
+        df = pd.concat([entry['df'], new_df], ignore_index=True)
+        new_df = new_df[~df.duplicated().iloc[len(entry['df']):].to_numpy()]
+        if len(new_df) > 0:
+            df = pd.concat([entry['df'], new_df], ignore_index=True)
+            df = df[~df.duplicated(subset=tickets_key_column, keep='last') | df[tickets_key_column].isna()]
+            entry['df'] = compact_tickets(df=df.reset_index(drop=True))
+            lw.log_writer(log_msg=f'Tickets cache "{table_name}" refreshed, new or changed rows: {len(new_df)}')
+        entry.update(stale=False, refreshing=False, failed=False, snapshot_time=None, loaded_at=time.monotonic())
+        df = entry['df']
+
+    if len(new_df) > 0 or was_stale:
+        write_tickets_snapshot(table_name=table_name, df=df)
+
+    return new_df
+
+
+def get_tickets_stale_note():
+    """
+    Синтаксис:
+    ----------
+
+    **get_tickets_stale_note** ()
+
+    Описание:
+    ---------
+    Функция возвращает текст предупреждения для шапки дашборда, если хотя бы одна таблица в кэше обращений загружена
+    из локального снимка и еще не обновлена из БД: время снимка и состояние обновления (идет обновление или
+    последнее обновление не удалось). Если все таблицы актуальны, возвращает None.
+
+    Returns:
+    -------
+        **String** or **None**
+    """
+    with tickets_cache_lock:
+        stale_entries = [entry for entry in tickets_cache.values() if entry['stale']]
+        if not stale_entries:
+            return None
+        snapshot_time = min(entry['snapshot_time'] or dt.datetime.now() for entry in stale_entries)
+        failed = any(entry['failed'] for entry in stale_entries)
+        refreshing = any(entry['refreshing'] for entry in stale_entries)
+
+    note = f'Данные из снимка от {snapshot_time:%d.%m.%Y %H:%M}'
+    if failed:
+        return f'{note}, база данных недоступна'
+    if refreshing:
+        return f'{note}, идет обновление из БД'
+    return note
+
+
+def get_snapshot_path(table_name):
+    """
+    Синтаксис:
+    ----------
+
+    **get_snapshot_path** (table_name)
+
+    Описание:
+    ---------
+    Функция возвращает путь к файлу локального снимка таблицы обращений в формате Parquet.
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД
+
+    Returns:
+    -------
+        **String**
+    """
+    return os.path.join(lc.snapshot_dir, f'{table_name}.parquet')
 
-    return df
 
+def read_tickets_snapshot(table_name):
+    """
+    Синтаксис:
+    ----------
+
+    **read_tickets_snapshot** (table_name)
 
-def top_user(df):
+    Описание:
+    ---------
+    Функция читает локальный снимок таблицы обращений (Parquet, с отображением файла в память). Возвращает None, если
+    снимок отсутствует или не может быть прочитан.
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД
+
+    Returns:
+    -------
+        **DataFrame** or **None**
+    """
+    path = get_snapshot_path(table_name=table_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        return compact_tickets(df=pd.read_parquet(path, memory_map=True))
+    except Exception as error:
+        lw.log_writer(log_msg=f'Tickets snapshot {path} can not be read: {error}')
+        return None
+
+
+def write_tickets_snapshot(table_name, df):
     """
     Синтаксис:
     ----------
 
-    **top_user** (df)
+    **write_tickets_snapshot** (table_name, df)
 
     Описание:
     ---------
+    Функция сохраняет датафрейм с обращениями в локальный снимок таблицы (Parquet). Файл записывается во временный
+    файл и затем переименовывается, поэтому другие процессы не прочитают частично записанный снимок. Ошибки записи
+    только фиксируются в лог-файле.
 
-    Функция принимает на вход ДатаФрейм по техподдержке. Возвращает датафрейм содержащий информацию о ТОП-5 сотрудниках
-    которые подали наибольшее количество обращений (ФИО сотрудника, Количество обращений)
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД
+
+        **df**: *DataFrame* - датафрейм с обращениями
+
+    Returns:
+    -------
+        None
+    """
+    path = get_snapshot_path(table_name=table_name)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(lc.snapshot_dir, exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as error:
+        lw.log_writer(log_msg=f'Tickets snapshot {path} can not be written: {error}')
+
+
+def load_sue_data():
+    """
+    Синтаксис:
+    ----------
+
+    **load_sue_data** ()
+
+    Описание:
+    ---------
+    Функция возвращает информацию об обращениях по техподдержке СУЭ ФК из кэша
 
     Returns:
     -------
         **DataFrame**
     """
-    top_user_df = df[(df.unit != 'Отдел сопровождения пользователей') &
-                     (df.unit != 'ЦОКР') &
-                     (df.user != 'Кондрашова Ирина Сергеевна') &
-                     (df.unit != '19. Отдел сопровождения пользователей') &
-                     (df.user != 'Вельмякин Николай Валерьевич') &
-                     (df.unit != 'Отдел информационно-технологического сопровождения централизованной бухгалтерии') &
-                     (df.user != 'Фролов Леонид Сергеевич') &
-                     (df.user != 'Тех. поддержка') &
-                     (df.user != 'Тимофеев Кирилл Эдуардович')
-                     ]
-    top_user_df = pd.DataFrame(top_user_df.groupby('user')['count_task'].sum().sort_values(ascending=False).head()
-                               .reset_index()).rename(columns={'user': 'Пользователь', 'count_task': 'Обращения'})
-    return top_user_df
+    return get_tickets(table_name=lc.sue_table_name)
+
+
+top_user_columns = ['Пользователь', 'Обращения']
+
+top_user_excluded_units = ['Отдел сопровождения пользователей', 'ЦОКР', '19. Отдел сопровождения пользователей',
+                           'Отдел информационно-технологического сопровождения централизованной бухгалтерии']
+
+top_user_excluded_users = ['Кондрашова Ирина Сергеевна', 'Вельмякин Николай Валерьевич', 'Фролов Леонид Сергеевич',
+                           'Тех. поддержка', 'Тимофеев Кирилл Эдуардович']
 
 
 def load_incident(df):
@@ -150,9 +464,7 @@ def load_incident(df):
         **DataFrame**
     """
     incident_df = df[(df.status == 'Проблема') | (df.status == 'Массовый инцидент')]
-    incident_df.columns = ['Дата обращения', 'Тип', 'Номер', 'Описание', 'Плановое время', 'Фактическое время',
-                           'Пользователь', 'timedelta', 'Отдел', 'Дата', 'finish_date', 'month_open',
-                           'month_solved', 'week_open', 'week_solved', 'count_task']
+    incident_df = incident_df.rename(columns=dict(zip(sue_columns, incidents_columns)))
     return incident_df
 
 
@@ -176,75 +488,167 @@ def no_incidents():
     """
     no_incidents_df = pd.DataFrame({'Дата': '-', 'Тип': 'Аварийных инциндентов нет', 'Номер': '-', 'Описание': '-',
                                     'Плановое время': '-', 'Фактическое время': '-', 'Пользователь': '-',
-                                    'timedelta': '-', 'Отдел': '-', 'start_date': '-', 'finish_date': '-',
+                                    'resolution_seconds': '-', 'Отдел': '-', 'start_date': '-', 'finish_date': '-',
                                     'month_open': '-', 'month_solved': '-', 'week_open': '-',
                                     'week_solved': '-', 'count_task': '-'}, index=[0])
 
     return no_incidents_df
 
 
-def get_time_periods(first_df, second_df, third_df):
+def get_period_bounds():
     """
     Синтаксис:
     ----------
 
-    **get_time_periods** (first_df, second_df, third_df)
+    **get_period_bounds** ()
 
     Описание:
     ---------
 
-    Функция принимает на вход три ДатаФрейма по трем поддержкам. Анализирует столбец содержащий дату регистрации
-    обращения. Возвращает словарь который содержит номера недели, месяца и год самого раннего зарегистрированного
-    обращения (по 3-м техподдержкам) и номера недели и месяца а также год самого позднего зарегистрированного обращения.
+    Функция возвращает словарь, в котором ключами являются названия техподдержек (etsp, sue, osp), а значениями -
+    кортежи из даты регистрации самого раннего и самого позднего обращения. Границы определяются одним запросом
+    MIN/MAX(reg_date) по всем таблицам и кэшируются на tickets_refresh_interval секунд. Если БД недоступна,
+    возвращаются последние полученные границы, а до их получения - границы обращений СУЭ ФК из кэша обращений
+    (загруженного из локального снимка, см. **get_tickets**) для всех техподдержек.
 
-    Параметры:
+    При обновлении границ проверяется, изменились ли таблицы техподдержек (количество обращений, даты последнего
+    зарегистрированного и последнего выполненного обращения). Если таблица изменилась, из кэша результатов удаляются
+    записи вкладки "Техподдержка", начиная с самой ранней даты регистрации новых и выполненных с прошлой проверки
+    обращений (см. **get_changed_since**), до текущей даты (см. **rc.invalidate**).
+
+    Returns:
+    -------
+        **Dict**
+    """
+    with period_bounds_lock:
+        if period_bounds_cache and time.monotonic() - period_bounds_cache['loaded_at'] < lc.tickets_refresh_interval:
+            return period_bounds_cache['bounds']
+
+        query = ' UNION ALL '.join(f"SELECT '{line}' AS line, MIN(reg_date) AS first_date, MAX(reg_date) AS last_date, "
+                                   f"COUNT(*) AS row_count, MAX(solved_date) AS last_solved, "
+                                   f"COUNT(solved_date) AS solved_count "
+                                   f"FROM {table_name}"
+                                   for line, table_name in support_lines)
+        try:
+            bounds_df = pd.read_sql(query, con=engine, parse_dates=['first_date', 'last_date', 'last_solved'])
+        except Exception as error:
+            bounds = period_bounds_cache.get('bounds')
+            if bounds is None:
+                reg_dates = get_tickets(table_name=lc.sue_table_name).reg_date
+                bounds = {line: (reg_dates.min(), reg_dates.max()) for line, table_name in support_lines}
+            lw.log_writer(log_msg=f'Period bounds can not be loaded, serving last known bounds: {error}')
+            period_bounds_cache.update(bounds=bounds, loaded_at=time.monotonic())
+            return bounds
+        bounds = {row.line: (row.first_date, row.last_date) for row in bounds_df.itertuples(index=False)}
+
+        table_names = dict(support_lines)
+        for row in bounds_df.itertuples(index=False):
+            state = dict(last_date=row.last_date, row_count=row.row_count, last_solved=row.last_solved,
+                         solved_count=row.solved_count)
+            previous = tickets_state.get(row.line)
+            if previous is not None and str(previous) != str(state) and not pd.isna(row.first_date):
+                changed_since = get_changed_since(table_name=table_names[row.line], state=previous)
+                rc.invalidate(namespaces=rc.tickets_namespaces,
+                              start_date=(row.first_date if changed_since is None else changed_since).date(),
+                              end_date=date.today())
+            tickets_state[row.line] = state
+
+        period_bounds_cache.update(bounds=bounds, loaded_at=time.monotonic())
+        return bounds
+
+
+def get_changed_since(table_name, state):
+    """
+    Синтаксис:
     ----------
-        **first_df**: *DataFrame - ДатаФрейм первой техподдержки
 
-        **second_df**: *DataFrame* - ДатаФрейм второй техподдержки
+    **get_changed_since** (table_name, state)
+
+    Описание:
+    ---------
+
+    Функция возвращает самую раннюю дату регистрации обращений, которые были зарегистрированы или выполнены начиная с
+    дат последнего зарегистрированного и последнего выполненного обращения, сохраненных при прошлой проверке таблицы
+    (см. **get_period_bounds**). Возвращает None, если таких обращений нет (например, обращения были удалены), - в
+    этом случае изменившийся период неизвестен.
+
+    Параметры:
+    ----------
+        **table_name**: *String* - название таблицы в БД
 
-        **third_df**: *DataFrame* - ДатаФрейм третьей техподдержки
+        **state**: *Dict* - состояние таблицы при прошлой проверке (last_date, last_solved)
 
     Returns:
     -------
-        **Dict**
+        **Timestamp** or **None**
+    """
+    params = {name: None if pd.isna(state[name]) else pd.Timestamp(state[name]).to_pydatetime()
+              for name in ('last_date', 'last_solved')}
+    with engine.connect() as connection:
+        changed_since = connection.execute(text(f"""
+            SELECT MIN(reg_date)
+            FROM {table_name}
+            WHERE reg_date >= :last_date OR solved_date >= :last_solved
+        """), params).scalar()
+
+    return None if changed_since is None else pd.Timestamp(changed_since)
+
+
+def get_time_periods(bounds):
     """
-    start_weeks_list = [first_df.reg_date.min().week, second_df.reg_date.min().week, third_df.reg_date.min().week]
-    end_weeks_list = [first_df.reg_date.max().week, second_df.reg_date.max().week, third_df.reg_date.max().week]
+    Синтаксис:
+    ----------
+
+    **get_time_periods** (bounds)
+
+    Описание:
+    ---------
 
-    start_month_list = [first_df.reg_date.min().month, second_df.reg_date.min().month, third_df.reg_date.min().month]
-    end_month_list = [first_df.reg_date.max().month, second_df.reg_date.max().month, third_df.reg_date.max().month]
+    Функция принимает на вход границы периодов по трем поддержкам (см. **get_period_bounds**). Возвращает словарь
+    который содержит номера недели, месяца и год самого раннего зарегистрированного обращения (по 3-м техподдержкам) и
+    номера недели и месяца а также год самого позднего зарегистрированного обращения.
 
-    start_year_list = [first_df.reg_date.min().year, second_df.reg_date.min().year, third_df.reg_date.min().year]
-    end_year_list = [first_df.reg_date.max().year, second_df.reg_date.max().year, third_df.reg_date.max().year]
+    Параметры:
+    ----------
+        **bounds**: *Dict* - словарь с датами самого раннего и самого позднего обращения по каждой техподдержке
+
+    Returns:
+    -------
+        **Dict**
+    """
+    first_dates = [pd.Timestamp(first_date) for first_date, last_date in bounds.values()]
+    last_dates = [pd.Timestamp(last_date) for first_date, last_date in bounds.values()]
 
-    return dict(week=[min(start_weeks_list), max(end_weeks_list)], month=[min(start_month_list), max(end_month_list)],
-                year=[min(start_year_list), max(end_year_list)])
+    return dict(week=[min(d.week for d in first_dates), max(d.week for d in last_dates)],
+                month=[min(d.month for d in first_dates), max(d.month for d in last_dates)],
+                year=[min(d.year for d in first_dates), max(d.year for d in last_dates)])
 
 
-def count_mean_time(filtered_df):
+def format_mean_time(duration, count_tasks):
     """
     Синтаксис:
     ----------
 
-    **count_mean_time** (filtered_df)
+    **format_mean_time** (duration, count_tasks)
 
     Описание:
     ---------
 
-    Функция принимает на вход ДатаФрейм. Возвращает строку содержащую среднее время выполнения заявок
+    Функция принимает на вход среднее время выполнения заявок и количество заявок. Возвращает строку содержащую среднее
+    время выполнения заявок в днях, часах и минутах
 
     Параметры:
     ----------
-        **filtered_df**: *DataFrame* - ДатаФрейм
+        **duration**: *Timedelta* - среднее время выполнения заявок
 
+        **count_tasks**: *int* - количество заявок
 
     Returns:
     -------
         **String**
     """
-    duration = filtered_df['timedelta'].mean()
-    count_tasks = filtered_df['count_task'].sum()
+    if count_tasks == 0 or pd.isna(duration):
+        return '-'
 
     # преобразование в дни, часы, минуты и секунды
     days, seconds = duration.days, duration.seconds
@@ -253,9 +657,7 @@ def count_mean_time(filtered_df):
     seconds = (seconds % 60)
     avg_time = days, hours, minutes, seconds
 
-    if count_tasks == 0:
-        avg_time = '-'
-    elif avg_time[0] == 0:
+    if avg_time[0] == 0:
         avg_time = f'{avg_time[1]} час. {avg_time[2]} мин.'
     else:
         avg_time = f'{avg_time[0]} дн. {avg_time[1]} час. {avg_time[2]} мин.'
@@ -317,26 +719,97 @@ def get_period(year, week, output_format='n'):
     -------
         **string** or **list of strings**
     """
+    weeks = get_calendar_year(year)['weeks']
+    start_day_of_week, end_day_of_week = get_week_range(year=year, week=week)
+
+    if output_format == 'n' and week in weeks:
+        period = weeks[week]['label']
+    elif output_format == 'n':
+        period = ' - '.join([start_day_of_week.strftime("%d-%m-%Y"), end_day_of_week.strftime("%d-%m-%Y")])
+    elif output_format == 's':
+        period = [start_day_of_week.isoformat(), end_day_of_week.isoformat()]
+    else:
+        period = ['1900-01-01', '1900-01-01']
+
+    return period
+
+
+@functools.lru_cache(maxsize=None)
+def get_calendar_year(year):
+    """
+    Синтаксис:
+    ----------
+
+    **get_calendar_year** (year)
+
+    Описание:
+    ---------
+
+    Функция возвращает календарный индекс года: словарь с ключами 'weeks' и 'months', значениями которых являются
+    словари вида {номер недели (месяца): dict(start=дата начала, end=дата окончания, label=подпись)}. Индекс
+    строится один раз для каждого года и используется функциями формирования списков недель и месяцев, а также
+    фильтрами по периодам.
+
+    Параметры:
+    ----------
+        **year**: *int* - год
+
+    Returns:
+    -------
+        **Dict**
+    """
     first_year_day = date(year, 1, 1)
     if first_year_day.weekday() > 3:
         first_week_day = first_year_day + timedelta(7 - first_year_day.weekday())
     else:
         first_week_day = first_year_day - timedelta(first_year_day.weekday())
 
-    dlt_start = timedelta(days=(week - 1) * 7)
-    dlt_end = timedelta(days=(((week - 1) * 7) + 6))
+    weeks = {}
+    for week in range(1, 54):
+        start_day_of_week = first_week_day + timedelta(days=(week - 1) * 7)
+        end_day_of_week = start_day_of_week + timedelta(days=6)
+        weeks[week] = dict(start=start_day_of_week,
+                           end=end_day_of_week,
+                           label=' - '.join([start_day_of_week.strftime("%d-%m-%Y"),
+                                             end_day_of_week.strftime("%d-%m-%Y")]))
 
-    start_day_of_week = first_week_day + dlt_start
-    end_day_of_week = first_week_day + dlt_end
+    months = {}
+    for month in range(1, 13):
+        months[month] = dict(start=date(year, month, 1),
+                             end=date(year, month, calendar.monthrange(year, month)[1]),
+                             label=' '.join([month_names[month], str(year)]))
 
-    if output_format == 'n':
-        period = ' - '.join([start_day_of_week.strftime("%d-%m-%Y"), end_day_of_week.strftime("%d-%m-%Y")])
-    elif output_format == 's':
-        period = [start_day_of_week.strftime("%Y-%m-%d"), end_day_of_week.strftime("%Y-%m-%d")]
-    else:
-        period = ['1900-01-01', '1900-01-01']
+    return dict(weeks=weeks, months=months)
 
-    return period
+
+def get_week_range(year, week):
+    """
+    Синтаксис:
+    ----------
+
+    **get_week_range** (year, week)
+
+    Описание:
+    ---------
+
+    Функция принимает на вход год и номер недели. Возвращает кортеж из дат начала и окончания недели.
+
+    Параметры:
+    ----------
+        **year**: *int* - год
+
+        **week**: *int* - номер недели
+
+    Returns:
+    -------
+        **Tuple(date, date)**
+    """
+    weeks = get_calendar_year(year)['weeks']
+    if week in weeks:
+        return weeks[week]['start'], weeks[week]['end']
+
+    start_day_of_week = weeks[1]['start'] + timedelta(days=(week - 1) * 7)
+    return start_day_of_week, start_day_of_week + timedelta(days=6)
 
 
 def get_month_period(year, month_num):
@@ -362,16 +835,9 @@ def get_month_period(year, month_num):
     ----------
         **List**
     """
-    num_days = calendar.monthrange(year, month_num)[1]
+    month = get_calendar_year(year)['months'][month_num]
 
-    if month_num > 9:
-        start_date = f'{year}-{month_num}-01'
-        end_date = f'{year}-{month_num}-{num_days}'
-    else:
-        start_date = f'{year}-0{month_num}-01'
-        end_date = f'{year}-0{month_num}-{num_days}'
-
-    return [start_date, end_date]
+    return [month['start'].isoformat(), month['end'].isoformat()]
 
 
 def get_weeks(start_week, start_year, finish_week, finish_year):
@@ -401,6 +867,11 @@ def get_weeks(start_week, start_year, finish_week, finish_year):
     ----------
         **List**
     """
+    key = ('weeks', start_week, start_year, finish_week, finish_year)
+    options = read_calendar_options(key=key)
+    if options is not None:
+        return options
+
     last_week_of_start_year = date(start_year, 12, 31).isocalendar()[1]
 
     start_period = [{"label": f'Неделя {i} ({get_period(year=start_year, week=i)})',
@@ -436,7 +907,8 @@ def get_weeks(start_week, start_year, finish_week, finish_year):
             start_period.append(item)
         start_period.reverse()
 
-    return start_period
+    store_calendar_options(key=key, options=start_period)
+    return [dict(item) for item in start_period]
 
 
 def get_period_month(year, month):
@@ -460,11 +932,7 @@ def get_period_month(year, month):
     ----------
         **String**
     """
-    months = ['', 'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь', 'Июль', 'Август', 'Сентябрь', 'Октябрь',
-              'Ноябрь', 'Декабрь']
-    period = ' '.join([str(months[month]), str(year)])
-
-    return period
+    return get_calendar_year(year)['months'][month]['label']
 
 
 def get_months(start_month, start_year, finish_month, finish_year):
@@ -494,6 +962,11 @@ def get_months(start_month, start_year, finish_month, finish_year):
     ----------
         **List**
     """
+    key = ('months', start_month, start_year, finish_month, finish_year)
+    options = read_calendar_options(key=key)
+    if options is not None:
+        return options
+
     start_period = [
         {"label": f'{get_period_month(year=start_year, month=i)}', "value": "_".join([str(i), str(start_year)])}
         for i in range(start_month, 13)]
@@ -523,7 +996,63 @@ def get_months(start_month, start_year, finish_month, finish_year):
             start_period.append(item)
         start_period.reverse()
 
-    return start_period
+    store_calendar_options(key=key, options=start_period)
+    return [dict(item) for item in start_period]
+
+
+def store_calendar_options(key, options):
+    """
+    Синтаксис:
+    ----------
+
+    **store_calendar_options** (key, options)
+
+    Описание:
+    ----------
+    Функция сохраняет список вариантов выбора недель (месяцев) в кэш текущего дня. Кэш предыдущих дней удаляется,
+    поэтому списки перестраиваются не чаще одного раза в сутки для каждого набора границ периода.
+
+    Параметры:
+    ----------
+        **key**: *Tuple* - ключ (тип списка и границы периода)
+
+        **options**: *List* - список вариантов для компонента dcc.Dropdown
+
+    Returns:
+    ----------
+        None
+    """
+    today = date.today()
+    with calendar_options_lock:
+        for day in [day for day in calendar_options_cache if day != today]:
+            del calendar_options_cache[day]
+        calendar_options_cache.setdefault(today, {})[key] = options
+
+
+def read_calendar_options(key):
+    """
+    Синтаксис:
+    ----------
+
+    **read_calendar_options** (key)
+
+    Описание:
+    ----------
+    Функция возвращает копию списка вариантов выбора недель (месяцев) из кэша текущего дня или None, если список еще
+    не сохранен (см. **store_calendar_options**). Кэш читается под блокировкой, так как списки запрашиваются
+    одновременно из нескольких потоков, а при смене дня записи предыдущих дней удаляются.
+
+    Параметры:
+    ----------
+        **key**: *Tuple* - ключ (тип списка и границы периода)
+
+    Returns:
+    ----------
+        **List** or **None**
+    """
+    with calendar_options_lock:
+        options = calendar_options_cache.get(date.today(), {}).get(key)
+        return None if options is None else [dict(item) for item in options]
 
 
 def load_projects(projects_status='in_progress', project_name='all'):
@@ -738,29 +1267,32 @@ def get_date_for_metrika_df(start_date, end_date, ch_month, ch_week, type_period
     return start_date_metrika, end_date_metrika
 
 
-def get_filtered_df(table_name, start_date, end_date, month, month_year, week, week_year, type_period):
+def get_period_condition(start_date, end_date, month, month_year, week, week_year, type_period,
+                         column='reg_date'):
     """
     Синтаксис:
     ----------
-    **get_filtered_df** (table_name, start_date, end_date, ch_month, ch_week, type_period)
+    **get_period_condition** (start_date, end_date, month, month_year, week, week_year, type_period, column='reg_date')
 
     Описание:
     ----------
-    Функция принимает на вход наименование таблицы, в которой содержаться данные по техподдержки в БД и параметры
-    фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания периода). Сделает запрос к БД.
-    Возвращает отфильтрованный датафрейм за выбранный период по выбранной таблице (техподдержки).
+    Функция принимает на вход параметры фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания
+    периода). Возвращает строку с условием отбора обращений за выбранный период для подстановки в секцию WHERE
+    SQL-запроса.
 
     Параметры:
     ----------
-        **table_name**: *String* - Название таблицы в БД для фильтрации
-
         **start_date**: *str* - дата начала периода (если фильтрация по произвольному периоду (DateTimeRange))
 
         **end_date**: *str* - дата окончания периода (если фильтрация по произвольному периоду (DateTimeRange))
 
-        **ch_month**: *int* - номер выбранного месяца (если фильтрация по месяцу)
+        **month**: *int* - номер выбранного месяца (если фильтрация по месяцу)
 
-        **cho_week**: *int* - номер выбранной недели (если фильтрация осуществляется по неделям)
+        **month_year**: *int* - год выбранного месяца (если фильтрация по месяцу)
+
+        **week**: *int* - номер выбранной недели (если фильтрация осуществляется по неделям)
+
+        **week_year**: *int* - год выбранной недели (если фильтрация осуществляется по неделям)
 
         **type_period**: *str* - Определяет тип фильтрации. Допустимые значения:
 
@@ -770,132 +1302,174 @@ def get_filtered_df(table_name, start_date, end_date, month, month_year, week, w
 
             Если параметр не указан, то фильтрация осуществляется по неделям.
 
+        **column**: *str*, default 'reg_date' - столбец с датой, по которому выполняется отбор
+
     Returns:
     ----------
-        **DataFrame**
+        **String**
     """
-    if type_period == 'm':
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM {table_name} 
-            WHERE EXTRACT(month from reg_date) = {int(month)}
-            AND EXTRACT(year from reg_date) = {int(month_year)}
-    """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        return df
+    period_start, period_end = get_period_range(start_date=start_date,
+                                                end_date=end_date,
+                                                month=month,
+                                                month_year=month_year,
+                                                week=week,
+                                                week_year=week_year,
+                                                type_period=type_period)
 
-    elif type_period == 'p':
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM {table_name} 
-            WHERE reg_date >= '{start_date} 00:00:00' 
-                AND reg_date <='{end_date} 23:59:59'
-        """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        return df
-    else:
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM {table_name} 
-            WHERE EXTRACT(year from reg_date) = {week_year}
-            AND EXTRACT(week from reg_date) = {week}
-        """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        return df
+    return f"{column} >= '{period_start}' AND {column} < '{period_end}'"
 
 
-def get_prev_filtered_df(table_name, start_date, end_date, month, month_year, week, week_year, type_period):
+def get_prev_period_condition(start_date, end_date, month, month_year, week, week_year, type_period,
+                              column='reg_date'):
     """
     Синтаксис:
     ----------
-
-    **get_prev_filtered_df** (table_name, type_period, start_date, end_date, ch_month, ch_week)
+    **get_prev_period_condition** (start_date, end_date, month, month_year, week, week_year, type_period,
+    column='reg_date')
 
     Описание:
     ----------
+    Функция принимает на вход параметры фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания
+    периода). Возвращает строку с условием отбора обращений за период, предшествующий выбранному, для подстановки в
+    секцию WHERE SQL-запроса.
 
-    Функция принимает на вход наименование таблицы, в которой содержаться данные по техподдержки в БД и параметры
-    фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания периода). Сделает запрос к БД.
-    Возвращает отфильтрованный датафрейм за период предшествующий выбранным параметрам (например если выбран номер
-    месяца 2, то функция вернет отфильтрованный датафрейм за предыдущий месяц, т.е. 1).
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **get_period_condition**
+
+    Returns:
+    ----------
+        **String**
+    """
+    period_start, period_end = get_prev_period_range(start_date=start_date,
+                                                     end_date=end_date,
+                                                     month=month,
+                                                     month_year=month_year,
+                                                     week=week,
+                                                     week_year=week_year,
+                                                     type_period=type_period)
+
+    return f"{column} >= '{period_start}' AND {column} < '{period_end}'"
+
+
+def get_period_range(start_date, end_date, month, month_year, week, week_year, type_period):
+    """
+    Синтаксис:
+    ----------
+    **get_period_range** (start_date, end_date, month, month_year, week, week_year, type_period)
+
+    Описание:
+    ----------
+    Функция принимает на вход параметры фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания
+    периода). Возвращает полуинтервал [дата начала, дата окончания) выбранного периода: дата окончания в период не
+    входит. Условие вида reg_date >= начало AND reg_date < окончание позволяет СУБД использовать индекс по reg_date.
 
     Параметры:
     ----------
-        **table_name**: *String* - Название таблицы в БД для фильтрации
+        Аналогичны параметрам функции **get_period_condition**
 
-        **start_date**: *str* - дата начала периода (если фильтрация по произвольному периоду (DateTimeRange))
+    Returns:
+    ----------
+        **Tuple(date, date)**
+    """
+    if type_period == 'm':
+        month_range = get_calendar_year(int(month_year))['months'][int(month)]
+        period_start, period_end = month_range['start'], month_range['end'] + timedelta(days=1)
 
-        **end_date**: *str* - дата окончания периода (если фильтрация по произвольному периоду (DateTimeRange))
+    elif type_period == 'p':
+        period_start = dt.datetime.strptime(str(start_date)[:10], '%Y-%m-%d').date()
+        period_end = dt.datetime.strptime(str(end_date)[:10], '%Y-%m-%d').date() + timedelta(days=1)
 
-        **ch_month**: *int* - номер выбранного месяца (если фильтрация по месяцу)
+    else:
+        period_start = get_week_range(year=int(week_year), week=int(week))[0]
+        period_end = period_start + timedelta(days=7)
 
-        **ch_week**: *int* - номер выбранной недели (если фильтрация осуществляется по неделям)
+    return period_start, period_end
 
-        **type_period**: string
-            Определяет тип фильтрации. Допустимые значения:
 
-            '**m**' - фильтрация по выбранному месяцу.
+def get_prev_period_range(start_date, end_date, month, month_year, week, week_year, type_period):
+    """
+    Синтаксис:
+    ----------
+    **get_prev_period_range** (start_date, end_date, month, month_year, week, week_year, type_period)
 
-            '**p**' - фильтрация по произвольному периоду.
+    Описание:
+    ----------
+    Функция принимает на вход параметры фильтрации и возвращает полуинтервал [дата начала, дата окончания) периода,
+    предшествующего выбранному: предыдущие месяц или неделя, а для произвольного периода - период, сдвинутый назад
+    на разницу между датами окончания и начала.
 
-            Если параметр не указан, то фильтрация осуществляется по неделям.
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **get_period_condition**
 
     Returns:
     ----------
-        **DataFrame**
+        **Tuple(date, date)**
     """
+    period_start, period_end = get_period_range(start_date=start_date,
+                                                end_date=end_date,
+                                                month=month,
+                                                month_year=month_year,
+                                                week=week,
+                                                week_year=week_year,
+                                                type_period=type_period)
     if type_period == 'm':
-        if int(month) > 1:
-            df = pd.read_sql(f"""
-                SELECT * 
-                FROM {table_name} 
-                WHERE EXTRACT(month from reg_date) = {int(month) - 1}
-                AND EXTRACT(year from reg_date) = {int(month_year)}
-            """, con=engine)
-            df.timedelta = pd.to_timedelta(df.timedelta)
-            return df
-        else:
-            df = pd.read_sql(f"""
-                SELECT * 
-                FROM {table_name} 
-                WHERE EXTRACT(month from reg_date) = 12
-                AND EXTRACT(year from reg_date) = {int(month_year)}
-            """, con=engine)
-            df.timedelta = pd.to_timedelta(df.timedelta)
-            return df
+        prev_start = (period_start - timedelta(days=1)).replace(day=1)
+        prev_end = period_start
 
     elif type_period == 'p':
-        delta = dt.datetime.strptime(end_date, '%Y-%m-%d') - dt.datetime.strptime(start_date, '%Y-%m-%d')
-        prev_start_date = dt.datetime.strftime((dt.datetime.strptime(start_date, '%Y-%m-%d') - delta), '%Y-%m-%d')
-        prev_end_date = dt.datetime.strftime((dt.datetime.strptime(end_date, '%Y-%m-%d') - delta), '%Y-%m-%d')
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM {table_name} 
-            WHERE reg_date >= '{prev_start_date} 00:00:00' 
-                AND reg_date <='{prev_end_date} 23:59:59'
-        """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        return df
+        delta = period_end - period_start - timedelta(days=1)
+        prev_start = period_start - delta
+        prev_end = period_end - delta
 
     else:
-        if int(week) > 1:
-            df = pd.read_sql(f"""
-                SELECT * 
-                FROM {table_name} 
-                WHERE EXTRACT(year from reg_date) = {week_year}
-                AND EXTRACT(week from reg_date) = {week - 1}
-            """, con=engine)
-            df.timedelta = pd.to_timedelta(df.timedelta)
-            return df
-        else:
-            df = pd.read_sql(f"""
-                SELECT * 
-                FROM {table_name} 
-                WHERE EXTRACT(year from reg_date) = {week_year}
-                AND EXTRACT(week from reg_date) = {52}
-            """, con=engine)
-            df.timedelta = pd.to_timedelta(df.timedelta)
-            return df
+        prev_start = period_start - timedelta(days=7)
+        prev_end = period_start
+
+    return prev_start, prev_end
+
+
+def get_incidents_condition(start_date, end_date, month, month_year, week, week_year, type_period):
+    """
+    Синтаксис:
+    ----------
+
+    **get_incidents_condition** (start_date, end_date, month, month_year, week, week_year, type_period)
+
+    Описание:
+    ---------
+
+    Функция принимает на вход параметры фильтрации и возвращает строку с условием отбора аварийных инцидентов СУЭ ФК
+    для подстановки в секцию WHERE SQL-запроса. Для произвольного периода инциденты отбираются за предшествующий
+    период.
+
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **get_period_condition**
+
+    Returns:
+    -------
+        **String**
+    """
+    if type_period == 'p':
+        condition = get_prev_period_condition(start_date=start_date,
+                                              end_date=end_date,
+                                              month=month,
+                                              month_year=month_year,
+                                              week=week,
+                                              week_year=week_year,
+                                              type_period=type_period)
+    else:
+        condition = get_period_condition(start_date=start_date,
+                                         end_date=end_date,
+                                         month=month,
+                                         month_year=month_year,
+                                         week=week,
+                                         week_year=week_year,
+                                         type_period=type_period)
+
+    return f"(status = 'Проблема' or status = 'Массовый инцидент') AND ({condition})"
 
 
 def get_filtered_incidents_df(start_date, end_date, month, month_year, week, week_year, type_period):
@@ -936,49 +1510,303 @@ def get_filtered_incidents_df(start_date, end_date, month, month_year, week, wee
     -------
         **DataFrame**
     """
-    if type_period == 'm':
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM sue_data 
-            WHERE (status = 'Проблема' or status = 'Массовый инцидент') 
-                AND EXTRACT(month from reg_date) = {int(month)}
-                AND EXTRACT(year from reg_date) = {int(month_year)}
-        """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        df.columns = ['Дата обращения', 'Тип', 'Номер', 'Описание', 'Плановое время', 'Фактическое время',
-                      'Пользователь', 'timedelta', 'Отдел', 'Дата', 'finish_date', 'month_open',
-                      'month_solved', 'week_open', 'week_solved', 'count_task']
-        return df
 
-    elif type_period == 'p':
-        delta = dt.datetime.strptime(end_date, '%Y-%m-%d') - dt.datetime.strptime(start_date, '%Y-%m-%d')
-        prev_start_date = dt.datetime.strftime((dt.datetime.strptime(start_date, '%Y-%m-%d') - delta), '%Y-%m-%d')
-        prev_end_date = dt.datetime.strftime((dt.datetime.strptime(end_date, '%Y-%m-%d') - delta), '%Y-%m-%d')
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM sue_data 
-            WHERE (status = 'Проблема' or status = 'Массовый инцидент') 
-               AND (reg_date >= '{prev_start_date} 00:00:00' and reg_date <='{prev_end_date} 23:59:59')
+    condition = get_incidents_condition(start_date=start_date,
+                                        end_date=end_date,
+                                        month=month,
+                                        month_year=month_year,
+                                        week=week,
+                                        week_year=week_year,
+                                        type_period=type_period)
+    df = pd.read_sql(f"""
+            SELECT {get_select_columns(columns=sue_columns)}
+            FROM {lc.sue_table_name}
+            WHERE {condition}
         """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        df.columns = ['Дата обращения', 'Тип', 'Номер', 'Описание', 'Плановое время', 'Фактическое время',
-                      'Пользователь', 'timedelta', 'Отдел', 'Дата', 'finish_date', 'month_open', 'month_solved',
-                      'week_open', 'week_solved', 'count_task']
-        return df
+    df.resolution_seconds = df.resolution_seconds.astype('Int64')
+    df.columns = incidents_columns
+    return df
+
+
+def get_top_user_condition():
+    """
+    Синтаксис:
+    ----------
+
+    **get_top_user_condition** ()
+
+    Описание:
+    ---------
+
+    Функция возвращает строку с условием отбора обращений для рейтинга ТОП-5 пользователей (без обращений сотрудников
+    отдела сопровождения и служебных учетных записей) для подстановки в секцию WHERE SQL-запроса.
+
+    Returns:
+    -------
+        **String**
+    """
+    excluded_units = ', '.join([f"'{unit}'" for unit in top_user_excluded_units])
+    excluded_users = ', '.join([f"'{user}'" for user in top_user_excluded_users])
+
+    return f"(unit IS NULL OR unit NOT IN ({excluded_units})) AND user IS NOT NULL AND user NOT IN ({excluded_users})"
+
+
+def get_kpi_queries(line, table_name, tag, condition, with_time, with_top, source):
+    """
+    Синтаксис:
+    ----------
+
+    **get_kpi_queries** (line, table_name, tag, condition, with_time, with_top, source)
+
+    Описание:
+    ---------
+
+    Функция возвращает список частей SQL-запроса функции **get_period_kpi** для одной техподдержки и одного периода.
+    Каждая часть возвращает строки вида (tag, kind, item, value, weight), где kind - вид показателя:
+
+        '**kpi**' - value - количество обращений, weight - количество обратившихся пользователей
+
+        '**seconds**' - value - количество заявок с известным временем выполнения, weight - суммарное время их
+        выполнения в секундах
+
+        '**top**' - item - пользователь, value - количество его обращений
+
+    Параметры:
+    ----------
+        **line**: *str* - код техподдержки ('etsp', 'sue', 'osp')
+
+        **table_name**: *str* - название таблицы техподдержки в БД
+
+        **tag**: *str* - тег части запроса
+
+        **condition**: *str* - условие отбора за период
+
+        **with_time**: *bool* - рассчитывать ли среднее время выполнения заявок
+
+        **with_top**: *bool* - рассчитывать ли ТОП-5 пользователей
 
+        **source**: *str* - источник данных: 'tickets' - таблица обращений, 'rollup' - таблица ticket_daily_rollup
+
+    Returns:
+    -------
+        **List**
+    """
+    if source == 'rollup':
+        from_where = f"FROM {rollup_table_name} WHERE line = '{line}' AND {condition}"
     else:
-        df = pd.read_sql(f"""
-            SELECT * 
-            FROM sue_data 
-            WHERE (status = 'Проблема' or status = 'Массовый инцидент')
-                AND EXTRACT(year from reg_date) = {week_year}
-                AND EXTRACT(week from reg_date) = {week}
-        """, con=engine)
-        df.timedelta = pd.to_timedelta(df.timedelta)
-        df.columns = ['Дата обращения', 'Тип', 'Номер', 'Описание', 'Плановое время', 'Фактическое время',
-                      'Пользователь', 'timedelta', 'Отдел', 'Дата', 'finish_date', 'month_open', 'month_solved',
-                      'week_open', 'week_solved', 'count_task']
-        return df
+        from_where = f"FROM {table_name} WHERE {condition}"
+
+    queries = [f"""
+            (SELECT '{tag}' AS tag, 'kpi' AS kind, NULL AS item, SUM(count_task) AS value,
+                    COUNT(DISTINCT user) AS weight
+            {from_where})"""]
+
+    if with_time and source == 'rollup':
+        queries.append(f"""
+            (SELECT '{tag}' AS tag, 'seconds' AS kind, NULL AS item, SUM(resolution_count) AS value,
+                    SUM(resolution_seconds) AS weight
+            {from_where})""")
+    elif with_time:
+        queries.append(f"""
+            (SELECT '{tag}' AS tag, 'seconds' AS kind, NULL AS item, COUNT({resolution_seconds_sql}) AS value,
+                    SUM({resolution_seconds_sql}) AS weight
+            {from_where})""")
+
+    if with_top:
+        queries.append(f"""
+            (SELECT '{tag}' AS tag, 'top' AS kind, user AS item, SUM(count_task) AS value, NULL AS weight
+            {from_where} AND {get_top_user_condition()}
+            GROUP BY user
+            ORDER BY SUM(count_task) DESC
+            LIMIT 5)""")
+
+    return queries
+
+
+def get_period_kpi(start_date, end_date, month, month_year, week, week_year, type_period, top_lines=('etsp', 'sue'),
+                   source=None):
+    """
+    Синтаксис:
+    ----------
+
+    **get_period_kpi** (start_date, end_date, month, month_year, week, week_year, type_period,
+    top_lines=('etsp', 'sue'), source=None)
+
+    Описание:
+    ---------
+
+    Функция принимает на вход параметры фильтрации (тип фильтра, выбранный номер недели, месяца, даты начала/окончания
+    периода) и одним запросом к БД рассчитывает показатели по трем техподдержкам за выбранный и предшествующий периоды:
+    количество обращений, количество обратившихся пользователей, среднее время выполнения заявок и ТОП-5
+    пользователей. Агрегирование выполняется на стороне БД (GROUP BY), поэтому из БД передаются только итоговые
+    значения, а не строки обращений. Каждая часть запроса помечается тегом и видом показателя.
+
+    Возвращает словарь с ключами 'etsp', 'sue', 'osp', 'etsp_prev', 'sue_prev', 'osp_prev'. Значением является
+    словарь с ключами:
+
+        '**count_tasks**' - количество обращений
+
+        '**users**' - количество обратившихся пользователей
+
+        '**mean_time**' - среднее время выполнения заявок (только для выбранного периода)
+
+        '**top_users**' - датафрейм ТОП-5 пользователей (только для техподдержек из top_lines)
+
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **get_period_condition**
+
+        **top_lines**: *tuple*, default ('etsp', 'sue') - техподдержки, для которых рассчитывается ТОП-5 пользователей
+
+        **source**: *str*, default None - источник данных:
+
+            '**tickets**' - таблицы обращений техподдержек
+
+            '**rollup**' - таблица ежедневных агрегатов ticket_daily_rollup (см. **update_ticket_rollup**)
+
+            По умолчанию используется значение kpi_source из файла настроек.
+
+    Returns:
+    -------
+        **Dict**
+    """
+    source = lc.kpi_source if source is None else source
+    column = 'day' if source == 'rollup' else 'reg_date'
+    period = dict(start_date=start_date,
+                  end_date=end_date,
+                  month=month,
+                  month_year=month_year,
+                  week=week,
+                  week_year=week_year,
+                  type_period=type_period,
+                  column=column)
+    condition = get_period_condition(**period)
+    prev_condition = get_prev_period_condition(**period)
+
+    queries = []
+    for line, table_name in support_lines:
+        queries += get_kpi_queries(line=line,
+                                   table_name=table_name,
+                                   tag=line,
+                                   condition=condition,
+                                   with_time=True,
+                                   with_top=line in top_lines,
+                                   source=source)
+        queries += get_kpi_queries(line=line,
+                                   table_name=table_name,
+                                   tag=f'{line}_prev',
+                                   condition=prev_condition,
+                                   with_time=False,
+                                   with_top=False,
+                                   source=source)
+
+    df = pd.read_sql('\n            UNION ALL'.join(queries), con=engine)
+    df.value = pd.to_numeric(df.value).fillna(0)
+    df.weight = pd.to_numeric(df.weight).fillna(0)
+
+    kpi = {}
+    for tag in ('etsp', 'sue', 'osp', 'etsp_prev', 'sue_prev', 'osp_prev'):
+        tag_df = df[df.tag == tag]
+        totals_df = tag_df[tag_df.kind == 'kpi']
+        seconds_df = tag_df[tag_df.kind == 'seconds']
+        top_df = tag_df[tag_df.kind == 'top'].sort_values('value', ascending=False)
+
+        if seconds_df.value.sum() > 0:
+            mean_time = pd.to_timedelta(seconds_df.weight.sum() / seconds_df.value.sum(), unit='s')
+        else:
+            mean_time = pd.NaT
+
+        kpi[tag] = dict(count_tasks=int(totals_df.value.sum()),
+                        users=int(totals_df.weight.sum()),
+                        mean_time=mean_time,
+                        top_users=pd.DataFrame(dict(zip(top_user_columns,
+                                                        [top_df.item.to_list(),
+                                                         top_df.value.astype(int).to_list()]))))
+
+    return kpi
+
+
+def update_ticket_rollup(days=None):
+    """
+    Синтаксис:
+    ----------
+
+    **update_ticket_rollup** (days=None)
+
+    Описание:
+    ---------
+
+    Функция пересчитывает таблицу ежедневных агрегатов ticket_daily_rollup по данным таблиц обращений трех
+    техподдержек. В таблице хранится по одной строке на день, техподдержку, пользователя и отдел: количество
+    обращений, суммарное время выполнения заявок (в секундах) и количество заявок с известным временем выполнения.
+    Пересчитываются дни регистрации обращений, которые за последние days дней были зарегистрированы или выполнены
+    (solved_date): заявка, выполненная позже, чем через days дней после регистрации, обновляет агрегаты дня своей
+    регистрации. Строки за пересчитываемые дни удаляются и записываются заново, поэтому функцию можно запускать
+    повторно. Если days не указан, используется значение rollup_days из файла настроек; при days=0 таблица
+    пересчитывается за всю историю. Возвращает количество записанных строк.
+
+    Таблица создается функцией **create_ticket_daily_rollup** модуля passport.db_migrations, обновление запускается
+    командой python -m passport.jobs rollup.
+
+    Параметры:
+    ----------
+        **days**: *int*, default None - количество последних дней для пересчета
+
+    Returns:
+    -------
+        **int**
+    """
+    days = lc.rollup_days if days is None else days
+    since = date.today() - timedelta(days=days) if days else None
+
+    frames = []
+    changed_days = {}
+    for line, table_name in support_lines:
+        if since is None:
+            df = pd.read_sql(f"""
+                SELECT reg_date, user, unit, {resolution_seconds_sql} AS resolution_seconds, count_task
+                FROM {table_name}
+            """, con=engine, parse_dates=['reg_date'])
+        else:
+            changed_days[line] = pd.read_sql(text(f"""
+                SELECT DISTINCT DATE(reg_date) AS day
+                FROM {table_name}
+                WHERE reg_date >= :since OR solved_date >= :since
+            """), con=engine, params={'since': since}).day.to_list()
+            if not changed_days[line]:
+                continue
+            df = pd.read_sql(text(f"""
+                SELECT reg_date, user, unit, {resolution_seconds_sql} AS resolution_seconds, count_task
+                FROM {table_name}
+                WHERE DATE(reg_date) IN :days
+            """).bindparams(bindparam('days', expanding=True)), con=engine, params={'days': changed_days[line]},
+                parse_dates=['reg_date'])
+        df['day'] = df.reg_date.dt.date
+        df = df.groupby(['day', 'user', 'unit'], dropna=False).agg(
+            count_task=('count_task', 'sum'),
+            resolution_seconds=('resolution_seconds', 'sum'),
+            resolution_count=('resolution_seconds', 'count')).reset_index()
+        df['line'] = line
+        frames.append(df)
+
+    rollup_columns = ['day', 'line', 'user', 'unit', 'count_task', 'resolution_seconds', 'resolution_count']
+    rollup_df = pd.concat(frames, ignore_index=True)[rollup_columns] if frames else pd.DataFrame(columns=rollup_columns)
+    with engine.begin() as connection:
+        if since is None:
+            connection.execute(text(f"DELETE FROM {rollup_table_name}"))
+        for line, line_days in changed_days.items():
+            if line_days:
+                connection.execute(text(f"DELETE FROM {rollup_table_name} WHERE line = :line AND day IN :days")
+                                   .bindparams(bindparam('days', expanding=True)),
+                                   {'line': line, 'days': line_days})
+        rollup_df.to_sql(rollup_table_name,
+                         con=connection,
+                         index=False,
+                         if_exists='append')
+    lw.log_writer(log_msg=f'Ticket rollup updated since {since}, days: '
+                          f'{sum(len(line_days) for line_days in changed_days.values())}, rows: {len(rollup_df)}')
+
+    return len(rollup_df)
 
 
 def get_osp_names_projects():
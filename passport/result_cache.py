@@ -0,0 +1,533 @@
+import functools
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+import passport.load_cfg as lc
+import passport.log_writer as lw
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+key_separator = '|'
+
+tickets_namespaces = ('support',)
+
+in_flight = {}
+in_flight_lock = threading.Lock()
+
+
+class MemoryBackend:
+    """
+    Описание:
+    ---------
+    Кэш в памяти процесса с вытеснением давно не использовавшихся записей (LRU) и временем жизни записей.
+
+    Параметры:
+    ----------
+        **size**: *int* - максимальное количество записей
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def keys(self, namespace):
+        with self.lock:
+            return [key for key in self.entries if key.startswith(namespace + key_separator)]
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def lock_key(self, key, timeout):
+        return nullcontext(True)
+
+
+class FileBackend:
+    """
+    Описание:
+    ---------
+    Кэш в файловой системе, общий для всех процессов приложения. Каждая запись хранится в отдельном файле,
+    имя которого содержит ключ записи (пространство имен и период) и хэш ключа.
+
+    Параметры:
+    ----------
+        **path**: *str* - директория для хранения записей
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def get_path(self, key):
+        namespace, period_start, period_end, _ = key.split(key_separator, 3)
+        key_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, f'{namespace}_{period_start}_{period_end}_{key_hash}.pkl')
+
+    def get(self, key):
+        try:
+            with open(self.get_path(key), 'rb') as cache_file:
+                stored_key, expires_at, value = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if stored_key != key or expires_at < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        path = self.get_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as cache_file:
+            pickle.dump((key, time.time() + ttl, value), cache_file)
+        os.replace(tmp_path, path)
+
+    def keys(self, namespace):
+        keys = []
+        for path in glob.glob(os.path.join(self.path, f'{namespace}_*.pkl')):
+            try:
+                with open(path, 'rb') as cache_file:
+                    keys.append(pickle.load(cache_file)[0])
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        return keys
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    @contextmanager
+    def lock_key(self, key, timeout):
+        if fcntl is None:
+            yield False
+            return
+
+        with open(f'{self.get_path(key)}.lock', 'a') as lock_file:
+            deadline = time.monotonic() + timeout
+            acquired = False
+            while not acquired:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(0.05)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class RedisBackend:
+    """
+    Описание:
+    ---------
+    Кэш в Redis (или совместимом хранилище), общий для всех процессов и серверов приложения. Время жизни записей
+    контролируется самим хранилищем.
+
+    Параметры:
+    ----------
+        **url**: *str* - адрес подключения к Redis
+
+        **prefix**: *str* - префикс ключей приложения
+    """
+
+    def __init__(self, url, prefix):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def keys(self, namespace):
+        return [key.decode('utf-8')[len(self.prefix):]
+                for key in self.client.scan_iter(match=f'{self.prefix}{namespace}{key_separator}*')]
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    @contextmanager
+    def lock_key(self, key, timeout):
+        lock = self.client.lock(f'{self.prefix}lock:{key}', timeout=timeout, blocking_timeout=timeout)
+        acquired = lock.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+
+def create_backend(name=lc.result_cache_backend):
+    """
+    Синтаксис:
+    ----------
+    **create_backend** (name=lc.result_cache_backend)
+
+    Описание:
+    ---------
+    Функция создает хранилище кэша результатов по его названию из файла настроек: 'memory', 'file' или 'redis'.
+    Если модуль redis не установлен, используется кэш в памяти процесса.
+
+    Параметры:
+    ----------
+        **name**: *str* - название хранилища
+
+    Returns:
+    ----------
+        **MemoryBackend**, **FileBackend** or **RedisBackend**
+    """
+    if name == 'file':
+        return FileBackend(path=lc.result_cache_dir)
+    if name == 'redis':
+        if redis is not None:
+            return RedisBackend(url=lc.result_cache_redis_url, prefix=lc.result_cache_prefix)
+        lw.log_writer(log_msg='Result cache: redis module is not installed, memory backend is used')
+    return MemoryBackend(size=lc.result_cache_size)
+
+
+backend = create_backend()
+figure_backend = MemoryBackend(size=lc.figure_cache_size)
+
+
+def make_key(namespace, period_start, period_end, params):
+    """
+    Синтаксис:
+    ----------
+    **make_key** (namespace, period_start, period_end, params)
+
+    Описание:
+    ---------
+    Функция формирует ключ записи кэша. Ключ содержит пространство имен, полуинтервал дат [period_start, period_end),
+    от данных которого зависит результат, и параметры выбора периода. Даты в ключе используются при сбросе записей
+    (см. **invalidate**).
+
+    Параметры:
+    ----------
+        **namespace**: *str* - пространство имен (например, название вкладки)
+
+        **period_start**: *date* - дата начала данных, использованных в расчете
+
+        **period_end**: *date* - дата окончания данных (не включается)
+
+        **params**: *dict* - параметры выбора периода
+
+    Returns:
+    ----------
+        **str**
+    """
+    params_str = ','.join(f'{name}={params[name]}' for name in sorted(params))
+    return key_separator.join([namespace, period_start.isoformat(), period_end.isoformat(), params_str])
+
+
+def cached_call(key, func, kwargs, ttl=lc.result_cache_ttl):
+    """
+    Синтаксис:
+    ----------
+    **cached_call** (key, func, kwargs, ttl=lc.result_cache_ttl)
+
+    Описание:
+    ---------
+    Функция возвращает результат func(**kwargs) из кэша результатов. При отсутствии записи функция вызывает func и
+    сохраняет сериализованный результат в кэш на ttl секунд. Одновременные вызовы с одним ключом объединяются
+    (см. **single_flight**), поэтому расчет выполняется один раз. Ошибки хранилища записываются в лог-файл и не
+    прерывают расчет.
+
+    Параметры:
+    ----------
+        **key**: *str* - ключ записи (см. **make_key**)
+
+        **func**: *callable* - функция расчета
+
+        **kwargs**: *dict* - именованные параметры функции
+
+        **ttl**: *int* - время жизни записи в секундах
+
+    Returns:
+    ----------
+        Результат вызова func
+    """
+    value = read_value(key=key)
+    if value is not None:
+        return value
+
+    return single_flight(key=key, func=compute_value, kwargs=dict(key=key, func=func, kwargs=kwargs, ttl=ttl))
+
+
+def read_value(key):
+    """
+    Синтаксис:
+    ----------
+    **read_value** (key)
+
+    Описание:
+    ---------
+    Функция читает и десериализует запись кэша результатов. Возвращает None при отсутствии записи или ошибке
+    хранилища.
+
+    Параметры:
+    ----------
+        **key**: *str* - ключ записи
+
+    Returns:
+    ----------
+        Сохраненный результат или None
+    """
+    try:
+        value = backend.get(key)
+    except Exception as error:
+        lw.log_writer(log_msg=f'Result cache read failed: {error}')
+        return None
+
+    return None if value is None else pickle.loads(value)
+
+
+def compute_value(key, func, kwargs, ttl):
+    """
+    Синтаксис:
+    ----------
+    **compute_value** (key, func, kwargs, ttl)
+
+    Описание:
+    ---------
+    Функция рассчитывает результат func(**kwargs) и сохраняет его в кэш результатов. Если включена блокировка между
+    процессами (result_cache cross_worker_lock), расчет выполняется под блокировкой хранилища: процесс, дождавшийся
+    блокировки, сначала проверяет, не сохранил ли результат другой процесс. Если блокировку не удалось получить за
+    lock_timeout секунд, расчет выполняется без нее.
+
+    Параметры:
+    ----------
+        Аналогичны параметрам функции **cached_call**
+
+    Returns:
+    ----------
+        Результат вызова func
+    """
+    lock = backend.lock_key(key, lc.result_cache_lock_timeout) if lc.result_cache_cross_worker_lock \
+        else nullcontext(False)
+
+    with lock as acquired:
+        if acquired:
+            value = read_value(key=key)
+            if value is not None:
+                return value
+
+        result = func(**kwargs)
+        try:
+            backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as error:
+            lw.log_writer(log_msg=f'Result cache write failed: {error}')
+
+    return result
+
+
+def single_flight(key, func, kwargs):
+    """
+    Синтаксис:
+    ----------
+    **single_flight** (key, func, kwargs)
+
+    Описание:
+    ---------
+    Функция объединяет одновременные одинаковые вызовы внутри процесса: первый поток с данным ключом вызывает
+    func(**kwargs), а потоки, обратившиеся с тем же ключом до окончания расчета, дожидаются и получают его результат
+    (или то же исключение). Если расчет не закончился за lock_timeout секунд, ожидающий поток выполняет его сам.
+
+    Параметры:
+    ----------
+        **key**: *str* - ключ расчета
+
+        **func**: *callable* - функция расчета
+
+        **kwargs**: *dict* - именованные параметры функции
+
+    Returns:
+    ----------
+        Результат вызова func
+    """
+    with in_flight_lock:
+        flight = in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = in_flight[key] = dict(event=threading.Event(), result=None, error=None)
+
+    if not leader:
+        if flight['event'].wait(timeout=lc.result_cache_lock_timeout):
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+        lw.log_writer(log_msg=f'Single flight "{key}" wait timed out, computing in place')
+        return func(**kwargs)
+
+    try:
+        flight['result'] = func(**kwargs)
+        return flight['result']
+    except Exception as error:
+        flight['error'] = error
+        raise
+    finally:
+        with in_flight_lock:
+            in_flight.pop(key, None)
+        flight['event'].set()
+
+
+def invalidate(namespaces, start_date, end_date):
+    """
+    Синтаксис:
+    ----------
+    **invalidate** (namespaces, start_date, end_date)
+
+    Описание:
+    ---------
+    Функция удаляет из кэша результатов записи указанных пространств имен, данные которых пересекаются с периодом
+    [start_date, end_date]. Вызывается при изменении таблиц техподдержек (см. **ld.get_period_bounds**). Возвращает
+    количество удаленных записей.
+
+    Параметры:
+    ----------
+        **namespaces**: *Iterable* - пространства имен
+
+        **start_date**: *date* - дата начала измененного периода
+
+        **end_date**: *date* - дата окончания измененного периода
+
+    Returns:
+    ----------
+        **int**
+    """
+    removed = 0
+    try:
+        for namespace in namespaces:
+            for key in backend.keys(namespace):
+                period_start, period_end = key.split(key_separator)[1:3]
+                if period_start <= end_date.isoformat() and period_end > start_date.isoformat():
+                    backend.delete(key)
+                    removed += 1
+    except Exception as error:
+        lw.log_writer(log_msg=f'Result cache invalidation failed: {error}')
+
+    if removed:
+        lw.log_writer(log_msg=f'Result cache: {removed} entries invalidated for {start_date} - {end_date}')
+
+    return removed
+
+
+def fingerprint(value, digest):
+    """
+    Синтаксис:
+    ----------
+    **fingerprint** (value, digest)
+
+    Описание:
+    ---------
+    Функция добавляет в хэш digest содержимое значения value: для датафреймов и серий - хэши строк
+    (pd.util.hash_pandas_object) вместе с индексом, названиями и типами столбцов, для словарей, списков и кортежей -
+    их элементы, для остальных значений - repr. Значения с одинаковым содержимым дают одинаковый хэш независимо от
+    того, где и когда они были получены.
+
+    Параметры:
+    ----------
+        **value**: - значение
+
+        **digest**: - объект хэша hashlib
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(type(value).__name__.encode('utf-8'))
+        names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr((list(names), list(value.index.names), str(value.dtypes))).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for name in sorted(value, key=repr):
+            fingerprint(value=name, digest=digest)
+            fingerprint(value=value[name], digest=digest)
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'[')
+        for item in value:
+            fingerprint(value=item, digest=digest)
+        digest.update(b']')
+    else:
+        digest.update(repr(value).encode('utf-8'))
+        digest.update(b',')
+
+
+def cached_figure(func):
+    """
+    Синтаксис:
+    ----------
+    **@cached_figure**
+
+    Описание:
+    ---------
+    Декоратор кэширует графики по содержимому входных данных: ключ записи - название функции построения графика и хэш
+    всех ее параметров (см. **fingerprint**), поэтому одинаковые графики за разные периоды и для разных пользователей
+    строятся один раз. Графики хранятся в памяти процесса (figure_backend) без сериализации, запись вытесняется по
+    LRU или через figure_ttl секунд. Возвращаемый из кэша график общий для всех вызовов и не должен изменяться.
+    Если параметры не удалось хэшировать, график строится без кэша.
+
+    Параметры:
+    ----------
+        **func**: *callable* - функция построения графика
+
+    Returns:
+    ----------
+        **callable**
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        digest = hashlib.sha1()
+        try:
+            fingerprint(value=[args, kwargs], digest=digest)
+        except TypeError as error:
+            lw.log_writer(log_msg=f'Figure cache: {func.__name__} parameters are not hashable: {error}')
+            return func(*args, **kwargs)
+
+        key = key_separator.join(['figure', func.__name__, digest.hexdigest()])
+        figure = figure_backend.get(key)
+        if figure is None:
+            figure = func(*args, **kwargs)
+            figure_backend.set(key, figure, lc.figure_cache_ttl)
+        return figure
+
+    return wrapper
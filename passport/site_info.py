@@ -1,8 +1,79 @@
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import text
 
 import passport.load_cfg as cfg
+import passport.load_data as ld
 import passport.log_writer as lw
+import passport.result_cache as rc
+
+metrika_columns = ['date', 'startURL', 'Level1', 'Level2', 'Level3', 'Level4', 'visits', 'users', 'pageviews',
+                   'bounceRate', 'pageDepth', 'avgVisitDurationSeconds']
+
+metrika_store_columns = ['date', 'level1', 'level2', 'level3', 'level4', 'start_url', 'visits', 'users', 'pageviews',
+                         'bounce_rate', 'page_depth', 'avg_visit_duration_seconds']
+
+metrika_count_columns = ['visits', 'users', 'pageviews']
+
+metrika_dimensions = ['ym:s:date', 'ym:s:startURLPathLevel1', 'ym:s:startURLPathLevel2', 'ym:s:startURLPathLevel3',
+                      'ym:s:startURLPathLevel4', 'ym:s:startURL']
+
+metrika_metrics = ['ym:s:visits', 'ym:s:users', 'ym:s:pageviews', 'ym:s:bounceRate', 'ym:s:pageDepth',
+                   'ym:s:avgVisitDurationSeconds']
+
+metrika_api_columns = dict(zip(metrika_dimensions + metrika_metrics, metrika_store_columns))
+
+metrika_warehouse_aggregates = {
+    'visits': 'SUM(visits)',
+    'users': 'SUM(users)',
+    'pageviews': 'SUM(pageviews)',
+    'bounce_rate': 'SUM(bounce_rate * visits) / NULLIF(SUM(visits), 0)',
+    'page_depth': 'SUM(page_depth * visits) / NULLIF(SUM(visits), 0)',
+    'avg_visit_duration_seconds': 'SUM(avg_visit_duration_seconds * visits) / NULLIF(SUM(visits), 0)'
+}
+
+# Наборы измерений и метрик, необходимые каждому потребителю данных вкладки "Сайт": график по дням, таблица итогов,
+# графики по разделам сайта (итоги за период по уровням пути) и график посещаемости раздела "Государственная служба"
+# по дням (по 3 уровню пути).
+metrika_plans = {
+    'line': (('ym:s:date',), ('ym:s:visits', 'ym:s:users', 'ym:s:pageviews')),
+    'stat': ((), tuple(metrika_metrics)),
+    'sections': (tuple(metrika_dimensions[1:]), tuple(metrika_metrics)),
+    'pages': (('ym:s:date', 'ym:s:startURLPathLevel3'), ('ym:s:visits', 'ym:s:users'))
+}
+# Потребители, данные которых при metrika_source = 'api' запрашиваются из API Яндекс.Метрики отдельным запросом за весь
+# период: ответ содержит не больше строки на день. Данные по уровням пути рассчитываются из локального хранилища по
+# дням, так как количество их строк растет с длиной периода.
+metrika_api_plans = ('line', 'stat')
+
+metrika_table_name = 'metrika_daily'
+
+metrika_pool = ThreadPoolExecutor(max_workers=cfg.metrika_page_concurrency, thread_name_prefix='metrika_page')
+metrika_plan_pool = ThreadPoolExecutor(max_workers=len(metrika_plans), thread_name_prefix='metrika_plan')
+
+metrika_tagged_columns = ['date', 'level1', 'level2', 'level3', 'level4', 'startURL', 'visits', 'users', 'pageviews',
+                          'bounceRate', 'pageDepth', 'avgVisitDurationSeconds']
+
+names_sections_dict = {'molodezhnyy-sovet/': 'Молодежный совет', 'elektronnyy-byudzhet/': 'Электронный бюджет',
+                       'o-kaznachejstve/': 'О Межрегиональном бухгалтерском УФК',
+                       'inaya-deyatelnost/': 'Иная деятельность', 'dokumenty/': 'Документы',
+                       'gis/': 'Информационные системы', 'novosti-i-soobshheniya/': 'Новости и сообщения',
+                       'poisk/': 'Поиск', 'priem-obrashhenij/': 'Прием обращений'}
+
+site_sections = ['Электронный бюджет', 'О Межрегиональном бухгалтерском УФК', 'Иная деятельность', 'Документы',
+                 'Прием обращений']
 
 names_el_budget_dict = {'podklyuchenie-k-sisteme': 'Подключение к системе',
                         'podsistema-ucheta-i-otchetnosti': 'Подсистема учета и отчетности',
@@ -18,6 +89,280 @@ names_gossluzba_dict = {'konkurs-na-zameshchenie-vakantnykh-dolzhnostey': 'Ко
                                                                                          'ФК'}
 
 
+class MetrikaClient:
+    """
+    Описание:
+    ---------
+    Клиент API Яндекс.Метрики. Использует общую сессию requests с пулом соединений (keep-alive), ограничивает время
+    установки соединения и ожидания ответа и повторяет запросы, завершившиеся ошибкой соединения, кодом 429 или 5xx,
+    с экспоненциально растущей паузой со случайным разбросом. Время выполнения каждого запроса записывается в
+    лог-файл и накапливается в статистике (см. **latency_stats**). Если breaker_failures запросов подряд не удались
+    после всех попыток, клиент прекращает обращаться к API на breaker_cooldown секунд (размыкает цепь) и сразу
+    возвращает None.
+
+    Параметры:
+    ----------
+        **token**: *str* - OAuth-токен Яндекс.Метрики
+
+        **base_url**: *str* - адрес API (для проверки можно указать адрес локального сервера-заглушки)
+
+        **connect_timeout**: *float* - время ожидания установки соединения, секунд
+
+        **read_timeout**: *float* - время ожидания ответа, секунд
+
+        **retries**: *int* - количество повторных попыток
+
+        **backoff**: *float* - начальная пауза между попытками, секунд
+
+        **pool_size**: *int* - размер пула соединений
+
+        **breaker_failures**: *int* - количество неудачных запросов подряд, после которого цепь размыкается
+
+        **breaker_cooldown**: *float* - время, на которое размыкается цепь, секунд
+
+        **retry_after_max**: *float* - максимальная пауза по заголовку Retry-After, секунд
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, token, base_url, connect_timeout, read_timeout, retries, backoff, pool_size, breaker_failures,
+                 breaker_cooldown, retry_after_max):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.retry_after_max = retry_after_max
+        self.failures = 0
+        self.open_until = 0.0
+
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': 'OAuth ' + token})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.stats_lock = threading.Lock()
+        self.stats = dict(requests=0, errors=0, retries=0, rejected=0, total_seconds=0.0, max_seconds=0.0)
+
+    def get_page(self, params, offset):
+        """
+        Синтаксис:
+        ----------
+        **get_page** (params, offset)
+
+        Описание:
+        ---------
+        Функция запрашивает из API одну страницу отчета, начиная со строки offset (нумерация с 1). Возвращает
+        разобранный ответ сервера или None, если сервер вернул ошибку и попытки исчерпаны или цепь разомкнута.
+
+        Параметры:
+        ----------
+            **params**: *dict* - параметры запроса к API
+
+            **offset**: *int* - номер первой строки страницы
+
+        Returns:
+        ----------
+            **dict** or **None**
+        """
+        if self.is_open():
+            with self.stats_lock:
+                self.stats['rejected'] += 1
+            lw.log_writer(log_msg=f'Metrika circuit is open, request offset {offset} skipped')
+            return None
+
+        metrika_data, unavailable = self.request_page(params=params, offset=offset)
+        self.record_result(unavailable=unavailable)
+        return metrika_data
+
+    def is_open(self):
+        """
+        Синтаксис:
+        ----------
+        **is_open** ()
+
+        Описание:
+        ---------
+        Функция возвращает True, если цепь разомкнута и запросы к API не выполняются.
+
+        Returns:
+        ----------
+            **bool**
+        """
+        with self.stats_lock:
+            return time.monotonic() < self.open_until
+
+    def record_result(self, unavailable):
+        """
+        Синтаксис:
+        ----------
+        **record_result** (unavailable)
+
+        Описание:
+        ---------
+        Функция учитывает результат запроса: успешный запрос сбрасывает счетчик неудач, а после breaker_failures
+        неудач подряд цепь размыкается на breaker_cooldown секунд.
+
+        Параметры:
+        ----------
+            **unavailable**: *bool* - признак недоступности API (см. **request_page**)
+
+        Returns:
+        ----------
+            None
+        """
+        with self.stats_lock:
+            if not unavailable:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures < self.breaker_failures:
+                return
+            self.failures = 0
+            self.open_until = time.monotonic() + self.breaker_cooldown
+        lw.log_writer(log_msg=f'Metrika circuit opened for {self.breaker_cooldown} s')
+
+    def request_page(self, params, offset):
+        """
+        Синтаксис:
+        ----------
+        **request_page** (params, offset)
+
+        Описание:
+        ---------
+        Функция выполняет запрос страницы с повторами. Возвращает кортеж (разобранный ответ сервера или None,
+        признак недоступности API: ошибка соединения, 429 или 5xx после всех попыток).
+
+        Параметры:
+        ----------
+            **params**: *dict* - параметры запроса к API
+
+            **offset**: *int* - номер первой строки страницы
+
+        Returns:
+        ----------
+            **Tuple**
+        """
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(f'{self.base_url}/stat/v1/data',
+                                            params={**params, 'offset': offset},
+                                            timeout=self.timeout)
+                status = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as error:
+                response, status = None, type(error).__name__
+            latency = time.perf_counter() - started
+
+            self.add_stats(latency=latency, failed=status != 200)
+            lw.log_writer(log_msg=f"server response code {status}, offset {offset}, {latency:.3f} s")
+
+            if status == 200:
+                return response.json(), False
+            if response is not None and status not in self.retry_statuses:
+                return None, False
+            if attempt == self.retries:
+                return None, True
+
+            with self.stats_lock:
+                self.stats['retries'] += 1
+            time.sleep(self.get_delay(attempt=attempt, response=response))
+
+        return None, True
+
+    def get_delay(self, attempt, response):
+        """
+        Синтаксис:
+        ----------
+        **get_delay** (attempt, response)
+
+        Описание:
+        ---------
+        Функция возвращает паузу перед повторной попыткой: значение заголовка Retry-After, если сервер его указал
+        (не более retry_after_max секунд), иначе backoff * 2 ** attempt со случайным разбросом от 50 до 150 %.
+
+        Параметры:
+        ----------
+            **attempt**: *int* - номер неудачной попытки (с 0)
+
+            **response**: *Response* or *None* - ответ сервера (None при ошибке соединения)
+
+        Returns:
+        ----------
+            **float**
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.retry_after_max)
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def add_stats(self, latency, failed):
+        """
+        Синтаксис:
+        ----------
+        **add_stats** (latency, failed)
+
+        Описание:
+        ---------
+        Функция добавляет запрос в статистику (см. **latency_stats**).
+
+        Параметры:
+        ----------
+            **latency**: *float* - время выполнения запроса, секунд
+
+            **failed**: *bool* - признак неудачного запроса
+
+        Returns:
+        ----------
+            None
+        """
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['errors'] += int(failed)
+            self.stats['total_seconds'] += latency
+            self.stats['max_seconds'] = max(self.stats['max_seconds'], latency)
+
+    def latency_stats(self):
+        """
+        Синтаксис:
+        ----------
+        **latency_stats** ()
+
+        Описание:
+        ---------
+        Функция возвращает статистику запросов: количество запросов, ошибок и повторов, среднее и максимальное время
+        выполнения запроса.
+
+        Returns:
+        ----------
+            **Dict**
+        """
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['mean_seconds'] = stats['total_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+
+metrika_client = MetrikaClient(token=cfg.token,
+                               base_url=cfg.metrika_base_url,
+                               connect_timeout=cfg.metrika_connect_timeout,
+                               read_timeout=cfg.metrika_read_timeout,
+                               retries=cfg.metrika_retries,
+                               backoff=cfg.metrika_backoff,
+                               pool_size=cfg.metrika_page_concurrency,
+                               breaker_failures=cfg.metrika_breaker_failures,
+                               breaker_cooldown=cfg.metrika_breaker_cooldown,
+                               retry_after_max=cfg.metrika_retry_after_max)
+
+revalidating = set()
+revalidating_lock = threading.Lock()
+# Номер поколения данных локального хранилища: увеличивается после каждой успешной повторной загрузки и входит в ключ
+# записей вкладки "Сайт" в кэше результатов (см. **callbacks.get_cached_tab**)
+revalidation_state = dict(generation=0)
+
+
 def get_site_info(start_date, end_date):
     """
     Синтаксис:
@@ -26,10 +371,201 @@ def get_site_info(start_date, end_date):
 
     Описание:
     ---------
-    Функция отвечает за получение данных из API Яндекс.Метрики. Принимает на вход временной период в виде даты начала
-    и даты окончания. Возвращает датафрейм с данными полученными из API Яндекс.Метрики. Также функция записывает в
-    лог-файл код ответа сервера Яндекс.Метрики. В случае если данные отсутствуют, то будет возвращен датафрейм с
-    единственной строкой содержащей нулевые значения.
+    Функция отвечает за получение данных Яндекс.Метрики. Принимает на вход временной период в виде даты начала
+    и даты окончания. Данные за прошедшие дни берутся из локального хранилища (см. **read_metrika_days**), из API
+    Яндекс.Метрики загружаются только отсутствующие в хранилище дни и последние metrika_mutable_days дней, данные
+    за которые еще могут измениться. Возвращает датафрейм с данными за весь период. В случае если данные отсутствуют,
+    то будет возвращен датафрейм с единственной строкой содержащей нулевые значения.
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    if cfg.metrika_source == 'warehouse':
+        return format_metrika_df(df=read_metrika_warehouse(start_date=start_date, end_date=end_date), stale=False)
+
+    days = [day.date() for day in pd.date_range(start=str(start_date)[:10], end=str(end_date)[:10], freq='D')]
+    mutable_since = date.today() - timedelta(days=cfg.metrika_mutable_days - 1)
+    revalidate_before = datetime.now() - timedelta(seconds=cfg.metrika_revalidate_seconds)
+
+    with closing(connect_metrika_store()) as connection:
+        fetched_days = read_fetched_days(connection=connection, days=days)
+        missing_days = [day for day in days if day not in fetched_days]
+        outdated_days = [day for day in days
+                         if day in fetched_days and day >= mutable_since and fetched_days[day] < revalidate_before]
+
+        complete = fetch_metrika_days(connection=connection, days=missing_days)
+        revalidate_metrika_days(days=outdated_days)
+
+        metrika_df = read_metrika_days(connection=connection, start_date=days[0], end_date=days[-1]) if days \
+            else pd.DataFrame(columns=metrika_store_columns)
+
+    stale = not complete or len(outdated_days) > 0
+    lw.log_writer(log_msg=f'Metrika {start_date} - {end_date}: {len(days) - len(missing_days)} days from cache, '
+                          f'{len(missing_days)} days requested, {len(outdated_days)} days revalidating, '
+                          f'stale: {stale}, total rows: {len(metrika_df)}')
+
+    return format_metrika_df(df=metrika_df, stale=stale)
+
+
+def format_metrika_df(df, stale):
+    """
+    Синтаксис:
+    ----------
+    **format_metrika_df** (df, stale)
+
+    Описание:
+    ---------
+    Функция приводит датафрейм со столбцами metrika_store_columns к виду, который ожидают графики вкладки "Сайт":
+    задает столбцам названия metrika_columns, а для пустого датафрейма возвращает единственную строку с нулевыми
+    значениями. Признак устаревших данных сохраняется в атрибуте attrs['stale'].
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - данные Яндекс.Метрики
+
+        **stale**: *bool* - признак устаревших данных
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    if len(df) == 0:
+        df = pd.DataFrame(columns=metrika_columns)
+        df.loc[0] = '-', '-', '-', '-', '-', 0, 0, 0, 0, 0, 0, 0
+    else:
+        df.columns = metrika_columns
+
+    df.attrs['stale'] = stale
+    return df
+
+
+def read_metrika_warehouse(start_date, end_date, dimensions=None, metrics=None):
+    """
+    Синтаксис:
+    ----------
+    **read_metrika_warehouse** (start_date, end_date, dimensions=None, metrics=None)
+
+    Описание:
+    ---------
+    Функция читает данные Яндекс.Метрики за период из таблицы metrika_daily основной БД (см.
+    **sync_metrika_daily**). Строки агрегируются в БД по указанным измерениям (по умолчанию - по дню и уровням пути,
+    без измерений - итоги за период): количественные метрики суммируются, относительные - усредняются с весом по
+    количеству визитов. Период не ограничен размером ответа API.
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+        **dimensions**: *list*, default None - измерения (столбцы metrika_store_columns)
+
+        **metrics**: *list*, default None - метрики (столбцы metrika_store_columns)
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    dimensions = metrika_store_columns[:6] if dimensions is None else list(dimensions)
+    metrics = metrika_store_columns[6:] if metrics is None else list(metrics)
+
+    select = ', '.join(dimensions + [f'{metrika_warehouse_aggregates[metric]} AS {metric}' for metric in metrics])
+    group_by = f'GROUP BY {", ".join(dimensions)} ORDER BY {dimensions[0]}' if dimensions else ''
+    metrika_df = pd.read_sql(text(f"""
+        SELECT {select}
+        FROM {metrika_table_name}
+        WHERE date >= :start_date AND date <= :end_date
+        {group_by}
+    """), con=ld.engine, params=dict(start_date=str(start_date)[:10], end_date=str(end_date)[:10]))
+
+    if 'date' in dimensions:
+        metrika_df['date'] = pd.to_datetime(metrika_df['date']).dt.strftime('%Y-%m-%d')
+    metrika_df[metrics] = metrika_df[metrics].fillna(0)
+    lw.log_writer(log_msg=f'Metrika {start_date} - {end_date} from {metrika_table_name}, rows: {len(metrika_df)}')
+
+    return metrika_df
+
+
+def sync_metrika_daily(days=None):
+    """
+    Синтаксис:
+    ----------
+    **sync_metrika_daily** (days=None)
+
+    Описание:
+    ---------
+    Функция загружает ежедневные данные Яндекс.Метрики в таблицу metrika_daily основной БД. По умолчанию загружаются
+    дни, начиная с последнего загруженного дня за вычетом metrika_mutable_days (данные за которые еще могли
+    измениться); days > 0 - последние days дней; days = 0 - вся история, начиная с metrika_sync_start. Данные
+    загружаются периодами по metrika_sync_chunk_days дней, каждый период заменяется в таблице целиком. Возвращает
+    количество загруженных строк.
+
+    Параметры:
+    ----------
+        **days**: *int*, default None - количество последних дней для загрузки
+
+    Returns:
+    ----------
+        **int**
+    """
+    today = date.today()
+    if days is None:
+        with ld.engine.connect() as connection:
+            last_date = connection.execute(text(f'SELECT MAX(date) FROM {metrika_table_name}')).scalar()
+        sync_start = date.fromisoformat(cfg.metrika_sync_start) if last_date is None \
+            else pd.Timestamp(last_date).date() - timedelta(days=cfg.metrika_mutable_days)
+    elif days == 0:
+        sync_start = date.fromisoformat(cfg.metrika_sync_start)
+    else:
+        sync_start = today - timedelta(days=days - 1)
+
+    rows = 0
+    chunk_start = sync_start
+    while chunk_start <= today:
+        chunk_end = min(chunk_start + timedelta(days=cfg.metrika_sync_chunk_days - 1), today)
+        chunk_df = fetch_site_info(start_date=chunk_start.isoformat(), end_date=chunk_end.isoformat())
+        if chunk_df is None:
+            raise RuntimeError(f'Metrika data for {chunk_start} - {chunk_end} can not be loaded')
+
+        chunk_df['date'] = pd.to_datetime(chunk_df['date']).dt.date
+        with ld.engine.begin() as connection:
+            connection.execute(text(f'DELETE FROM {metrika_table_name} '
+                                    f'WHERE date >= :start_date AND date <= :end_date'),
+                               dict(start_date=chunk_start, end_date=chunk_end))
+            chunk_df.to_sql(metrika_table_name, con=connection, index=False, if_exists='append')
+
+        rows += len(chunk_df)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    lw.log_writer(log_msg=f'{metrika_table_name} synced since {sync_start}, rows: {rows}')
+
+    return rows
+
+
+def get_site_plans(start_date, end_date, consumers=tuple(metrika_plans)):
+    """
+    Синтаксис:
+    ----------
+    **get_site_plans** (start_date, end_date, consumers=tuple(metrika_plans))
+
+    Описание:
+    ---------
+    Функция получает данные Яндекс.Метрики за период для каждого потребителя из consumers минимальным набором
+    измерений (см. metrika_plans): 'line' - визиты, посетители и просмотры по дням, 'stat' - итоги за период,
+    'sections' - итоги за период по уровням пути, 'pages' - визиты и посетители по дням и 3 уровню пути. При
+    metrika_source = 'warehouse' каждый набор агрегируется отдельным запросом к таблице metrika_daily (запросы
+    выполняются одновременно). Иначе наборы потребителей metrika_api_plans запрашиваются из API отдельными
+    запросами (одновременно, см. **fetch_site_plan**), а наборы по уровням пути рассчитываются из строк локального
+    хранилища по дням (см. **get_site_info**) и наследуют их признак устаревших данных; если запрос к API не удался,
+    набор также рассчитывается из хранилища и помечается как устаревший. Одинаковые наборы рассчитываются один раз.
+    Возвращает словарь {потребитель: датафрейм}; столбцы датафреймов названы как в metrika_tagged_columns.
 
     Параметры:
     ----------
@@ -37,55 +573,595 @@ def get_site_info(start_date, end_date):
 
         **end_date**: *str* - дата окончания периода
 
+        **consumers**: *tuple* - потребители данных
+
+    Returns:
+    ----------
+        **Dict**
+    """
+    plans = {metrika_plans[consumer] for consumer in consumers}
+
+    if cfg.metrika_source == 'warehouse':
+        futures = {plan: metrika_plan_pool.submit(read_site_plan, start_date, end_date, *plan) for plan in plans}
+        results = {plan: future.result() for plan, future in futures.items()}
+    else:
+        api_plans = {metrika_plans[consumer] for consumer in consumers if consumer in metrika_api_plans}
+        futures = {plan: metrika_plan_pool.submit(fetch_site_plan, start_date, end_date, *plan) for plan in api_plans}
+        store_plans = plans - api_plans
+        metrika_df = get_site_info(start_date=start_date, end_date=end_date) if store_plans else None
+        results = {plan: aggregate_site_plan(df=metrika_df, dimensions=plan[0], metrics=plan[1])
+                   for plan in store_plans}
+
+        for plan, future in futures.items():
+            results[plan] = future.result()
+            if results[plan] is None:
+                lw.log_writer(log_msg=f'Metrika plan {plan[0]} for {start_date} - {end_date} is not loaded, '
+                                      f'aggregated from the local store')
+                if metrika_df is None:
+                    metrika_df = get_site_info(start_date=start_date, end_date=end_date)
+                results[plan] = aggregate_site_plan(df=metrika_df, dimensions=plan[0], metrics=plan[1])
+                results[plan].attrs['stale'] = True
+
+    return {consumer: results[metrika_plans[consumer]] for consumer in consumers}
+
+
+def fetch_site_plan(start_date, end_date, dimensions, metrics):
+    """
+    Синтаксис:
+    ----------
+    **fetch_site_plan** (start_date, end_date, dimensions, metrics)
+
+    Описание:
+    ---------
+    Функция запрашивает данные Яндекс.Метрики за период из API по набору измерений и метрик (см.
+    **fetch_site_info**). Возвращает None, если данные получить не удалось.
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+        **dimensions**: *tuple* - измерения API
+
+        **metrics**: *tuple* - метрики API
+
+    Returns:
+    ----------
+        **DataFrame** or **None**
+    """
+    metrika_df = fetch_site_info(start_date=str(start_date)[:10], end_date=str(end_date)[:10],
+                                 dimensions=list(dimensions), metrics=list(metrics))
+    if metrika_df is None:
+        return None
+
+    metrika_df = metrika_df.rename(columns=dict(zip(metrika_store_columns, metrika_tagged_columns)))
+    metrika_df.attrs['stale'] = False
+    return metrika_df
+
+
+def read_site_plan(start_date, end_date, dimensions, metrics):
+    """
+    Синтаксис:
+    ----------
+    **read_site_plan** (start_date, end_date, dimensions, metrics)
+
+    Описание:
+    ---------
+    Функция читает данные Яндекс.Метрики за период из таблицы metrika_daily, агрегированные в БД по набору измерений
+    и метрик (см. **read_metrika_warehouse**).
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+        **dimensions**: *tuple* - измерения API
+
+        **metrics**: *tuple* - метрики API
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    metrika_df = read_metrika_warehouse(start_date=start_date,
+                                        end_date=end_date,
+                                        dimensions=[metrika_api_columns[name] for name in dimensions],
+                                        metrics=[metrika_api_columns[name] for name in metrics])
+
+    metrika_df = metrika_df.rename(columns=dict(zip(metrika_store_columns, metrika_tagged_columns)))
+    metrika_df.attrs['stale'] = False
+    return metrika_df
+
+
+def aggregate_site_plan(df, dimensions, metrics):
+    """
+    Синтаксис:
+    ----------
+    **aggregate_site_plan** (df, dimensions, metrics)
+
+    Описание:
+    ---------
+    Функция рассчитывает данные по набору измерений и метрик из строк по дням и уровням пути (см. **get_site_info**)
+    так же, как **read_metrika_warehouse**: количественные метрики суммируются, относительные - усредняются с весом
+    по количеству визитов. Признак устаревших данных переносится из исходного датафрейма.
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - данные Яндекс.Метрики по полному набору измерений
+
+        **dimensions**: *tuple* - измерения API
+
+        **metrics**: *tuple* - метрики API
+
     Returns:
     ----------
         **DataFrame**
     """
-    headers = {'Authorization': 'OAuth ' + cfg.token}
+    labels = dict(zip(metrika_dimensions + metrika_metrics, metrika_tagged_columns))
+    dimension_columns = [labels[name] for name in dimensions]
+    metric_columns = [labels[name] for name in metrics]
+    weighted_columns = [column for column in metric_columns if column not in metrika_count_columns]
+
+    df = df.set_axis(metrika_tagged_columns, axis=1)
+    values = df[metrika_tagged_columns[len(metrika_dimensions):]].astype(float)
+    values[weighted_columns] = values[weighted_columns].mul(values['visits'], axis=0)
+    if dimension_columns:
+        totals = pd.concat([df[dimension_columns], values], axis=1).groupby(dimension_columns, as_index=False,
+                                                                            dropna=False).sum()
+    else:
+        totals = values.sum().to_frame().T
+    totals[weighted_columns] = totals[weighted_columns].div(totals['visits'].where(totals['visits'] > 0),
+                                                            axis=0).fillna(0)
+
+    metrika_df = totals[dimension_columns + metric_columns].astype(
+        {column: int for column in metric_columns if column in metrika_count_columns})
+    metrika_df.attrs['stale'] = df.attrs.get('stale', False)
+    return metrika_df
+
+
+def fetch_metrika_days(connection, days):
+    """
+    Синтаксис:
+    ----------
+    **fetch_metrika_days** (connection, days)
+
+    Описание:
+    ---------
+    Функция загружает из API Яндекс.Метрики данные за дни из списка days (непрерывными периодами) и сохраняет их в
+    локальное хранилище. Возвращает False, если данные хотя бы за один период получить не удалось (в том числе при
+    разомкнутой цепи, см. **MetrikaClient**).
+
+    Параметры:
+    ----------
+        **connection**: *sqlite3.Connection* - соединение с хранилищем
+
+        **days**: *list of date* - упорядоченный список дней
+
+    Returns:
+    ----------
+        **Bool**
+    """
+    complete = True
+    for gap_start, gap_end in get_gaps(days=days):
+        gap_df = fetch_site_info(start_date=gap_start.isoformat(), end_date=gap_end.isoformat())
+        if gap_df is None:
+            complete = False
+        else:
+            write_metrika_days(connection=connection, df=gap_df, start_date=gap_start, end_date=gap_end)
+
+    return complete
+
+
+def revalidate_metrika_days(days):
+    """
+    Синтаксис:
+    ----------
+    **revalidate_metrika_days** (days)
+
+    Описание:
+    ---------
+    Функция запускает в фоновом потоке повторную загрузку данных за дни из списка days, которые уже есть в
+    локальном хранилище, но еще могли измениться. После успешной загрузки записи вкладки "Сайт" в кэше результатов,
+    пересекающиеся с этими днями, удаляются. Для периода, загрузка которого уже выполняется, новый поток не
+    запускается.
+
+    Параметры:
+    ----------
+        **days**: *list of date* - упорядоченный список дней
+
+    Returns:
+    ----------
+        None
+    """
+    for gap_start, gap_end in get_gaps(days=days):
+        with revalidating_lock:
+            if (gap_start, gap_end) in revalidating:
+                continue
+            revalidating.add((gap_start, gap_end))
+
+        threading.Thread(target=revalidate_gap,
+                         kwargs=dict(gap_start=gap_start, gap_end=gap_end),
+                         name=f'metrika_{gap_start}_{gap_end}',
+                         daemon=True).start()
+
+
+def revalidate_gap(gap_start, gap_end):
+    """
+    Синтаксис:
+    ----------
+    **revalidate_gap** (gap_start, gap_end)
+
+    Описание:
+    ---------
+    Функция повторно загружает данные Яндекс.Метрики за период, увеличивает номер поколения данных
+    (revalidation_state) и сбрасывает записи кэша результатов вкладки "Сайт" за этот период (см.
+    **revalidate_metrika_days**). Номер поколения входит в ключ записи, поэтому результат, рассчитанный по прежним
+    данным и сохраненный в кэш уже после сброса, новым запросам не возвращается.
+
+    Параметры:
+    ----------
+        **gap_start**: *date* - дата начала периода
+
+        **gap_end**: *date* - дата окончания периода
+
+    Returns:
+    ----------
+        None
+    """
+    try:
+        with closing(connect_metrika_store()) as connection:
+            days = [day.date() for day in pd.date_range(start=gap_start, end=gap_end, freq='D')]
+            if fetch_metrika_days(connection=connection, days=days):
+                with revalidating_lock:
+                    revalidation_state['generation'] += 1
+                rc.invalidate(namespaces=('site',), start_date=gap_start, end_date=gap_end)
+    except Exception as error:
+        lw.log_writer(log_msg=f'Metrika revalidation {gap_start} - {gap_end} failed: {error}')
+    finally:
+        with revalidating_lock:
+            revalidating.discard((gap_start, gap_end))
+
+
+def fetch_site_info(start_date, end_date, dimensions=None, metrics=None):
+    """
+    Синтаксис:
+    ----------
+    **fetch_site_info** (start_date, end_date, dimensions=None, metrics=None)
+
+    Описание:
+    ---------
+    Функция отвечает за получение данных из API Яндекс.Метрики за период. Данные запрашиваются страницами по
+    metrika_page_size строк: после первой страницы, содержащей общее количество строк отчета, остальные страницы
+    запрашиваются одновременно (не более metrika_page_concurrency запросов) и преобразуются в датафрейм по мере
+    получения. Чтобы страницы не пересекались и не теряли строки, отчет сортируется по всем запрошенным измерениям.
+    Возвращает датафрейм со столбцами metrika_store_columns (соответствующими запрошенным измерениям и метрикам) или
+    None, если сервер Яндекс.Метрики вернул ошибку хотя бы для одной страницы или количество полученных строк не
+    совпадает с общим количеством строк отчета.
+
+    Параметры:
+    ----------
+        **start_date**: *str* - дата начала периода
+
+        **end_date**: *str* - дата окончания периода
+
+        **dimensions**: *list*, default None - измерения API (по умолчанию - metrika_dimensions)
+
+        **metrics**: *list*, default None - метрики API (по умолчанию - metrika_metrics)
+
+    Returns:
+    ----------
+        **DataFrame** or **None**
+    """
     sources_sites = {
-        'metrics': 'ym:s:visits,ym:s:users,ym:s:pageviews,ym:s:bounceRate,ym:s:pageDepth,ym:s:avgVisitDurationSeconds',
-        'dimensions': 'ym:s:date,ym:s:startURLPathLevel1,ym:s:startURLPathLevel2,ym:s:startURLPathLevel3,'
-                      'ym:s:startURLPathLevel4,ym:s:startURL',
+        'metrics': ','.join(metrika_metrics if metrics is None else metrics),
+        'dimensions': ','.join(metrika_dimensions if dimensions is None else dimensions),
         'date1': start_date,
         'date2': end_date,
         'accuracy': 'full',
         'ids': 23871871,
-        'limit': 10000,
+        'limit': cfg.metrika_page_size,
         'filters': "ym:s:startURLPathLevel1=='https://mbufk.roskazna.gov.ru/'"
     }
-    lw.log_writer(log_msg=f"server response code {sources_sites}")
+    if sources_sites['dimensions']:
+        sources_sites['sort'] = sources_sites['dimensions']
+    else:
+        del sources_sites['dimensions']
 
-    response = requests.get('https://api-metrika.yandex.net/stat/v1/data',
-                            params=sources_sites,
-                            headers=headers)
-    lw.log_writer(log_msg=f"server response code {response.status_code}")
+    metrika_data = metrika_client.get_page(params=sources_sites, offset=1)
+    if metrika_data is None:
+        return None
 
-    metrika_data = response.json()
-    lw.log_writer(log_msg=f"Data load successfully, total row loaded: {metrika_data['total_rows']}")
+    total_rows = metrika_data['total_rows']
+    lw.log_writer(log_msg=f"Data load successfully, total row loaded: {total_rows}")
 
-    if response.status_code != 200 or metrika_data['total_rows'] == 0:
-        metrika_df = pd.DataFrame(
-            columns=['date', 'startURL', 'Level1', 'Level2', 'Level3', 'Level4', 'visits', 'users', 'pageviews',
-                     'bounceRate', 'pageDepth', 'avgVisitDurationSeconds'])
-        metrika_df.loc[0] = '-', '-', '-', '-', '-', 0, 0, 0, 0, 0, 0, 0
+    pages = {1: parse_metrika_page(metrika_data=metrika_data)}
+    futures = {metrika_pool.submit(metrika_client.get_page, sources_sites, offset): offset
+               for offset in range(1 + cfg.metrika_page_size, total_rows + 1, cfg.metrika_page_size)}
+    for future in as_completed(futures):
+        page_data = future.result()
+        if page_data is None:
+            for pending in futures:
+                pending.cancel()
+            return None
+        pages[futures[future]] = parse_metrika_page(metrika_data=page_data)
 
-    else:
-        list_of_dicts = []
-        dimensions_list = metrika_data['query']['dimensions']
-        metrics_list = metrika_data['query']['metrics']
-        for data_item in metrika_data['data']:
-            metrics_dict = {}
-            for i, dimension in enumerate(data_item['dimensions']):
-                metrics_dict[dimensions_list[i]] = dimension['name']
-            for i, metric in enumerate(data_item['metrics']):
-                metrics_dict[metrics_list[i]] = metric
-            list_of_dicts.append(metrics_dict)
-
-        metrika_df = pd.DataFrame(list_of_dicts)
-        metrika_df.columns = ['date', 'startURL', 'Level1', 'Level2', 'Level3', 'Level4', 'visits', 'users',
-                              'pageviews', 'bounceRate', 'pageDepth', 'avgVisitDurationSeconds']
+    if len(pages) > 1:
+        lw.log_writer(log_msg=f'Metrika {start_date} - {end_date}: {len(pages)} pages loaded')
 
-    return metrika_df
+    df = pd.concat([pages[offset] for offset in sorted(pages)], ignore_index=True)
+    if 'dimensions' in sources_sites and len(df) != total_rows:
+        lw.log_writer(log_msg=f'Metrika {start_date} - {end_date}: {len(df)} rows loaded, expected {total_rows}')
+        return None
+
+    return df
+
+
+def parse_metrika_page(metrika_data):
+    """
+    Синтаксис:
+    ----------
+    **parse_metrika_page** (metrika_data)
+
+    Описание:
+    ---------
+    Функция преобразует страницу отчета Яндекс.Метрики в датафрейм со столбцами metrika_store_columns,
+    соответствующими измерениям и метрикам запроса (для запроса без измерений - итоги отчета). Столбцы
+    измерений и метрик строятся целиком из массивов ответа (без промежуточного словаря для каждой строки); метрики
+    получают тип float64, количественные метрики (metrika_count_columns) - int64.
+
+    Параметры:
+    ----------
+        **metrika_data**: *dict* - разобранный ответ сервера Яндекс.Метрики
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    dimension_columns = [metrika_api_columns[dimension] for dimension in metrika_data['query']['dimensions']]
+    metric_columns = [metrika_api_columns[metric] for metric in metrika_data['query']['metrics']]
+    data = metrika_data['data'] if dimension_columns else [dict(dimensions=[], metrics=metrika_data['totals'])]
+    rows = len(data)
+
+    dimension_cells = list(zip(*[item['dimensions'] for item in data])) or [()] * len(dimension_columns)
+    columns = {column: np.fromiter(map(itemgetter('name'), cells), dtype=object, count=rows)
+               for column, cells in zip(dimension_columns, dimension_cells)}
+
+    metrics = np.array([item['metrics'] for item in data], dtype='float64').reshape(rows, len(metric_columns))
+    for i, column in enumerate(metric_columns):
+        columns[column] = metrics[:, i].astype('int64') if column in metrika_count_columns else metrics[:, i]
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(rows), copy=False)
+
+
+def get_gaps(days):
+    """
+    Синтаксис:
+    ----------
+    **get_gaps** (days)
+
+    Описание:
+    ---------
+    Функция объединяет упорядоченный список дней в непрерывные периоды. Возвращает список кортежей
+    (дата начала, дата окончания).
+
+    Параметры:
+    ----------
+        **days**: *list of date* - упорядоченный список дней
+
+    Returns:
+    ----------
+        **List**
+    """
+    gaps = []
+    for day in days:
+        if gaps and day - gaps[-1][1] == timedelta(days=1):
+            gaps[-1][1] = day
+        else:
+            gaps.append([day, day])
+
+    return [tuple(gap) for gap in gaps]
+
+
+def connect_metrika_store():
+    """
+    Синтаксис:
+    ----------
+    **connect_metrika_store** ()
+
+    Описание:
+    ---------
+    Функция открывает соединение с локальным хранилищем данных Яндекс.Метрики (SQLite) и при необходимости создает
+    таблицы: metrika_rows - строки отчета по дням, metrika_days - дни, данные за которые загружены.
+
+    Returns:
+    ----------
+        **sqlite3.Connection**
+    """
+    connection = sqlite3.connect(cfg.metrika_cache_path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(f'CREATE TABLE IF NOT EXISTS metrika_rows ({", ".join(metrika_store_columns)})')
+    connection.execute('CREATE INDEX IF NOT EXISTS ix_metrika_rows_date ON metrika_rows (date)')
+    connection.execute('CREATE TABLE IF NOT EXISTS metrika_days (date TEXT PRIMARY KEY, fetched_at TEXT)')
+    return connection
+
+
+def read_fetched_days(connection, days):
+    """
+    Синтаксис:
+    ----------
+    **read_fetched_days** (connection, days)
+
+    Описание:
+    ---------
+    Функция возвращает словарь {день: дата и время загрузки} для дней из списка days, данные за которые уже загружены
+    в локальное хранилище.
+
+    Параметры:
+    ----------
+        **connection**: *sqlite3.Connection* - соединение с хранилищем
+
+        **days**: *list of date* - список дней
+
+    Returns:
+    ----------
+        **Dict**
+    """
+    if not days:
+        return {}
+
+    rows = connection.execute('SELECT date, fetched_at FROM metrika_days WHERE date >= ? AND date <= ?',
+                              (days[0].isoformat(), days[-1].isoformat())).fetchall()
+    return {date.fromisoformat(day): datetime.fromisoformat(fetched_at) for day, fetched_at in rows}
+
+
+def read_metrika_days(connection, start_date, end_date):
+    """
+    Синтаксис:
+    ----------
+    **read_metrika_days** (connection, start_date, end_date)
+
+    Описание:
+    ---------
+    Функция читает из локального хранилища строки отчета Яндекс.Метрики за период.
+
+    Параметры:
+    ----------
+        **connection**: *sqlite3.Connection* - соединение с хранилищем
+
+        **start_date**: *date* - дата начала периода
+
+        **end_date**: *date* - дата окончания периода
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    return pd.read_sql_query(f'SELECT {", ".join(metrika_store_columns)} FROM metrika_rows '
+                             f'WHERE date >= ? AND date <= ? ORDER BY date',
+                             con=connection,
+                             params=(start_date.isoformat(), end_date.isoformat()))
+
+
+def write_metrika_days(connection, df, start_date, end_date):
+    """
+    Синтаксис:
+    ----------
+    **write_metrika_days** (connection, df, start_date, end_date)
+
+    Описание:
+    ---------
+    Функция заменяет в локальном хранилище строки отчета Яндекс.Метрики за период данными из df и отмечает все дни
+    периода как загруженные (в том числе дни без визитов).
+
+    Параметры:
+    ----------
+        **connection**: *sqlite3.Connection* - соединение с хранилищем
+
+        **df**: *DataFrame* - данные из API Яндекс.Метрики (см. **fetch_site_info**)
+
+        **start_date**: *date* - дата начала периода
+
+        **end_date**: *date* - дата окончания периода
+
+    Returns:
+    ----------
+        None
+    """
+    days = [day.date().isoformat() for day in pd.date_range(start=start_date, end=end_date, freq='D')]
+    fetched_at = datetime.now().isoformat(timespec='seconds')
+
+    with connection:
+        connection.execute('DELETE FROM metrika_rows WHERE date >= ? AND date <= ?',
+                           (start_date.isoformat(), end_date.isoformat()))
+        connection.executemany(f'INSERT INTO metrika_rows VALUES ({", ".join("?" * len(metrika_store_columns))})',
+                               df[metrika_store_columns].itertuples(index=False, name=None))
+        connection.executemany('INSERT OR REPLACE INTO metrika_days (date, fetched_at) VALUES (?, ?)',
+                               [(day, fetched_at) for day in days])
+
+
+class UrlClassifier:
+    """
+    Описание:
+    ---------
+    Классификатор адресов страниц сайта по разделам. Строится один раз по словарю {часть пути: название раздела}:
+    все части пути объединяются в одно скомпилированное регулярное выражение, а результаты классификации уже
+    встречавшихся адресов запоминаются. Если адрес содержит несколько частей пути, выбирается раздел, указанный в
+    словаре первым. Для адресов, не относящихся ни к одному разделу, возвращается None.
+
+    Параметры:
+    ----------
+        **names**: *dict* - словарь, в котором ключами являются части пути, а значениями - названия разделов
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.priority = {search_str: num for num, search_str in enumerate(names)}
+        self.pattern = re.compile('(?=(' + '|'.join(re.escape(search_str) for search_str in names) + '))')
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def classify_url(self, url):
+        """
+        Функция возвращает название раздела для адреса url.
+        """
+        if url not in self.memo:
+            matches = {match.group(1) for match in self.pattern.finditer(url)} if isinstance(url, str) else set()
+            section = self.names[min(matches, key=self.priority.get)] if matches else None
+            with self.lock:
+                self.memo[url] = section
+        return self.memo[url]
+
+    def classify(self, urls):
+        """
+        Функция возвращает серию с названиями разделов для серии адресов urls. Каждый уникальный адрес
+        классифицируется один раз.
+        """
+        sections = {url: self.classify_url(url) for url in urls.unique()}
+        return urls.map(sections)
+
+
+sections_classifier = UrlClassifier(names=names_sections_dict)
+el_budget_classifier = UrlClassifier(names=names_el_budget_dict)
+gossluzba_classifier = UrlClassifier(names=names_gossluzba_dict)
+
+gossluzba_level3 = ('https://mbufk.roskazna.gov.ru/inaya-deyatelnost/gosudarstvennaya-sluzhba-v'
+                    '-mezhregionalnom-bukhgalterskom-ufk/')
+
+
+def tag_metrika_sections(df):
+    """
+    Синтаксис:
+    ----------
+    **tag_metrika_sections** (df)
+
+    Описание:
+    ---------
+    Функция размечает данные Яндекс.Метрики по уровням пути разделами сайта. Возвращает копию датафрейма с
+    дополнительными столбцами: 'section' - раздел сайта (по 2 уровню пути), 'subsection' - подраздел
+    раздела "Электронный бюджет" (по 3 уровню пути), 'page' - подраздел раздела "Государственная служба в МБУ ФК"
+    (по адресу страницы). Размеченный датафрейм используется функциями **get_data_visits_graph**,
+    **get_el_budget_data** и **get_gossluzba_data**.
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - итоги за период по уровням пути (потребитель 'sections', см. **get_site_plans**)
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    df = df.copy()
+    df['level3'] = df['level3'].fillna('')
+    df['level4'] = df['level4'].fillna('')
+    df = df.astype({column: int for column in metrika_count_columns})
+
+    df['section'] = sections_classifier.classify(df['level2'])
+    df['subsection'] = el_budget_classifier.classify(df['level3'])
+    df['page'] = gossluzba_classifier.classify(df['startURL'])
+
+    return df
 
 
 def get_data_visits_graph(df):
@@ -101,45 +1177,23 @@ def get_data_visits_graph(df):
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм полученный из API Яндекс.Метрики
+        **df**: *DataFrame* - датафрейм, размеченный функцией **tag_metrika_sections**
 
     Returns:
     ----------
         **DataFrame**
     """
-    df.columns = ('date', 'level1', 'level2', 'level3', 'level4',
-                  'startURL', 'visits', 'users', 'pageviews', 'bounceRate', 'pageDepth',
-                  'avgVisitDurationSeconds')
+    metrics = ['visits', 'users', 'pageviews', 'bounceRate', 'pageDepth', 'avgVisitDurationSeconds']
 
-    df = df
-    df['level4'] = df['level4'].fillna('')
-    for col in ['visits', 'users', 'pageviews']:
-        df[col] = df[col].astype(int)
-
-    molod_sovet_df = pd.DataFrame(
-        df[df['level4'].str.contains('molodezhnyy-sovet')].groupby(['level4'], as_index=False)[
-            ['visits', 'users', 'pageviews', 'bounceRate', 'pageDepth', 'avgVisitDurationSeconds']].sum().rename(
-            columns={'level4': 'level2'}))
-    df = pd.DataFrame(df.groupby(['level2'], as_index=False)[
-                          ['visits', 'users', 'pageviews', 'bounceRate', 'pageDepth',
-                           'avgVisitDurationSeconds']].sum())
-    df = df.append(molod_sovet_df).reset_index()
-    df.drop('index', axis=1, inplace=True)
-
-    names_dict = {'molodezhnyy-sovet/': 'Молодежный совет', 'elektronnyy-byudzhet/': 'Электронный бюджет',
-                  'o-kaznachejstve/': 'О Межрегиональном бухгалтерском УФК', 'inaya-deyatelnost/': 'Иная деятельность',
-                  'dokumenty/': 'Документы', 'gis/': 'Информационные системы',
-                  'novosti-i-soobshheniya/': 'Новости и сообщения',
-                  'poisk/': 'Поиск', 'priem-obrashhenij/': 'Прием обращений'}
-
-    for search_str, name in names_dict.items():
-        mask = df[df['level2'].str.contains(search_str)].index
-        df.loc[mask, 'level2'] = name
-
-    site_sections = ['Электронный бюджет', 'О Межрегиональном бухгалтерском УФК', 'Иная деятельность', 'Документы',
-                     'Прием обращений']
-    mask = df['level2'].isin(site_sections)
-    df = df.loc[mask].sort_values('visits', ascending=True)
+    molod_sovet_df = df[df['level4'].str.contains('molodezhnyy-sovet')].groupby(['level4'], as_index=False)[
+        metrics].sum().rename(columns={'level4': 'level2'})
+    molod_sovet_df['level2'] = sections_classifier.classify(molod_sovet_df['level2'])
+
+    sections_df = df.groupby(['level2', 'section'], as_index=False)[metrics].sum()
+    sections_df['level2'] = sections_df['section']
+
+    df = pd.concat([sections_df[['level2'] + metrics], molod_sovet_df], ignore_index=True)
+    df = df.loc[df['level2'].isin(site_sections)].sort_values('visits', ascending=True)
 
     return df
 
@@ -153,11 +1207,13 @@ def get_el_budget_data(df, names_el_budget):
     Описание:
     ---------
     Функция преобразует данные полученные из API Яндекс.Метрики, используется для построения графиков отображающего
-    среднее время визита и среднюю глубину просмотра каждого подраздела в разделе сайта "Электронный бюджет"
+    среднее время визита и среднюю глубину просмотра каждого подраздела в разделе сайта "Электронный бюджет".
+    Возвращает средние значения глубины просмотра и продолжительности визита, индексированные названием подраздела;
+    оба графика строятся по одному этому расчету
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм полученный из API Яндекс.Метрики
+        **df**: *DataFrame* - датафрейм, размеченный функцией **tag_metrika_sections**
 
         **names_el_budget**: *dict*  словарь, в котором ключами являются часть пути, по которому расположена страница
         (3 уровень), а значением - название раздела на русском языке
@@ -166,13 +1222,9 @@ def get_el_budget_data(df, names_el_budget):
     ----------
         **DataFrame**
     """
-    df['level3'] = df['level3'].fillna('')
-    for search_str, name in names_el_budget.items():
-        mask = df[df['level3'].str.contains(search_str)].index
-        df.loc[mask, 'level3'] = name
-    df = df[df['level3'].isin(names_el_budget.values())]
+    df = df[df['subsection'].isin(names_el_budget.values())]
 
-    return df
+    return df.groupby('subsection')[['pageDepth', 'avgVisitDurationSeconds']].mean()
 
 
 def get_gossluzba_data(df, names_gossluzba):
@@ -188,7 +1240,7 @@ def get_gossluzba_data(df, names_gossluzba):
 
     Параметры:
     ----------
-        **df**: *DataFrame* - датафрейм полученный из API Яндекс.Метрики
+        **df**: *DataFrame* - датафрейм, размеченный функцией **tag_metrika_sections**
 
         **names_gossluzba**: *dict* - словарь, в котором ключами являются часть пути по которому расположена страница
         (3 уровень), а значением - название раздела на русском языке
@@ -197,11 +1249,75 @@ def get_gossluzba_data(df, names_gossluzba):
     ----------
         **DataFrame**
     """
-    mask = df[df.level3 == 'https://mbufk.roskazna.gov.ru/inaya-deyatelnost/gosudarstvennaya-sluzhba-v' 
-                           '-mezhregionalnom-bukhgalterskom-ufk/'].index
-    df = df.loc[mask]
-    for search_str, name in names_gossluzba.items():
-        mask = df[df['startURL'].str.contains(search_str)].index
-        df.loc[mask, 'startURL'] = name
+    df = df[df.level3 == gossluzba_level3].copy()
+    pages = df['page'].where(df['page'].isin(names_gossluzba.values()))
+    df['startURL'] = pages.fillna(df['startURL'])
 
     return df
+
+
+def get_gossluzba_depth_data(df):
+    """
+    Синтаксис:
+    ----------
+    **get_gossluzba_depth_data** (df)
+
+    Описание:
+    ---------
+    Функция рассчитывает среднюю глубину просмотра по каждому подразделу раздела сайта "Государственная служба в
+    МБУ ФК", используется для построения графика **plot_gossluzba_graph_page_dept**
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - датафрейм, полученный функцией **get_gossluzba_data**
+
+    Returns:
+    ----------
+        **Series**
+    """
+    return df.groupby('startURL')['pageDepth'].mean()
+
+
+def get_gossluzba_visits_data(df):
+    """
+    Синтаксис:
+    ----------
+    **get_gossluzba_visits_data** (df)
+
+    Описание:
+    ---------
+    Функция рассчитывает количество визитов и посетителей раздела сайта "Государственная служба в МБУ ФК" по дням,
+    используется для построения графика **visits_gossluzba_site**
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - данные Яндекс.Метрики по дням и 3 уровню пути (потребитель 'pages', см.
+        **get_site_plans**)
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    return df[df.level3 == gossluzba_level3].groupby('date')[['visits', 'users']].sum()
+
+
+def get_site_line_data(df):
+    """
+    Синтаксис:
+    ----------
+    **get_site_line_data** (df)
+
+    Описание:
+    ---------
+    Функция рассчитывает количество визитов, посетителей и просмотров страниц сайта по дням, используется для
+    построения графика **plot_site_line_graph**
+
+    Параметры:
+    ----------
+        **df**: *DataFrame* - данные Яндекс.Метрики по дням (потребитель 'line', см. **get_site_plans**)
+
+    Returns:
+    ----------
+        **DataFrame**
+    """
+    return df.groupby('date')[['visits', 'users', 'pageviews']].sum()
@@ -0,0 +1,47 @@
+"""
+Тесты не используют настройки рабочего окружения: до импорта модулей passport (passport.load_cfg читает
+assets/settings.rkz из текущего каталога при импорте) создается временный каталог с файлом настроек-заглушкой, и
+тесты выполняются из него. Подключение к БД при этом не открывается, логи пишутся во временный каталог.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+test_settings = """
+[metrika]
+token = test-token
+cache_path = metrika_cache.sqlite3
+
+[connect]
+username = test
+password = test
+db = passport
+host = localhost
+port = 3306
+dialect = mysql+pymysql
+
+[table_names]
+etsp_table = etsp
+sue_table = sue
+osp_table = osp
+
+[mail]
+server = localhost
+user = test
+password = test
+"""
+
+start_dir = os.getcwd()
+# корень проекта, чтобы пакет passport импортировался и при запуске pytest не из корня проекта
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+settings_dir = tempfile.mkdtemp(prefix='passport_tests_')
+os.makedirs(os.path.join(settings_dir, 'assets'))
+with open(os.path.join(settings_dir, 'assets', 'settings.rkz'), 'w', encoding='utf8') as settings_file:
+    settings_file.write(test_settings)
+os.chdir(settings_dir)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    os.chdir(start_dir)
+    shutil.rmtree(settings_dir, ignore_errors=True)
@@ -0,0 +1,303 @@
+"""
+Эталонные построения графиков через go.Figure с проверкой свойств plotly (функции go_*) и синтетические данные
+Яндекс.Метрики для сравнения с графиками, собранными словарями (passport.figures). Используются тестом
+tests/test_figures.py и замером времени benchmarks/figure_dicts.py.
+"""
+import datetime as dt
+import itertools
+import random
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import passport.figures as pf
+import passport.site_info as si
+
+
+def make_tagged_df(rows):
+    """
+    Функция формирует синтетический размеченный датафрейм Яндекс.Метрики.
+    """
+    subsections = list(si.names_el_budget_dict.values())
+    pages = list(si.names_gossluzba_dict.values())
+    dates = [(dt.date(2021, 1, 1) + dt.timedelta(days=i)).isoformat() for i in range(90)]
+    return pd.DataFrame({
+        'date': [random.choice(dates) for _ in range(rows)],
+        'level3': si.gossluzba_level3,
+        'startURL': [random.choice(pages) for _ in range(rows)],
+        'subsection': [random.choice(subsections) for _ in range(rows)],
+        'visits': [random.randint(1, 50) for _ in range(rows)],
+        'users': [random.randint(1, 40) for _ in range(rows)],
+        'pageviews': [random.randint(1, 90) for _ in range(rows)],
+        'pageDepth': [random.random() * 5 for _ in range(rows)],
+        'avgVisitDurationSeconds': [random.random() * 600 for _ in range(rows)]
+    })
+
+
+def go_plot_figure_support(first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks):
+    fig_support = go.Figure(go.Bar(y=[first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks],
+                                   x=['ЕЦП', 'СУЭ ФК', 'ОСП'],
+                                   base=0,
+                                   marker=dict(color=['#a92b2b', '#37a17c', '#a2d5f2']),
+                                   text=[first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks],
+                                   textposition='auto'))
+    fig_support.update_layout(autosize=True,
+                              legend=dict(orientation="h",
+                                          yanchor="bottom",
+                                          y=0.2,
+                                          xanchor="right",
+                                          x=0.5),
+                              paper_bgcolor='#ebecf1',
+                              plot_bgcolor='#ebecf1'
+                              )
+    fig_support.update_xaxes(ticks="inside",
+                             tickson="boundaries")
+
+    return fig_support
+
+
+def go_plot_support_pie_figure(first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks):
+    support_pie_figure_labels = ["ЕЦП", "СУЭ ФК", "ОСП"]
+    support_pie_figure_values = [first_tp_count_tasks, second_tp_count_tasks, third_tp_count_tasks]
+    support_pie_figure_colors = ['#a92b2b', '#37a17c', '#a2d5f2']
+
+    support_pie_figure = go.Figure(
+        go.Pie(labels=support_pie_figure_labels,
+               values=support_pie_figure_values,
+               marker_colors=support_pie_figure_colors))
+
+    support_pie_figure.update_traces(hoverinfo="label+percent")
+
+    support_pie_figure.update_layout(paper_bgcolor='#ebecf1',
+                                     showlegend=True)
+
+    return support_pie_figure
+
+
+def go_plot_fig_site_top(df):
+    site_top_figure_colors = ['#003b32', '#40817a', '#afbaa3', '#d0d0b8', '#037c87', '#7cbdc9']
+    fig_site_top = go.Figure([go.Bar(y=df['visits'],
+                                     x=df['level2'],
+                                     orientation='v',
+                                     marker_color=site_top_figure_colors,
+                                     text=df['visits'])])
+    fig_site_top.update_traces(textposition='auto')
+    fig_site_top.update_layout(title_text="Визиты",
+                               paper_bgcolor='#ebecf1',
+                               plot_bgcolor='#ebecf1')
+
+    return fig_site_top
+
+
+def go_plot_site_line_graph(df):
+    traces = [('visits', 'Визиты', '#5d4b63'), ('users', 'Пользователи', '#d74d63'),
+              ('pageviews', 'Просмотры страниц', '#a38182')]
+    site_line_graph = go.Figure()
+    site_line_graph.add_traces([go.Scatter(y=df[column],
+                                           x=df.index,
+                                           mode='lines+markers',
+                                           marker=dict(color=color,
+                                                       size=6),
+                                           line=dict(color=color,
+                                                     width=5),
+                                           name=name) for column, name, color in traces])
+    site_line_graph.update_layout(title_text="Посещение сайта",
+                                  paper_bgcolor='#ebecf1',
+                                  plot_bgcolor='#ebecf1')
+
+    return site_line_graph
+
+
+def go_fig_inf_systems(inf_systems_data, legend_sw):
+    fig_inf_sys = go.Figure()
+    fig_inf_sys.add_traces([go.Bar(y=inf_systems_data.columns,
+                                   x=row,
+                                   name=name,
+                                   orientation='h',
+                                   text=row,
+                                   textposition='inside') for name, row in inf_systems_data.iterrows()])
+    fig_inf_sys.update_layout(barmode='stack',
+                              height=1000,
+                              legend_xanchor='right',
+                              paper_bgcolor='#ebecf1',
+                              plot_bgcolor='#ebecf1',
+                              showlegend=legend_sw)
+    fig_inf_sys.update_yaxes(tickmode="linear")
+
+    return fig_inf_sys
+
+
+def go_plot_el_budget_graph(df, names_el_budget):
+    colors = itertools.cycle(['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006'])
+    page_depth = df['pageDepth'].round(1)
+    fig = go.Figure()
+    fig.add_traces([go.Bar(name=name,
+                           x=[''],
+                           y=[page_depth[name]],
+                           marker=dict(color=color),
+                           text=[page_depth[name]],
+                           textposition='outside')
+                    for name, color in zip(names_el_budget.values(), colors) if name in page_depth.index])
+    fig.update_traces(textfont_size=10,
+                      textfont_family='Arial Black')
+    fig.update_layout(title_text='Глубина просмотра раздела "Электронный бюджет"',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      title_xref='paper')
+
+    return fig
+
+
+def go_plot_el_budget_graph_mean_time(df, names_el_budget):
+    colors = itertools.cycle(['#0187ad', '#8abc01', '#cdbf5c', '#61cbd9', '#607816', '#0a1006'])
+    duration = df['avgVisitDurationSeconds']
+    minutes = (duration // 60 + duration % 60 / 100).round(2)
+    fig = go.Figure()
+    fig.add_traces([go.Bar(name=name,
+                           x=[''],
+                           y=[minutes[name]],
+                           marker=dict(color=color),
+                           text=[str(dt.timedelta(seconds=round(duration[name])))[2:]],
+                           textposition='outside')
+                    for name, color in zip(names_el_budget.values(), colors) if name in duration.index])
+    fig.update_traces(textfont_size=10,
+                      textfont_family='Arial Black',
+                      showlegend=False)
+    fig.update_layout(title_text='Средняя продолжительность визита',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      title_xref='paper')
+
+    return fig
+
+
+def go_plot_gossluzba_graph_page_dept(df):
+    colors = itertools.cycle(['#98bfad', '#ffc4b2', '#ffffcc'])
+    fig = go.Figure()
+    fig.add_traces([go.Bar(name=name,
+                           x=[''],
+                           y=[round(value, 2)],
+                           marker=dict(color=color),
+                           text=[round(value, 1)],
+                           textposition='outside') for name, value, color in zip(df.index, df, colors)])
+    fig.update_traces(textfont_size=10,
+                      textfont_family='Arial Black',
+                      showlegend=True)
+    fig.update_layout(title_text='Глубина просмотра раздела "Государственная служба в МБУ ФК"',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      title_xref='paper')
+
+    return fig
+
+
+def go_visits_gossluzba_site(df):
+    traces = [('users', 'Визиты', '#4eac01'), ('visits', 'Пользователи', '#e93667')]
+    fig = go.Figure()
+    fig.add_traces([go.Scatter(y=df[column],
+                               x=df.index,
+                               mode='lines+markers',
+                               marker=dict(color=color,
+                                           size=6),
+                               line=dict(color=color,
+                                         width=5),
+                               name=name) for column, name, color in traces])
+    fig.update_traces(textfont_size=10,
+                      textfont_family='Arial Black',
+                      showlegend=True)
+    fig.update_layout(title_text='Посещение раздела "Государственная служба в МБУ ФК"',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      title_xref='paper')
+    return fig
+
+
+def go_fig_total(df, colors):
+    totals = df.sum()
+    fig = go.Figure()
+    fig.add_traces([go.Bar(x=[column],
+                           y=[total],
+                           name=column,
+                           marker_color=color,
+                           text=str(total),
+                           textposition='inside') for column, total, color in zip(totals.index, totals, colors)])
+    fig.update_layout(barmode='stack',
+                      legend_xanchor='right',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      showlegend=False)
+    return fig
+
+
+def go_inf_sys_heatmap(df, value):
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=[df.loc[i].to_list() for i in df.index],
+        y=df.index,
+        x=df.columns,
+        colorscale=value))
+    fig_heatmap.update_layout(height=700,
+                              legend_xanchor='right',
+                              paper_bgcolor='#ebecf1',
+                              plot_bgcolor='#ebecf1')
+    return fig_heatmap
+
+
+def go_inf_sys_bar(df, colors, value):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df.columns,
+                         y=df.loc[value],
+                         marker_color=colors,
+                         text=df.loc[value]))
+    fig.update_traces(textposition='auto')
+    fig.update_layout(barmode='stack',
+                      legend_xanchor='right',
+                      paper_bgcolor='#ebecf1',
+                      plot_bgcolor='#ebecf1',
+                      showlegend=False)
+    return fig
+
+
+def get_cases(df):
+    """
+    Функция возвращает список (название графика, построение через go.Figure, построение словарем).
+    """
+    names = si.names_el_budget_dict
+    line_df = si.get_site_line_data(df=df)
+    budget_df = si.get_el_budget_data(df=df, names_el_budget=names)
+    depth_df = si.get_gossluzba_depth_data(df=df)
+    visits_df = si.get_gossluzba_visits_data(df=df)
+    top_df = df.groupby('subsection', as_index=False)['visits'].sum().rename(columns={'subsection': 'level2'})
+    inf_systems_df = pd.DataFrame({f'system_{i}': [random.randint(0, 100) for _ in range(40)]
+                                   for i in range(len(pf.colors_inf_system))},
+                                  index=[f'unit_{i}' for i in range(40)])
+    counts = dict(first_tp_count_tasks=120, second_tp_count_tasks=45, third_tp_count_tasks=7)
+    return [
+        ('plot_figure_support', lambda: go_plot_figure_support(**counts), lambda: pf.plot_figure_support(**counts)),
+        ('plot_support_pie_figure', lambda: go_plot_support_pie_figure(**counts),
+         lambda: pf.plot_support_pie_figure(**counts)),
+        ('plot_fig_site_top', lambda: go_plot_fig_site_top(df=top_df), lambda: pf.plot_fig_site_top(df=top_df)),
+        ('plot_site_line_graph', lambda: go_plot_site_line_graph(df=line_df),
+         lambda: pf.plot_site_line_graph(df=line_df)),
+        ('fig_inf_systems', lambda: go_fig_inf_systems(inf_systems_data=inf_systems_df, legend_sw=True),
+         lambda: pf.fig_inf_systems(inf_systems_data=inf_systems_df, legend_sw=True)),
+        ('plot_el_budget_graph', lambda: go_plot_el_budget_graph(df=budget_df, names_el_budget=names),
+         lambda: pf.plot_el_budget_graph(df=budget_df, names_el_budget=names)),
+        ('plot_el_budget_graph_mean_time', lambda: go_plot_el_budget_graph_mean_time(df=budget_df,
+                                                                                     names_el_budget=names),
+         lambda: pf.plot_el_budget_graph_mean_time(df=budget_df, names_el_budget=names)),
+        ('plot_gossluzba_graph_page_dept', lambda: go_plot_gossluzba_graph_page_dept(df=depth_df),
+         lambda: pf.plot_gossluzba_graph_page_dept(df=depth_df)),
+        ('visits_gossluzba_site', lambda: go_visits_gossluzba_site(df=visits_df),
+         lambda: pf.visits_gossluzba_site(df=visits_df)),
+        ('fig_total', lambda: go_fig_total(df=inf_systems_df, colors=pf.colors_inf_system),
+         lambda: pf.fig_total(df=inf_systems_df, colors=pf.colors_inf_system)),
+        ('inf_sys_heatmap', lambda: go_inf_sys_heatmap(df=inf_systems_df, value='ice_r'),
+         lambda: pf.inf_sys_heatmap(df=inf_systems_df, value='ice_r')),
+        ('inf_sys_bar', lambda: go_inf_sys_bar(df=inf_systems_df, colors=pf.colors_inf_system, value='unit_0'),
+         lambda: pf.inf_sys_bar(df=inf_systems_df, colors=pf.colors_inf_system, value='unit_0')),
+    ]
+
+
+def to_json(figure):
+    return pio.to_json(figure, validate=False)
@@ -0,0 +1,49 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import passport.figures as pf
+import passport.result_cache as rc
+from figure_cases import get_cases, make_tagged_df, to_json
+
+
+def normalize(value, key=None):
+    """
+    Функция приводит JSON графика к виду, не зависящему от способа построения: массивы, которые plotly кодирует в
+    base64 ({'dtype': ..., 'bdata': ...}), раскрываются в списки, целые значения с плавающей точкой приводятся к int,
+    а подписи (text), которые проверка свойств go.Figure переводит в строки, сравниваются как строки.
+    """
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        value = array.reshape(value['shape']).tolist() if 'shape' in value else array.tolist()
+    if isinstance(value, dict):
+        return {name: normalize(item, key=name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [normalize(item, key=key) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if key == 'text' and isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+
+@pytest.fixture(autouse=True)
+def no_figure_cache(monkeypatch):
+    monkeypatch.setattr(rc, 'figure_backend', rc.MemoryBackend(size=0))
+
+
+@pytest.mark.parametrize('name, reference, fast', get_cases(df=make_tagged_df(rows=2000)),
+                         ids=lambda case: case if isinstance(case, str) else '')
+def test_figure_matches_reference(name, reference, fast):
+    assert normalize(json.loads(to_json(fast()))) == normalize(json.loads(to_json(reference())))
+
+
+def test_gossluzba_page_depth_keeps_every_bar():
+    df = pd.Series([1.0, 2.0, 3.0, 4.0], index=['a', 'b', 'c', 'd'])
+
+    figure = pf.plot_gossluzba_graph_page_dept(df=df)
+    assert [trace['name'] for trace in figure['data']] == ['a', 'b', 'c', 'd']
+    assert figure['data'][3]['marker']['color'] == figure['data'][0]['marker']['color']
@@ -0,0 +1,92 @@
+import requests
+
+import passport.site_info as si
+
+
+class StubResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return dict(total_rows=0, data=[])
+
+
+class StubSession:
+    """
+    Сессия-заглушка: возвращает заранее заданные ответы (или выбрасывает заданные исключения) по порядку.
+    """
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+
+    def get(self, url, params, timeout):
+        self.calls.append(dict(url=url, params=params, timeout=timeout))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_client(results, monkeypatch, retries=2, breaker_failures=2):
+    delays = []
+    monkeypatch.setattr(si.time, 'sleep', delays.append)
+    monkeypatch.setattr(si.lw, 'log_writer', lambda log_msg: None)
+    client = si.MetrikaClient(token='token', base_url='http://stub/', connect_timeout=1, read_timeout=2,
+                              retries=retries, backoff=0.5, pool_size=1, breaker_failures=breaker_failures,
+                              breaker_cooldown=60, retry_after_max=10)
+    client.session = StubSession(results=results)
+    return client, delays
+
+
+def test_retries_until_success(monkeypatch):
+    client, delays = make_client(results=[requests.Timeout(), StubResponse(503), StubResponse(200)],
+                                 monkeypatch=monkeypatch)
+
+    assert client.get_page(params=dict(ids=1), offset=11) == dict(total_rows=0, data=[])
+    assert len(client.session.calls) == 3
+    assert client.session.calls[0]['url'] == 'http://stub/stat/v1/data'
+    assert client.session.calls[0]['params'] == dict(ids=1, offset=11)
+    assert client.session.calls[0]['timeout'] == (1, 2)
+    assert len(delays) == 2
+    assert 0.25 <= delays[0] <= 0.75 and 0.5 <= delays[1] <= 1.5
+    assert client.latency_stats()['retries'] == 2
+    assert client.failures == 0
+
+
+def test_client_error_is_not_retried(monkeypatch):
+    client, delays = make_client(results=[StubResponse(400)], monkeypatch=monkeypatch)
+
+    assert client.get_page(params={}, offset=1) is None
+    assert len(client.session.calls) == 1
+    assert delays == []
+    assert client.failures == 0
+
+
+def test_retry_after_is_clamped(monkeypatch):
+    client, delays = make_client(results=[StubResponse(429, headers={'Retry-After': '3600'}),
+                                          StubResponse(429, headers={'Retry-After': '3'}),
+                                          StubResponse(200)],
+                                 monkeypatch=monkeypatch)
+
+    client.get_page(params={}, offset=1)
+    assert delays == [10, 3]
+
+
+def test_breaker_opens_after_failed_requests(monkeypatch):
+    client, delays = make_client(results=[requests.ConnectionError()] * 2 + [StubResponse(502)] * 2,
+                                 monkeypatch=monkeypatch, retries=1)
+
+    assert client.get_page(params={}, offset=1) is None
+    assert not client.is_open()
+    assert client.get_page(params={}, offset=1) is None
+    assert client.is_open()
+
+    assert client.get_page(params={}, offset=1) is None
+    assert len(client.session.calls) == 4
+    assert client.latency_stats()['rejected'] == 1
+
+    client.open_until = 0.0
+    client.session.results = [StubResponse(200)]
+    assert client.get_page(params={}, offset=1) is not None